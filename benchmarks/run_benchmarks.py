@@ -0,0 +1,230 @@
+"""
+Performance benchmarks run against the local mock LLM server, so no HF
+router calls are made.
+
+Usage:
+    python -m benchmarks.run_benchmarks [--sizes 1000,100000,1000000]
+        [--output benchmarks/results/latest.json] [--compare OLD.json]
+
+Times call_llm / stream_llm, every pipeline stage, cost aggregation at each
+billing size (1e3, 1e5 and 1e6 rows by default; add 10000000 to --sizes
+for the 1e7-row run) and report export, and writes the results as JSON. With
+--compare, benchmarks more than --threshold slower than the given earlier
+results are reported and the exit status is 1.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from src.mock_llm_server import MockLLMServer, CANNED_PROFILE
+
+RESULTS_VERSION = 1
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results", "latest.json")
+DEFAULT_THRESHOLD = 0.20
+
+# Slowdowns smaller than this are timer noise, whatever the percentage
+MIN_REGRESSION_S = 0.01
+
+
+def _configure_client(server: MockLLMServer) -> None:
+    """Point llm_client at the mock server; must run before it is imported."""
+    os.environ["HF_MODEL_URL"] = server.url
+    os.environ.setdefault("HF_API_KEY", "mock")
+    os.environ["LLM_CACHE_DISABLED"] = "1"
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _latency_stats(samples: list) -> dict:
+    ordered = sorted(samples)
+    # "seconds" is the per-call median so runs with different --calls compare
+    return {
+        "calls": len(samples),
+        "seconds": round(ordered[len(ordered) // 2], 4),
+        "mean_s": round(statistics.mean(samples), 4),
+        "p95_s": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+    }
+
+
+def bench_llm_calls(calls: int) -> dict:
+    """Latency of call_llm and of fully consuming stream_llm, after one warm-up call each."""
+    from src.llm_client import call_llm, stream_llm
+
+    results = {}
+    for name, run in (
+        ("call_llm", lambda: call_llm("Recommend savings", max_tokens=4000)),
+        ("stream_llm", lambda: list(stream_llm("Recommend savings", max_tokens=4000))),
+    ):
+        run()
+        samples = []
+        for _ in range(calls):
+            started = time.perf_counter()
+            run()
+            samples.append(time.perf_counter() - started)
+        results[name] = _latency_stats(samples)
+    return results
+
+
+def bench_pipeline(work_dir: str) -> dict:
+    """Each stage of a forced full pipeline run, then an all-skipped rerun."""
+    from src.pipeline import run_pipeline
+
+    with open(os.path.join(work_dir, "project_description.txt"), "w", encoding="utf-8") as f:
+        f.write("A food delivery app on AWS with a Node.js backend and PostgreSQL, budget 50000 INR a month.")
+
+    results = {}
+    for timing in run_pipeline(work_dir, force=True):
+        results[f"pipeline.{timing['stage']}"] = {"seconds": timing["seconds"]}
+
+    started = time.perf_counter()
+    run_pipeline(work_dir)
+    results["pipeline.unchanged_rerun"] = {"seconds": round(time.perf_counter() - started, 4)}
+    return results
+
+
+def bench_aggregation(work_dir: str, sizes) -> dict:
+    """Generate a JSON Lines billing file per size and time aggregate_billing over it."""
+    from src.billing_generator import generate_billing_local
+    from src.cost_analyzer import aggregate_billing
+
+    results = {}
+    for size in sizes:
+        path = os.path.join(work_dir, f"billing_{size}.jsonl")
+        started = time.perf_counter()
+        generate_billing_local(num_records=size, months=12 if size >= 1000 else 1,
+                               output_path=path, profile=CANNED_PROFILE)
+        generate_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        aggregator = aggregate_billing(path)
+        elapsed = time.perf_counter() - started
+        results[f"aggregate.{size}"] = {
+            "seconds": round(elapsed, 4),
+            "rows": aggregator.rows,
+            "rows_per_s": round(aggregator.rows / elapsed) if elapsed > 0 else None,
+            "file_bytes": os.path.getsize(path),
+            "generate_s": round(generate_s, 4),
+        }
+        os.remove(path)
+    return results
+
+
+def bench_export(work_dir: str, repeats: int) -> dict:
+    """Mean time to export the pipeline's report to text."""
+    from src.cli import export_report
+
+    report_path = os.path.join(work_dir, "cost_optimization_report.json")
+    output_file = os.path.join(work_dir, "cost_optimization_report.txt")
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        export_report(report_path, output_file)
+        samples.append(time.perf_counter() - started)
+    return {"export.text": {"seconds": round(statistics.mean(samples), 6), "repeats": repeats}}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, calls: int = 20, latency: float = 0.05,
+                   export_repeats: int = 50) -> dict:
+    """
+    Run every benchmark against a fresh mock server and temporary directory.
+
+    Returns:
+        dict: Results document (see README "Benchmarks")
+    """
+    server = MockLLMServer(port=0, latency=latency).start()
+    _configure_client(server)
+    work_dir = tempfile.mkdtemp(prefix="cco-bench-")
+    benchmarks = {}
+    try:
+        benchmarks.update(bench_llm_calls(calls))
+        benchmarks.update(bench_pipeline(work_dir))
+        benchmarks.update(bench_aggregation(work_dir, sizes))
+        benchmarks.update(bench_export(work_dir, export_repeats))
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "version": RESULTS_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"sizes": list(sizes), "calls": calls, "mock_latency_s": latency,
+                   "export_repeats": export_repeats},
+        "benchmarks": benchmarks,
+    }
+
+
+def compare_results(previous: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    Print each benchmark's change in seconds against previous results.
+
+    Returns:
+        list: Names of benchmarks slower by more than threshold (a fraction)
+            and by at least MIN_REGRESSION_S
+    """
+    regressions = []
+    print(f"\n{'benchmark':<28} {'before':>10} {'after':>10} {'change':>8}")
+    for name, result in current["benchmarks"].items():
+        before = previous.get("benchmarks", {}).get(name, {}).get("seconds")
+        after = result.get("seconds")
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        flag = ""
+        if change > threshold and after - before >= MIN_REGRESSION_S:
+            regressions.append(name)
+            flag = "  ⚠️ regression"
+        print(f"{name:<28} {before:>10.4f} {after:>10.4f} {change:>+7.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline against a local mock LLM server.")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma-separated billing row counts for the aggregation benchmark "
+                             f"(default: {','.join(str(s) for s in DEFAULT_SIZES)}; 10000000 is opt-in)")
+    parser.add_argument("--calls", type=int, default=20, help="LLM calls per latency benchmark")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock server latency in seconds")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"Results file (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--compare", help="Earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Slowdown fraction reported as a regression (default: 0.20)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = run_benchmarks(sizes, args.calls, args.latency)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Benchmark results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        regressions = compare_results(previous, results, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
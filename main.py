@@ -4,8 +4,8 @@ Cloud Cost Optimizer - Main Entry Point
 AI-Powered Cloud Cost Optimization Tool (LLM-Driven)
 """
 
-from src.cli import menu
+import sys
+from src.cli import main
 
 if __name__ == "__main__":
-    menu()
-
+    sys.exit(main())
@@ -0,0 +1,302 @@
+import os
+import json
+import math
+from operator import itemgetter
+from src.billing_columns import to_inr, USAGE_SCALE
+
+# A month is anomalous when it sits this many standard deviations above the expectation
+ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", "3.0"))
+
+# Weight of the newest month in a resource's exponentially weighted moving average
+EWMA_ALPHA = 0.3
+
+# Prior months a resource needs before its own history is trusted
+MIN_HISTORY_MONTHS = 3
+
+# Other resources of the same service and region needed for a peer comparison
+MIN_PEERS = 3
+
+# A spike must also be this large, relative and absolute, to be reported
+MIN_SPIKE_RATIO = 1.5
+MIN_SPIKE_PAISE = 100_00
+
+# Standard deviation floor as a share of the mean, so flat histories do not flag noise
+MIN_RELATIVE_STD = 0.05
+
+# Anomalies listed in the report, most severe first (all are counted)
+MAX_REPORTED_ANOMALIES = 20
+
+# Per-resource statistics and the anomalies found, kept between ingests
+ANOMALY_STATE_FILENAME = "anomaly_state.json"
+ANOMALY_STATE_VERSION = 1
+
+_record_fields = itemgetter("resource_id", "month", "cost_inr", "usage_quantity")
+
+# Per-resource state is one flat list: the open (latest) month and its
+# totals, months folded so far, [mean, m2, ewma] for cost and for usage,
+# then the first folded month's index and a bitmask of the months folded
+_SERVICE, _REGION, _MONTH, _COST, _USAGE, _N = range(6)
+_COST_STATS, _USAGE_STATS = 6, 9
+_FIRST, _FOLDED = 12, 13
+_NEW_STATS = (0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, None, 0)
+
+
+def _month_index(month):
+    """Months since year 0 for "YYYY-MM", or None."""
+    try:
+        return int(month[:4]) * 12 + int(month[5:7]) - 1
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_folded(state: list, month: str) -> bool:
+    index, first = _month_index(month), state[_FIRST]
+    return index is not None and first is not None and index >= first and bool(state[_FOLDED] >> (index - first) & 1)
+
+
+def _mark_folded(state: list, month: str) -> None:
+    index, first = _month_index(month), state[_FIRST]
+    if index is None:
+        return
+    if first is None:
+        state[_FIRST], state[_FOLDED] = index, 1
+    elif index < first:
+        state[_FIRST], state[_FOLDED] = index, state[_FOLDED] << (first - index) | 1
+    else:
+        state[_FOLDED] |= 1 << (index - first)
+
+
+def load_anomaly_state(path: str) -> dict:
+    """Load a saved AnomalyDetector state, or an empty one."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") == ANOMALY_STATE_VERSION:
+            return state
+    except (FileNotFoundError, ValueError):
+        pass
+    return {}
+
+
+def save_anomaly_state(path: str, detector: "AnomalyDetector") -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(detector.state(), f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+class ResourceMonths:
+    """
+    Cost and usage per resource and month, summed exactly.
+
+    Cost is kept in integer paise and usage in USAGE_SCALE units, so the
+    sums are the same however the records are split into chunks, files or
+    processes, and merge() adds another rollup's sums.
+    """
+
+    def __init__(self):
+        # (resource_id, month) -> [service, region, cost_paise, usage]
+        self.totals = {}
+
+    def add_records(self, records) -> None:
+        totals = self.totals
+        for record in records:
+            resource_id, month, cost, usage = _record_fields(record)
+            paise = round(cost * 100)
+            usage = round(float(usage or 0) * USAGE_SCALE)
+            entry = totals.get((resource_id, month))
+            if entry is None:
+                totals[(resource_id, month)] = [record["service"], record["region"], paise, usage]
+            else:
+                entry[2] += paise
+                entry[3] += usage
+
+    def merge(self, other: "ResourceMonths") -> None:
+        totals = self.totals
+        for key, (service, region, paise, usage) in other.totals.items():
+            entry = totals.get(key)
+            if entry is None:
+                totals[key] = [service, region, paise, usage]
+            else:
+                entry[2] += paise
+                entry[3] += usage
+
+
+class AnomalyDetector:
+    """
+    Cost and usage spike detection per resource, kept up to date across ingests.
+
+    Line items are summed per resource and month while billing is read (see
+    ResourceMonths), so detectors over separate files merge exactly and
+    record order does not matter. finish() then applies the ingest to a
+    compact state per resource: its latest (open) month, Welford
+    mean/variance and an EWMA over every earlier (folded) month, and a
+    bitmask of the months folded. The state is saved with
+    save_anomaly_state and passed back for the next ingest, so a run only
+    reads its new billing.
+    Per ingested month of a resource:
+
+    - a month after the open one folds the open month into the statistics,
+      after scoring it against them
+    - the open month replaces the open totals, so re-reading a file changes
+      nothing and a month still being billed keeps its latest totals
+    - an earlier month that is already folded is skipped
+    - an earlier month not yet folded is late: it is scored against the
+      mean (the EWMA has moved past it), folded into mean and variance,
+      and counted in the report's late_months
+
+    Open months are scored but not folded. Each ingested resource-month is
+    also compared with the other resources of the same service and region
+    in that month (mean and variance of log cost, leaving the resource
+    itself out). Anomalies are kept in the state, one per resource, month,
+    metric and comparison, so the report covers every ingest.
+    """
+
+    def __init__(self, state: dict = None):
+        state = state or {}
+        self.months = ResourceMonths()
+        self.resources = state.get("resources", {})
+        # "resource_id|month|metric|compared_with" -> report item
+        self.anomalies = state.get("anomalies", {})
+        self.late_months = 0
+        self._finished = False
+
+    def add_records(self, records) -> None:
+        self.months.add_records(records)
+
+    def merge(self, other: "AnomalyDetector") -> None:
+        """Add another detector's ingested resource-months (e.g. from another billing file)."""
+        self.months.merge(other.months)
+
+    def state(self) -> dict:
+        """The detector's state for save_anomaly_state, including this ingest."""
+        self.finish()
+        return {"version": ANOMALY_STATE_VERSION, "resources": self.resources, "anomalies": self.anomalies}
+
+    def _score_history(self, resource_id: str, state: list, month: str, cost: float, usage: float,
+                       late: bool = False) -> None:
+        """Score a month against the resource's folded months: their EWMA, or their mean if late."""
+        n = state[_N]
+        if n < MIN_HISTORY_MONTHS:
+            return
+        for metric, offset, value in (("cost", _COST_STATS, cost), ("usage", _USAGE_STATS, usage)):
+            mean, m2, ewma = state[offset:offset + 3]
+            # The EWMA follows gradual growth, so a steady trend is not itself an anomaly
+            expected = mean if late else ewma
+            self.anomalies.pop(f"{resource_id}|{month}|{metric}|history", None)
+            if value > expected * MIN_SPIKE_RATIO:
+                std = max(math.sqrt(m2 / (n - 1)), MIN_RELATIVE_STD * abs(mean), 1.0)
+                self._consider(resource_id, state[_SERVICE], state[_REGION], month, metric, "history",
+                               value, expected, (value - expected) / std)
+
+    @staticmethod
+    def _fold(state: list, month: str, cost: float, usage: float, late: bool = False) -> None:
+        """
+        Fold a month into the resource's statistics (Welford's online
+        mean/variance plus an EWMA, inlined as this runs once per
+        resource-month). A late month leaves the EWMA where it is.
+        """
+        n = state[_N]
+        for offset, value in ((_COST_STATS, cost), (_USAGE_STATS, usage)):
+            mean, m2, ewma = state[offset:offset + 3]
+            delta = value - mean
+            mean += delta / (n + 1)
+            state[offset] = mean
+            state[offset + 1] = m2 + delta * (value - mean)
+            if n == 0 or not late:
+                state[offset + 2] = value if n == 0 else EWMA_ALPHA * value + (1 - EWMA_ALPHA) * ewma
+        state[_N] = n + 1
+        _mark_folded(state, month)
+
+    def _consider(self, resource_id: str, service: str, region: str, month: str, metric: str, kind: str,
+                  value: float, expected: float, z: float) -> None:
+        if z < ANOMALY_Z_THRESHOLD or value < expected * MIN_SPIKE_RATIO:
+            return
+        if metric == "cost" and (value - expected) * 100 < MIN_SPIKE_PAISE:
+            return
+        if metric == "cost":
+            shown_value, shown_expected = to_inr(round(value * 100)), to_inr(round(expected * 100))
+        else:
+            shown_value, shown_expected = round(value, 2), round(expected, 2)
+        self.anomalies[f"{resource_id}|{month}|{metric}|{kind}"] = {
+            "resource_id": resource_id,
+            "service": service,
+            "region": region,
+            "month": month,
+            "metric": metric,
+            "compared_with": kind,
+            "value": shown_value,
+            "expected": shown_expected,
+            "ratio": round(value / expected, 2) if expected > 0 else None,
+            "z_score": round(z, 2),
+        }
+
+    def finish(self) -> None:
+        """Apply the ingested months to the per-resource state, then score open months and peers."""
+        if self._finished:
+            return
+        self._finished = True
+        resources = self.resources
+        ingested = sorted(self.months.totals.items())
+        touched = set()
+        for (resource_id, month), (service, region, paise, usage) in ingested:
+            cost, usage = paise / 100, usage / USAGE_SCALE
+            state = resources.get(resource_id)
+            touched.add(resource_id)
+            if state is None:
+                resources[resource_id] = [service, region, month, cost, usage, *_NEW_STATS]
+            elif month == state[_MONTH]:
+                state[_COST], state[_USAGE] = cost, usage
+            elif month > state[_MONTH]:
+                self._score_history(resource_id, state, state[_MONTH], state[_COST], state[_USAGE])
+                self._fold(state, state[_MONTH], state[_COST], state[_USAGE])
+                state[_MONTH], state[_COST], state[_USAGE] = month, cost, usage
+            elif not _is_folded(state, month):
+                self.late_months += 1
+                self._score_history(resource_id, state, month, cost, usage, late=True)
+                self._fold(state, month, cost, usage, late=True)
+
+        for resource_id in sorted(touched):
+            state = resources[resource_id]
+            self._score_history(resource_id, state, state[_MONTH], state[_COST], state[_USAGE])
+
+        # (service, region, month) -> [n, mean, m2] of log cost over the ingested resources
+        peers = {}
+        for (_, month), (service, region, paise, _) in ingested:
+            if paise > 0:
+                peer = peers.setdefault((service, region, month), [0, 0.0, 0.0])
+                count = peer[0] + 1
+                x = math.log(paise / 100)
+                delta = x - peer[1]
+                peer[1] += delta / count
+                peer[2] += delta * (x - peer[1])
+                peer[0] = count
+
+        for (resource_id, month), (service, region, paise, _) in ingested:
+            self.anomalies.pop(f"{resource_id}|{month}|cost|peers", None)
+            if paise <= 0:
+                continue
+            n, mean, m2 = peers[(service, region, month)]
+            if n - 1 < MIN_PEERS:
+                continue
+            # Leave this resource out of its peer group
+            cost = paise / 100
+            x = math.log(cost)
+            others_mean = (n * mean - x) / (n - 1)
+            others_m2 = max(m2 - (x - others_mean) * (x - mean), 0.0)
+            std = max(math.sqrt(others_m2 / (n - 2)), MIN_RELATIVE_STD)
+            self._consider(resource_id, service, region, month, "cost", "peers", cost, math.exp(others_mean),
+                           (x - others_mean) / std)
+
+    def report(self) -> dict:
+        """The report's anomalies section: counts plus the most severe anomalies."""
+        self.finish()
+        items = sorted(self.anomalies.values(), key=lambda item: (
+            -item["z_score"], item["resource_id"], item["month"], item["metric"], item["compared_with"]))
+        return {
+            "count": len(items),
+            "resources_scanned": len(self.resources),
+            "late_months": self.late_months,
+            "z_threshold": ANOMALY_Z_THRESHOLD,
+            "items": [dict(item) for item in items[:MAX_REPORTED_ANOMALIES]],
+        }
@@ -0,0 +1,152 @@
+"""
+Batch mode: run the full cost analysis pipeline for every project
+description in a directory, several projects at a time. Concurrency is
+thread-based: each project's blocking pipeline runs on a thread of a pool
+sized to --concurrency.
+
+Usage:
+    python -m src.batch <descriptions_dir> <output_dir> [--concurrency N]
+        [--no-llm] [--profile] [--metrics-file metrics.prom]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from src.pipeline import run_pipeline
+from src import metrics
+
+DEFAULT_CONCURRENCY = 4
+
+
+def find_descriptions(input_dir: str):
+    """Return sorted paths of the *.txt project descriptions in input_dir."""
+    return sorted(
+        os.path.join(input_dir, name)
+        for name in os.listdir(input_dir)
+        if name.endswith(".txt") and os.path.isfile(os.path.join(input_dir, name))
+    )
+
+
+def run_project(description_path: str, project_dir: str, use_llm: bool = True):
+    """
+    Run profile extraction, billing generation and cost analysis for one
+    project, writing every artifact into project_dir. Stages whose inputs
+    are unchanged since the last batch run are skipped. With use_llm=False
+    the analysis keeps only rule-based recommendations.
+    """
+    os.makedirs(project_dir, exist_ok=True)
+    shutil.copyfile(description_path, os.path.join(project_dir, "project_description.txt"))
+
+    run_pipeline(project_dir, use_llm=use_llm)
+    with open(os.path.join(project_dir, "cost_optimization_report.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+async def _run_one(semaphore, executor, description_path: str, output_dir: str, use_llm: bool):
+    project = os.path.splitext(os.path.basename(description_path))[0]
+    project_dir = os.path.join(output_dir, project)
+    loop = asyncio.get_running_loop()
+
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            report = await loop.run_in_executor(executor, contextvars.copy_context().run,
+                                                run_project, description_path, project_dir, use_llm)
+            status = {
+                "project": project,
+                "status": "ok",
+                "output_dir": project_dir,
+                "total_monthly_cost": report["analysis"]["total_monthly_cost"],
+                "recommendations": len(report["recommendations"]),
+            }
+        except Exception as e:
+            status = {"project": project, "status": "error", "output_dir": project_dir, "error": str(e)}
+        status["elapsed_s"] = round(time.perf_counter() - started, 3)
+
+    print(f"{'✅' if status['status'] == 'ok' else '❌'} [{project}] finished in {status['elapsed_s']}s")
+    return status
+
+
+async def run_batch_async(input_dir: str, output_dir: str, concurrency: int = DEFAULT_CONCURRENCY,
+                          use_llm: bool = True):
+    """
+    Analyse every description in input_dir with at most `concurrency`
+    projects in flight, each on a thread of a pool of that size (not the
+    loop's default executor, which caps at min(32, cpus + 4) threads).
+    One project's failure does not stop the others.
+
+    Returns:
+        list: Per-project status dicts, in input order
+    """
+    descriptions = find_descriptions(input_dir)
+    if not descriptions:
+        raise FileNotFoundError(f"No .txt project descriptions found in {input_dir}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    semaphore = asyncio.Semaphore(concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as executor:
+        return await asyncio.gather(
+            *(_run_one(semaphore, executor, path, output_dir, use_llm) for path in descriptions)
+        )
+
+
+def run_batch(input_dir: str, output_dir: str, concurrency: int = DEFAULT_CONCURRENCY, use_llm: bool = True):
+    """
+    Synchronous entry point for batch analysis. Writes batch_summary.json
+    into output_dir and returns the per-project statuses.
+    """
+    started = time.perf_counter()
+    results = asyncio.run(run_batch_async(input_dir, output_dir, concurrency, use_llm))
+    elapsed = round(time.perf_counter() - started, 3)
+
+    summary = {
+        "projects": len(results),
+        "succeeded": sum(1 for r in results if r["status"] == "ok"),
+        "failed": sum(1 for r in results if r["status"] != "ok"),
+        "concurrency": concurrency,
+        "use_llm": use_llm,
+        "elapsed_s": elapsed,
+        "results": results,
+    }
+    with open(os.path.join(output_dir, "batch_summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    print(f"\n✅ Batch finished: {summary['succeeded']}/{summary['projects']} projects in {elapsed}s")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run cost analysis for a directory of project descriptions.")
+    parser.add_argument("input_dir", help="Directory containing one .txt description per project")
+    parser.add_argument("output_dir", help="Directory to write one sub-directory of results per project")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Maximum projects analysed at once (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--no-llm", action="store_true",
+                        help="Keep only the rule-based recommendations; the analysis makes no LLM call")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print per-stage timings, token usage and I/O totals at the end")
+    parser.add_argument("--metrics-file",
+                        help="Write stage metrics here (.json, otherwise Prometheus text)")
+    args = parser.parse_args(argv)
+
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    results = run_batch(args.input_dir, args.output_dir, args.concurrency, use_llm=not args.no_llm)
+    if args.profile:
+        print("\nProfile (all projects):")
+        print(metrics.format_profile())
+    if args.metrics_file:
+        metrics.write_metrics(args.metrics_file)
+        print(f"Metrics written to {args.metrics_file}")
+    return 0 if all(r["status"] == "ok" for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
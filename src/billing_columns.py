@@ -0,0 +1,253 @@
+import heapq
+import numpy as np
+
+# Billing fields stored as integer category codes plus a lookup table
+CATEGORICAL_FIELDS = ("service", "region", "usage_type", "month")
+
+# Per-resource usage_quantity is summed in millionths of a unit: integer sums
+# are exact, so they do not depend on how records are split into files
+USAGE_SCALE = 1_000_000
+
+
+def to_inr(paise):
+    """Convert an integer paise amount to INR, keeping whole rupees as int."""
+    paise = int(paise)
+    return paise // 100 if paise % 100 == 0 else paise / 100
+
+
+class BillingColumns:
+    """
+    Columnar, NumPy-backed view of billing records.
+
+    Categorical fields are dictionary-encoded as int32 codes (categories keep
+    first-appearance order), cost is held as exact int64 paise and
+    usage_quantity as float64. A record costs 32 bytes here versus ~1 KB as
+    a Python dict, and group-bys are a single np.bincount.
+    """
+
+    def __init__(self, codes: dict, categories: dict, cost_paise, usage_quantity):
+        self.codes = codes
+        self.categories = categories
+        self.cost_paise = cost_paise
+        self.usage_quantity = usage_quantity
+
+    @classmethod
+    def from_records(cls, records):
+        """Build columns from an iterable of billing record dicts."""
+        if not isinstance(records, list):
+            records = list(records)
+
+        codes = {}
+        categories = {}
+        for field in CATEGORICAL_FIELDS:
+            # setdefault assigns the next code the first time a value is seen
+            lookup = {}
+            codes[field] = np.fromiter(
+                (lookup.setdefault(record.get(field), len(lookup)) for record in records),
+                dtype=np.int32, count=len(records)
+            )
+            categories[field] = list(lookup)
+
+        costs = [record["cost_inr"] for record in records]
+        quantities = [record.get("usage_quantity", 0) for record in records]
+
+        cost_paise = np.rint(np.asarray(costs, dtype=np.float64) * 100).astype(np.int64)
+        usage_quantity = np.asarray(quantities, dtype=np.float64)
+        return cls(codes, categories, cost_paise, usage_quantity)
+
+    def __len__(self):
+        return len(self.cost_paise)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the column arrays (excluding category tables)."""
+        return (sum(c.nbytes for c in self.codes.values())
+                + self.cost_paise.nbytes + self.usage_quantity.nbytes)
+
+    def total_cost_paise(self) -> int:
+        return int(self.cost_paise.sum())
+
+    def total_cost(self):
+        """Total cost in INR."""
+        return to_inr(self.total_cost_paise())
+
+    def group_paise(self, field: str):
+        """Per-category cost sums in paise as an int64 array aligned with categories[field]."""
+        # Float64 bincount is exact for integer paise totals below 2**53
+        sums = np.bincount(self.codes[field], weights=self.cost_paise,
+                           minlength=len(self.categories[field]))
+        return np.rint(sums).astype(np.int64)
+
+    def group_cost(self, field: str) -> dict:
+        """
+        Total cost in INR per value of a categorical field, in
+        first-appearance order.
+        """
+        sums = self.group_paise(field)
+        return {value: to_inr(total) for value, total in zip(self.categories[field], sums)}
+
+    def group_usage(self, field: str) -> dict:
+        """Total usage_quantity per value of a categorical field."""
+        sums = np.bincount(self.codes[field], weights=self.usage_quantity,
+                           minlength=len(self.categories[field]))
+        return {value: float(total) for value, total in zip(self.categories[field], sums)}
+
+    def cross_group_paise(self, outer: str, inner: str) -> dict:
+        """
+        Cost in paise per (outer, inner) pair, e.g. per month and service,
+        as {outer_value: {inner_value: paise}} with empty pairs omitted.
+        """
+        width = len(self.categories[inner])
+        combined = self.codes[outer].astype(np.int64) * width + self.codes[inner]
+        sums = np.rint(np.bincount(combined, weights=self.cost_paise,
+                                   minlength=len(self.categories[outer]) * width)).astype(np.int64)
+        result = {}
+        for flat in np.flatnonzero(sums).tolist():
+            o, i = divmod(flat, width)
+            result.setdefault(self.categories[outer][o], {})[self.categories[inner][i]] = int(sums[flat])
+        return result
+
+    def top_cost(self, field: str, k: int = 3) -> dict:
+        """The k highest-cost values of a categorical field, descending."""
+        sums = self.group_paise(field)
+        order = np.argsort(-sums, kind="stable")[:k]
+        return {self.categories[field][i]: to_inr(sums[i]) for i in order}
+
+
+class CostAggregator:
+    """
+    Single-pass cost aggregation over billing chunks.
+
+    Each chunk is converted to BillingColumns and reduced with vectorized
+    group-bys; only per-category paise totals are kept between chunks, so
+    memory is bounded by the number of distinct categories, not rows.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.total_paise = 0
+        self.group_paise = {field: {} for field in CATEGORICAL_FIELDS}
+        self.month_service_paise = {}
+
+    def add_records(self, records) -> None:
+        """Fold a chunk (list of billing record dicts) into the running totals."""
+        self.add_columns(BillingColumns.from_records(records))
+
+    def add_columns(self, columns: BillingColumns) -> None:
+        self.rows += len(columns)
+        self.total_paise += columns.total_cost_paise()
+        for field in CATEGORICAL_FIELDS:
+            totals = self.group_paise[field]
+            for value, paise in zip(columns.categories[field], columns.group_paise(field).tolist()):
+                totals[value] = totals.get(value, 0) + paise
+        for month, services in columns.cross_group_paise("month", "service").items():
+            totals = self.month_service_paise.setdefault(month, {})
+            for service, paise in services.items():
+                totals[service] = totals.get(service, 0) + paise
+
+    def merge(self, other: "CostAggregator") -> None:
+        """
+        Add another aggregator's totals, as if its records followed this
+        one's. Totals are integer paise, so any merge order gives the same sums.
+        """
+        self.rows += other.rows
+        self.total_paise += other.total_paise
+        for field in CATEGORICAL_FIELDS:
+            totals = self.group_paise[field]
+            for value, paise in other.group_paise[field].items():
+                totals[value] = totals.get(value, 0) + paise
+        for month, services in other.month_service_paise.items():
+            totals = self.month_service_paise.setdefault(month, {})
+            for service, paise in services.items():
+                totals[service] = totals.get(service, 0) + paise
+
+    def total_cost(self):
+        return to_inr(self.total_paise)
+
+    def group_cost(self, field: str) -> dict:
+        return {value: to_inr(paise) for value, paise in self.group_paise[field].items()}
+
+    def top_cost(self, field: str, k: int = 3) -> dict:
+        ranked = sorted(self.group_paise[field].items(), key=lambda x: x[1], reverse=True)
+        return {value: to_inr(paise) for value, paise in ranked[:k]}
+
+
+class TopRecords:
+    """
+    Keep the k billing records with the highest cost_inr seen so far.
+
+    A bounded min-heap, so memory stays O(k) over any number of chunks;
+    ties keep the record seen first.
+    """
+
+    def __init__(self, k: int = 20):
+        self.k = k
+        self._heap = []
+        self._seen = 0
+
+    def add_records(self, records) -> None:
+        heap = self._heap
+        for record in records:
+            # Negated sequence number: earlier records win ties
+            entry = (record.get("cost_inr") or 0, -self._seen, record)
+            self._seen += 1
+            if len(heap) < self.k:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+
+    def merge(self, other: "TopRecords") -> None:
+        """Add another TopRecords' kept records, as if its records followed this one's."""
+        heap = self._heap
+        for cost, seq, record in other._heap:
+            # Renumber after this one's records so ties still go to the earlier record
+            entry = (cost, seq - self._seen, record)
+            if len(heap) < self.k:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+        self._seen += other._seen
+
+    def records(self) -> list:
+        """The kept records, highest cost first."""
+        return [entry[2] for entry in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+
+class TopResources:
+    """
+    Cost per resource_id, for the k most expensive resources.
+
+    Every resource's total is kept in integer paise (exact top-k cannot be
+    merged from partial top-k lists), so memory is O(resources); service
+    and region are taken from the resource's first record.
+    """
+
+    def __init__(self, k: int = 10):
+        self.k = k
+        # resource_id -> [service, region, cost_paise]
+        self.resources = {}
+
+    def add_records(self, records) -> None:
+        resources = self.resources
+        for record in records:
+            resource_id = record.get("resource_id") or ""
+            entry = resources.get(resource_id)
+            if entry is None:
+                entry = resources[resource_id] = [record.get("service"), record.get("region"), 0]
+            entry[2] += round(float(record.get("cost_inr") or 0) * 100)
+
+    def merge(self, other: "TopResources") -> None:
+        """Add another TopResources' totals, as if its records followed this one's."""
+        resources = self.resources
+        for resource_id, (service, region, paise) in other.resources.items():
+            entry = resources.get(resource_id)
+            if entry is None:
+                resources[resource_id] = [service, region, paise]
+            else:
+                entry[2] += paise
+
+    def top(self) -> list:
+        """The k most expensive resources, highest cost first (ties by resource_id)."""
+        ranked = heapq.nsmallest(self.k, self.resources.items(), key=lambda item: (-item[1][2], item[0]))
+        return [{"resource_id": resource_id, "service": service, "region": region, "cost_inr": to_inr(paise)}
+                for resource_id, (service, region, paise) in ranked]
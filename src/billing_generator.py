@@ -1,15 +1,30 @@
+import os
+import gzip
 import json
-from src.llm_client import call_llm
+import random
+import itertools
+from src.llm_client import call_llm, stream_llm
+from src.schemas import validate_billing_records
+from src import metrics
 
-def generate_billing():
+# Bump when the prompt changes so the pipeline reruns this stage
+PROMPT_VERSION = 1
+
+@metrics.timed_stage("billing")
+def generate_billing(data_dir: str = "data", stream: bool = False):
     """
     Generate realistic synthetic cloud billing data (12-20 records) based on project profile.
+    Input: <data_dir>/project_profile.json
     Output: mock_billing.json with billing records including month, service, resource_id, 
     region, usage_type, usage_quantity, unit, cost_inr, desc.
+
+    With stream=True each record is validated and printed as soon as the LLM
+    finishes it, and generation is aborted at the first invalid record.
     """
     try:
-        with open("data/project_profile.json", "r") as f:
+        with open(os.path.join(data_dir, "project_profile.json"), "r") as f:
             profile = json.load(f)
+        metrics.add_file_read(os.path.join(data_dir, "project_profile.json"))
     except FileNotFoundError:
         raise FileNotFoundError("project_profile.json not found. Please run profile extraction first.")
 
@@ -51,7 +66,18 @@ Project Profile:
 Return ONLY a JSON array, nothing else. No markdown, no code blocks, no explanations."""
 
     try:
-        billing = call_llm(prompt, max_tokens=3000, return_array=True)
+        if stream:
+            billing = []
+            records = stream_llm(prompt, max_tokens=3000, return_array=True)
+            try:
+                for record in records:
+                    validate_billing_records([record], start=len(billing))
+                    billing.append(record)
+                    print(f"   • {record['service']} {record['resource_id']}: ₹{record['cost_inr']}")
+            finally:
+                records.close()
+        else:
+            billing = call_llm(prompt, max_tokens=3000, return_array=True)
         
         # Validate it's a list
         if not isinstance(billing, list):
@@ -61,21 +87,262 @@ Return ONLY a JSON array, nothing else. No markdown, no code blocks, no explanat
         if len(billing) < 12 or len(billing) > 20:
             print(f"Warning: Generated {len(billing)} records, expected 12-20")
         
-        # Validate each record has required fields
-        required_fields = ["month", "service", "resource_id", "region", "usage_type", 
-                          "usage_quantity", "unit", "cost_inr", "desc"]
-        for i, record in enumerate(billing):
-            if not isinstance(record, dict):
-                raise ValueError(f"Record {i} is not an object")
-            for field in required_fields:
-                if field not in record:
-                    raise ValueError(f"Record {i} missing required field: {field}")
+        # Validate every record (streamed records were validated on arrival)
+        if not stream:
+            validate_billing_records(billing)
         
     except Exception as e:
         raise Exception(f"Failed to generate billing data: {e}")
 
-    with open("data/mock_billing.json", "w", encoding="utf-8") as f:
+    with open(os.path.join(data_dir, "mock_billing.json"), "w", encoding="utf-8") as f:
         json.dump(billing, f, indent=2, ensure_ascii=False)
+    metrics.add_file_written(os.path.join(data_dir, "mock_billing.json"))
 
     print(f"✅ mock_billing.json generated with {len(billing)} records")
     return billing
+
+# -------------------------------
+# Local (LLM-free) Billing Generator
+# -------------------------------
+# Per-service SKUs: (usage_type, unit, unit_price_inr, (min_qty, max_qty), desc)
+# Unit prices are approximate AWS on-demand list prices converted to INR.
+PRICE_TABLE = {
+    "EC2": [
+        ("BoxUsage:t3.medium", "hours", 3.45, (200, 744), "t3.medium application server"),
+        ("BoxUsage:m5.large", "hours", 7.97, (300, 744), "m5.large API server"),
+        ("BoxUsage:c5.xlarge", "hours", 14.11, (100, 744), "c5.xlarge worker node"),
+        ("BoxUsage:r5.large", "hours", 10.46, (400, 744), "r5.large in-memory service"),
+    ],
+    "EBS": [
+        ("EBS:VolumeUsage.gp3", "GB-month", 6.64, (50, 2000), "gp3 block storage volume"),
+    ],
+    "RDS": [
+        ("InstanceUsage:db.t3.medium", "hours", 5.64, (500, 744), "db.t3.medium database instance"),
+        ("InstanceUsage:db.m5.large", "hours", 14.19, (600, 744), "db.m5.large database instance"),
+        ("RDS:GP2-Storage", "GB-month", 9.55, (20, 1000), "database storage"),
+    ],
+    "DynamoDB": [
+        ("WriteRequestUnits", "requests", 0.000104, (1_000_000, 50_000_000), "on-demand write requests"),
+        ("TimedStorage-ByteHrs", "GB-month", 20.75, (5, 200), "table storage"),
+    ],
+    "ElastiCache": [
+        ("NodeUsage:cache.t3.medium", "hours", 5.64, (500, 744), "cache.t3.medium Redis node"),
+    ],
+    "S3": [
+        ("TimedStorage-ByteHrs", "GB-month", 1.91, (100, 20_000), "S3 Standard storage"),
+        ("Requests-Tier1", "requests", 0.000415, (100_000, 20_000_000), "PUT/COPY/POST requests"),
+    ],
+    "Lambda": [
+        ("Request", "requests", 0.0000166, (1_000_000, 100_000_000), "function invocations"),
+        ("Lambda-GB-Second", "GB-seconds", 0.00138, (100_000, 10_000_000), "function compute"),
+    ],
+    "CloudFront": [
+        ("DataTransfer-Out-Bytes", "GB", 7.05, (100, 20_000), "CDN data transfer out"),
+        ("Requests-Tier1", "requests", 0.0000623, (1_000_000, 200_000_000), "CDN HTTPS requests"),
+    ],
+    "Load Balancer": [
+        ("LoadBalancerUsage", "hours", 1.87, (744, 744), "application load balancer"),
+        ("LCUUsage", "LCU-hours", 0.66, (500, 20_000), "load balancer capacity units"),
+    ],
+    "NAT Gateway": [
+        ("NatGateway-Hours", "hours", 3.74, (744, 744), "NAT gateway"),
+        ("NatGateway-Bytes", "GB", 3.74, (50, 5000), "NAT gateway data processed"),
+    ],
+    "CloudWatch": [
+        ("DataProcessing-Bytes", "GB", 41.5, (10, 500), "log data ingestion"),
+        ("MetricMonitorUsage", "metrics", 24.9, (10, 300), "custom metrics"),
+    ],
+}
+
+# Baseline share of resources per service before tech-stack tuning
+SERVICE_WEIGHTS = {
+    "EC2": 4.0, "EBS": 1.5, "RDS": 2.0, "DynamoDB": 0.5, "ElastiCache": 0.5,
+    "S3": 2.0, "Lambda": 1.0, "CloudFront": 1.0, "Load Balancer": 1.0,
+    "NAT Gateway": 0.5, "CloudWatch": 1.0,
+}
+
+# (substring in a tech_stack value, service, weight multiplier)
+TECH_STACK_RULES = [
+    ("postgres", "RDS", 2.0), ("mysql", "RDS", 2.0), ("maria", "RDS", 2.0),
+    ("mongo", "DynamoDB", 3.0), ("dynamo", "DynamoDB", 4.0),
+    ("redis", "ElastiCache", 4.0), ("memcache", "ElastiCache", 4.0),
+    ("lambda", "Lambda", 4.0), ("serverless", "Lambda", 4.0),
+    ("react", "CloudFront", 2.0), ("angular", "CloudFront", 2.0), ("vue", "CloudFront", 2.0),
+    ("next", "CloudFront", 2.0), ("s3", "S3", 2.0),
+    ("kubernetes", "EC2", 1.5), ("docker", "EC2", 1.5),
+]
+
+REGIONS = ["ap-south-1", "us-east-1", "eu-west-1", "ap-southeast-1", "us-west-2", "eu-central-1"]
+REGION_WEIGHTS = [5.0, 2.0, 1.0, 1.0, 0.5, 0.5]
+
+RESOURCE_PREFIXES = {
+    "EC2": "i", "EBS": "vol", "RDS": "db", "DynamoDB": "ddb", "ElastiCache": "cache",
+    "S3": "s3", "Lambda": "fn", "CloudFront": "cf", "Load Balancer": "alb",
+    "NAT Gateway": "nat", "CloudWatch": "cw",
+}
+
+
+def service_weights_for(tech_stack: dict) -> dict:
+    """Adjust SERVICE_WEIGHTS by keywords found in the profile's tech_stack values."""
+    weights = dict(SERVICE_WEIGHTS)
+    stack_text = " ".join(str(v) for v in (tech_stack or {}).values()).lower()
+    for keyword, service, factor in TECH_STACK_RULES:
+        if keyword in stack_text:
+            weights[service] *= factor
+    return weights
+
+
+def _month_sequence(start_month: str, months: int):
+    year, month = (int(part) for part in start_month.split("-"))
+    for _ in range(months):
+        yield f"{year:04d}-{month:02d}"
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+
+
+def _open_output(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8")
+    return open(path, "w", encoding="utf-8", buffering=1024 * 1024)
+
+
+def _expected_resource_cost(services: list, service_weights: list) -> float:
+    """Mean monthly cost of one resource drawn by _resource, before budget scaling."""
+    total_weight = sum(service_weights)
+    expected = 0.0
+    for service, weight in zip(services, service_weights):
+        table = PRICE_TABLE[service]
+        mean_cost = sum(price * (low + high) / 2 for _, _, price, (low, high), _ in table) / len(table)
+        expected += weight / total_weight * mean_cost
+    return expected
+
+
+def _resource(seed: int, index: int, services: list, cum_weights: list):
+    """
+    Attributes of resource number index, derived from (seed, index) alone,
+    so resources are recomputed each month instead of held in a pool.
+
+    Returns:
+        tuple: (service, region, PRICE_TABLE entry, base_qty, monthly growth)
+    """
+    # An explicit integer seed rather than hash((seed, index)), whose value
+    # is up to the interpreter; distinct for every index below 2**32
+    rng = random.Random(seed * 2**32 + index)
+    service = rng.choices(services, cum_weights=cum_weights)[0]
+    entry = rng.choice(PRICE_TABLE[service])
+    base_qty = rng.uniform(*entry[3])
+    region = rng.choices(REGIONS, cum_weights=_REGION_CUM_WEIGHTS)[0]
+    return service, region, entry, base_qty, rng.uniform(-0.02, 0.06)
+
+
+_REGION_CUM_WEIGHTS = list(itertools.accumulate(REGION_WEIGHTS))
+
+
+@metrics.timed_stage("billing")
+def generate_billing_local(data_dir: str = "data", num_records: int = 18, months: int = 1,
+                           seed: int = 42, output_path: str = None, start_month: str = "2025-01",
+                           profile: dict = None):
+    """
+    Generate synthetic billing records deterministically, without the LLM.
+
+    A fixed set of resources is drawn from PRICE_TABLE (service mix tuned by
+    the profile's tech_stack) and billed once per month, so the same seed
+    always produces the same file. Each resource is derived from (seed,
+    index) as it is written, and unit prices are scaled from the expected
+    cost per resource so each month totals roughly budget_inr_per_month, so
+    memory stays flat for any num_records.
+
+    Args:
+        data_dir (str): Directory holding project_profile.json
+        num_records (int): Total records to write across all months
+        months (int): Number of consecutive billing months
+        seed (int): Random seed
+        output_path (str): Output file (default <data_dir>/mock_billing.json).
+            A .jsonl suffix writes JSON Lines; a trailing .gz compresses it.
+        start_month (str): First billing month as YYYY-MM
+        profile (dict): Project profile to use instead of reading project_profile.json
+
+    Returns:
+        int: Number of records written
+    """
+    if num_records < 1 or months < 1:
+        raise ValueError("num_records and months must be at least 1")
+
+    if profile is None:
+        try:
+            with open(os.path.join(data_dir, "project_profile.json"), "r") as f:
+                profile = json.load(f)
+            metrics.add_file_read(os.path.join(data_dir, "project_profile.json"))
+        except FileNotFoundError:
+            raise FileNotFoundError("project_profile.json not found. Please run profile extraction first.")
+
+    budget = profile.get("budget_inr_per_month", 10000)
+    output_path = output_path or os.path.join(data_dir, "mock_billing.json")
+    json_lines = output_path.endswith(".jsonl") or output_path.endswith(".jsonl.gz")
+
+    rng = random.Random(seed)
+    weights = service_weights_for(profile.get("tech_stack", {}))
+    services = list(weights)
+    service_weights = [weights[s] for s in services]
+    cum_weights = list(itertools.accumulate(service_weights))
+
+    # Every resource is billed once per month
+    pool_size = -(-num_records // months)
+
+    # Scale unit prices (i.e. instance size / tier) so a month costs about the budget
+    expected_month = pool_size * _expected_resource_cost(services, service_weights)
+    scale = budget / expected_month if expected_month > 0 else 1.0
+
+    # Static fields take few distinct values, so their JSON is built once
+    quoted = {}
+
+    def q(value):
+        text = quoted.get(value)
+        if text is None:
+            text = quoted[value] = json.dumps(value, ensure_ascii=False)
+        return text
+
+    written = 0
+    with _open_output(output_path) as f:
+        if not json_lines:
+            f.write("[\n")
+        for month_index, month in enumerate(_month_sequence(start_month, months)):
+            for index in range(min(pool_size, num_records - written)):
+                service, region, (usage_type, unit, price, (_, high), desc), base_qty, growth = \
+                    _resource(seed, index, services, cum_weights)
+                qty = base_qty * (1 + growth) ** month_index * rng.uniform(0.9, 1.1)
+                if unit == "hours":
+                    qty = min(qty, high)
+                qty = round(qty) if qty >= 100 else round(qty, 2)
+                line = (f'{{"month": "{month}", "service": {q(service)}, '
+                        f'"resource_id": "{RESOURCE_PREFIXES[service]}-{seed:x}{index:07d}", '
+                        f'"region": {q(region)}, "usage_type": {q(usage_type)}, "usage_quantity": {qty}, '
+                        f'"unit": {q(unit)}, "cost_inr": {round(qty * price * scale, 2)}, "desc": {q(desc)}}}')
+                if json_lines:
+                    f.write(line + "\n")
+                else:
+                    f.write(("  " if written == 0 else ",\n  ") + line)
+                written += 1
+        if not json_lines:
+            f.write("\n]\n")
+    metrics.add_file_written(output_path)
+
+    print(f"✅ {os.path.basename(output_path)} generated with {written} records (local generator, seed={seed})")
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate synthetic billing data without the LLM.")
+    parser.add_argument("--data-dir", default="data", help="Directory holding project_profile.json")
+    parser.add_argument("--records", type=int, default=18, help="Total number of records")
+    parser.add_argument("--months", type=int, default=1, help="Number of billing months")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--start-month", default="2025-01", help="First month (YYYY-MM)")
+    parser.add_argument("--output", help="Output path (.json, .jsonl, optionally .gz)")
+    args = parser.parse_args()
+
+    generate_billing_local(args.data_dir, args.records, args.months, args.seed,
+                           args.output, args.start_month)
@@ -0,0 +1,185 @@
+import os
+import re
+import csv
+import json
+import gzip
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Characters read per step while scanning a JSON array
+READ_BLOCK_CHARS = 1024 * 1024
+
+_SEPARATORS = re.compile(r"[\s,]*")
+
+# A token cut off at the end of a block contains none of these
+_DELIMITERS = re.compile(r"[,\]}]")
+
+# Exchange rate applied to CUR line items billed in USD (override with USD_INR_RATE)
+USD_INR_RATE = float(os.getenv("USD_INR_RATE", "83.0"))
+
+# AWS Cost and Usage Report columns for each billing record field, in order of preference
+CUR_COLUMNS = {
+    "month": ("bill/BillingPeriodStartDate", "lineItem/UsageStartDate"),
+    "service": ("lineItem/ProductCode", "product/ProductName"),
+    "resource_id": ("lineItem/ResourceId",),
+    "region": ("product/region", "product/regionCode"),
+    "usage_type": ("lineItem/UsageType",),
+    "usage_quantity": ("lineItem/UsageAmount",),
+    "unit": ("pricing/unit",),
+    "cost_inr": ("lineItem/UnblendedCost", "lineItem/BlendedCost"),
+    "desc": ("lineItem/LineItemDescription",),
+}
+
+# CUR product codes mapped to the short service names used elsewhere
+CUR_SERVICE_NAMES = {
+    "AmazonEC2": "EC2",
+    "AmazonRDS": "RDS",
+    "AmazonS3": "S3",
+    "AWSLambda": "Lambda",
+    "AmazonCloudFront": "CloudFront",
+    "AmazonDynamoDB": "DynamoDB",
+    "AmazonCloudWatch": "CloudWatch",
+    "AWSELB": "Load Balancer",
+    "AmazonElastiCache": "ElastiCache",
+    "AmazonVPC": "VPC",
+}
+
+
+def detect_format(path: str) -> str:
+    """Return "json", "jsonl" or "csv" from the file name (ignoring .gz)."""
+    name = path[:-3] if path.endswith(".gz") else path
+    ext = os.path.splitext(name)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if ext == ".csv":
+        return "csv"
+    return "json"
+
+
+def open_text(path: str):
+    """Open a (possibly gzip-compressed) billing file for text reading."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def _iter_json_array(f):
+    """Yield elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip separators between elements
+        pos = _SEPARATORS.match(buf, pos).end()
+
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("Billing JSON file must contain a top-level array")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                # An element straddling the block boundary fails in its last token,
+                # which runs to the end of the buffer (or is a string still open).
+                # A delimiter after the error means the element itself is malformed:
+                # fail now rather than appending blocks until EOF.
+                if eof or (not e.msg.startswith("Unterminated string") and _DELIMITERS.search(buf, e.pos)):
+                    raise
+            else:
+                yield item
+                pos = end
+                continue
+
+        if eof:
+            raise ValueError("Billing JSON array is truncated")
+        block = f.read(READ_BLOCK_CHARS)
+        eof = not block
+        buf = buf[pos:] + block
+        pos = 0
+
+
+def _iter_json_lines(f):
+    for line_no, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_no}: {e}")
+
+
+def _to_number(value):
+    if value in (None, ""):
+        return 0
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+def _iter_csv(f):
+    reader = csv.DictReader(f)
+    header = reader.fieldnames or []
+
+    if "cost_inr" in header:
+        # CSV export of our own billing schema
+        for row in reader:
+            row["usage_quantity"] = _to_number(row.get("usage_quantity"))
+            row["cost_inr"] = _to_number(row.get("cost_inr"))
+            yield row
+        return
+
+    columns = {}
+    for field, candidates in CUR_COLUMNS.items():
+        columns[field] = next((c for c in candidates if c in header), None)
+    if columns["cost_inr"] is None:
+        raise ValueError("CSV has neither a cost_inr column nor a CUR lineItem/UnblendedCost column")
+    currency_column = "lineItem/CurrencyCode" if "lineItem/CurrencyCode" in header else None
+
+    for row in reader:
+        record = {field: (row.get(column) or "") if column else "" for field, column in columns.items()}
+        record["month"] = record["month"][:7]
+        record["service"] = CUR_SERVICE_NAMES.get(record["service"], record["service"])
+        record["usage_quantity"] = _to_number(record["usage_quantity"])
+        cost = _to_number(record["cost_inr"])
+        if currency_column and row.get(currency_column, "INR").upper() == "USD":
+            cost = round(cost * USD_INR_RATE, 2)
+        record["cost_inr"] = cost
+        yield record
+
+
+def iter_billing_records(path: str):
+    """
+    Yield billing records one at a time from a JSON array, JSON Lines or
+    CUR-style CSV file, optionally gzip-compressed.
+    """
+    fmt = detect_format(path)
+    with open_text(path) as f:
+        if fmt == "jsonl":
+            yield from _iter_json_lines(f)
+        elif fmt == "csv":
+            yield from _iter_csv(f)
+        else:
+            yield from _iter_json_array(f)
+
+
+def iter_billing_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Yield lists of at most chunk_size billing records from path, so callers
+    can aggregate files of any size with bounded memory.
+    """
+    chunk = []
+    for record in iter_billing_records(path):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
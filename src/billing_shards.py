@@ -0,0 +1,117 @@
+import os
+import glob
+import errno
+import time
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from src.billing_columns import CostAggregator, TopRecords, TopResources
+from src.billing_reader import iter_billing_chunks, DEFAULT_CHUNK_SIZE
+from src.recommendation_rules import RuleEngine
+from src.price_catalog import ScenarioSimulator
+from src.anomaly_detector import AnomalyDetector
+from src.schemas import validate_billing_records
+
+# Worker processes for multi-file billing aggregation (0: one per CPU)
+BILLING_WORKERS = int(os.getenv("BILLING_WORKERS", "0")) or os.cpu_count() or 1
+
+# Below this much (estimated uncompressed) billing input, files are parsed in
+# this process: starting a pool and shipping shards back costs more than it saves
+BILLING_PARALLEL_MIN_BYTES = int(os.getenv("BILLING_PARALLEL_MIN_BYTES", str(32 * 1024 * 1024)))
+
+# Typical compression ratio of gzipped JSON/CSV billing exports
+GZIP_SIZE_FACTOR = 8
+
+
+class BillingShard:
+    """
+    Mergeable partial aggregates of one billing file, built in a worker process.
+
+    Costs are kept in integer paise and usage in integer USAGE_SCALE units,
+    and top records are renumbered on merge, so merging shards in file
+    order gives the same result however many processes built them, and the
+    same as one pass over the files in that order.
+    """
+
+    def __init__(self, path: str, top_k: int):
+        self.path = path
+        self.aggregator = CostAggregator()
+        self.rules = RuleEngine()
+        self.top_records = TopRecords(top_k)
+        self.top_resources = TopResources()
+        self.simulator = ScenarioSimulator()
+        self.anomalies = AnomalyDetector()
+        self.seconds = 0.0
+
+    def add_records(self, records) -> None:
+        self.aggregator.add_records(records)
+        for consumer in (self.rules, self.top_records, self.top_resources, self.simulator, self.anomalies):
+            consumer.add_records(records)
+
+
+def aggregate_shard(path: str, top_k: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> BillingShard:
+    """Read and validate one billing file into a BillingShard (runs in a worker process)."""
+    shard = BillingShard(path, top_k)
+    started = time.perf_counter()
+    for chunk in iter_billing_chunks(path, chunk_size):
+        try:
+            validate_billing_records(chunk, start=shard.aggregator.rows)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}")
+        shard.add_records(chunk)
+    shard.seconds = time.perf_counter() - started
+    return shard
+
+
+def expand_billing_paths(patterns) -> list:
+    """
+    Billing files for a path, glob or list of them: each glob's matches
+    sorted, duplicates dropped, order otherwise kept.
+    """
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    paths = {}
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            raise FileNotFoundError(errno.ENOENT, "No billing files match", pattern)
+        paths.update(dict.fromkeys(matches))
+    return list(paths)
+
+
+def input_bytes(paths) -> int:
+    """Estimated uncompressed size of billing files (gzipped ones scaled by GZIP_SIZE_FACTOR)."""
+    total = 0
+    for path in paths:
+        size = os.path.getsize(path)
+        total += size * GZIP_SIZE_FACTOR if path.endswith(".gz") else size
+    return total
+
+
+def shard_workers(paths, workers: int = BILLING_WORKERS) -> int:
+    """
+    Processes iter_shards will use: at most one per file and per CPU, and
+    1 when the input is under BILLING_PARALLEL_MIN_BYTES.
+    """
+    workers = max(1, min(workers, len(paths), os.cpu_count() or 1))
+    if workers > 1 and input_bytes(paths) < BILLING_PARALLEL_MIN_BYTES:
+        return 1
+    return workers
+
+
+def iter_shards(paths, top_k: int, workers: int = BILLING_WORKERS, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Yield one BillingShard per billing file, in the order of paths.
+
+    Files are parsed and aggregated by a pool of worker processes, or in
+    this process when shard_workers() gives 1 (a single file or CPU, or a
+    small input); shards are yielded as soon as they and every file before
+    them are done.
+    """
+    paths = list(paths)
+    workers = shard_workers(paths, workers)
+    if workers == 1:
+        for path in paths:
+            yield aggregate_shard(path, top_k, chunk_size)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(aggregate_shard, paths, repeat(top_k), repeat(chunk_size))
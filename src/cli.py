@@ -1,17 +1,90 @@
 import json
 import os
-from src.profile_extractor import extract_project_profile
-from src.billing_generator import generate_billing
-from src.cost_analyzer import analyze_cost
+import sys
+import glob
+import argparse
+import itertools
+import contextlib
 
-def view_recommendations():
-    """Display recommendations from the cost optimization report."""
-    try:
-        with open("data/cost_optimization_report.json", "r", encoding="utf-8") as f:
-            report = json.load(f)
-    except FileNotFoundError:
-        print("❌ No cost optimization report found. Please run 'Complete Cost Analysis' first.")
-        return
+# The pipeline, LLM client and NumPy are imported only by the commands that
+# need them, so describe/view/export start fast and work without HF_API_KEY.
+
+DEFAULT_DATA_DIR = "data"
+REPORT_FILENAME = "cost_optimization_report.json"
+
+# Runs listed by `history` (kept here so building the parser imports nothing)
+HISTORY_LIST_LIMIT = 20
+
+
+def save_description(description: str, data_dir: str = DEFAULT_DATA_DIR) -> str:
+    """Write the project description into data_dir and return its path."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, "project_description.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(description)
+    return path
+
+
+def run_analysis(data_dir: str = DEFAULT_DATA_DIR, stream: bool = None, force: bool = False,
+                 profile: bool = False, metrics_file: str = None, billing_files=None, workers: int = None,
+                 use_llm: bool = True) -> dict:
+    """
+    Run the pipeline on data_dir, print LLM cache/call statistics (and the
+    stage profile if asked) and return the report.
+
+    billing_files (paths or globs) are analysed instead of a generated
+    mock_billing.json, parsed by `workers` processes (default: BILLING_WORKERS).
+    With use_llm=False the report has only rule-based recommendations.
+    """
+    from src.pipeline import run_pipeline
+    from src.billing_shards import BILLING_WORKERS
+    from src.llm_cache import CACHE_STATS
+    from src.llm_client import CALL_METRICS, JSON_REPAIRS, STREAM_OUTPUT
+    from src import metrics
+
+    first_record = len(metrics.STAGE_METRICS)
+    run_pipeline(data_dir, force=force, stream=STREAM_OUTPUT if stream is None else stream,
+                 billing_files=billing_files, workers=workers or BILLING_WORKERS, use_llm=use_llm)
+
+    print("\n" + "="*50)
+    print("✅ Complete Cost Analysis finished successfully!")
+    print("="*50)
+    print(f"LLM cache: {CACHE_STATS['hits']} hits, {CACHE_STATS['misses']} misses")
+    if CALL_METRICS:
+        latency = sum(m["latency_s"] for m in CALL_METRICS)
+        retries = sum(m["retries"] for m in CALL_METRICS)
+        print(f"LLM calls: {len(CALL_METRICS)} ({latency:.1f}s total, {retries} retries)")
+        CALL_METRICS.clear()
+    if JSON_REPAIRS:
+        repairs = ", ".join(f"{name} x{count}" for name, count in JSON_REPAIRS.items())
+        print(f"LLM JSON repairs: {repairs}")
+        JSON_REPAIRS.clear()
+    if profile:
+        print("\nProfile:")
+        print(metrics.format_profile(metrics.STAGE_METRICS[first_record:]))
+    if metrics_file:
+        metrics.write_metrics(metrics_file)
+        print(f"Metrics written to {metrics_file}")
+
+    with open(os.path.join(data_dir, REPORT_FILENAME), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _period(analysis: dict) -> str:
+    """Unit of portfolio and what-if costs, which cover every month of the billing data."""
+    months = analysis.get("billing_months", 1)
+    return "/month" if months == 1 else f" over {months} months"
+
+
+def view_recommendations(report_path: str = os.path.join(DEFAULT_DATA_DIR, REPORT_FILENAME), report: dict = None):
+    """Display recommendations from the cost optimization report (or an already loaded report)."""
+    if report is None:
+        try:
+            with open(report_path, "r", encoding="utf-8") as f:
+                report = json.load(f)
+        except FileNotFoundError:
+            print("❌ No cost optimization report found. Please run 'Complete Cost Analysis' first.")
+            return
     
     analysis = report.get("analysis", {})
     recommendations = report.get("recommendations", [])
@@ -21,12 +94,38 @@ def view_recommendations():
     print(f"Project: {report.get('project_name', 'N/A')}")
     print("="*70)
     print(f"\nCost Analysis:")
-    print(f"  Total Monthly Cost: ₹{analysis.get('total_monthly_cost', 0)}")
+    if analysis.get("billing_months", 1) > 1:
+        print(f"  Total Cost: ₹{analysis.get('total_cost', 0)} over {analysis['billing_months']} months "
+              f"(average ₹{analysis.get('average_monthly_cost', 0)}/month)")
+    latest = f" ({analysis['latest_month']})" if analysis.get("latest_month") else ""
+    print(f"  Total Monthly Cost{latest}: ₹{analysis.get('total_monthly_cost', 0)}")
     print(f"  Budget: ₹{analysis.get('budget', 0)}")
     print(f"  Variance: ₹{analysis.get('budget_variance', 0)} ({'Over' if analysis.get('is_over_budget') else 'Under'} budget)")
+    forecast = analysis.get("trends", {}).get("forecast")
+    if forecast:
+        print(f"  Forecast ({forecast['month']}): ₹{forecast['forecast_cost']} ({'Over' if forecast['forecast_over_budget'] else 'Under'} budget)")
     print(f"\nPotential Savings: ₹{summary.get('total_potential_savings', 0)} ({summary.get('savings_percentage', 0)}%)")
     print(f"Total Recommendations: {summary.get('recommendations_count', 0)}")
-    
+    portfolio = report.get("portfolio")
+    if portfolio:
+        chosen = ", ".join(f"#{i + 1}" for i in portfolio["selected"]) or "none"
+        print(f"Suggested Portfolio ({chosen}): saves ₹{portfolio['total_savings']} -> "
+              f"₹{portfolio['projected_monthly_cost']}{_period(analysis)} "
+              f"({'within' if portfolio['meets_budget'] else 'still over'} budget)")
+    what_if = analysis.get("what_if")
+    if what_if and what_if.get("scenarios"):
+        cheapest = what_if["scenarios"][0]
+        print(f"Cheapest What-If ({what_if['scenarios_evaluated']} scenarios): {cheapest['name']} "
+              f"-> ₹{cheapest['total_cost']}{_period(analysis)} (saves ₹{cheapest['savings']})")
+    anomalies = report.get("anomalies")
+    if anomalies and anomalies.get("items"):
+        print(f"\nCost Anomalies ({anomalies['count']}):")
+        for item in anomalies["items"][:5]:
+            unit = "₹" if item["metric"] == "cost" else ""
+            print(f"  ⚠️ {item['resource_id']} ({item['service']}, {item['month']}): {item['metric']} "
+                  f"{unit}{item['value']} vs {unit}{item['expected']} expected from {item['compared_with']} "
+                  f"(z={item['z_score']})")
+
     print("\n" + "-"*70)
     print("RECOMMENDATIONS:")
     print("-"*70)
@@ -35,7 +134,8 @@ def view_recommendations():
         print(f"\n{i}. {rec.get('title', 'N/A')}")
         print(f"   Service: {rec.get('service', 'N/A')}")
         print(f"   Current Cost: ₹{rec.get('current_cost', 0)}")
-        print(f"   Potential Savings: ₹{rec.get('potential_savings', 0)}")
+        priced = f" (priced: {rec['pricing_scenario']})" if rec.get("pricing_scenario") else ""
+        print(f"   Potential Savings: ₹{rec.get('potential_savings', 0)}{priced}")
         print(f"   Type: {rec.get('recommendation_type', 'N/A')}")
         print(f"   Effort: {rec.get('implementation_effort', 'N/A')} | Risk: {rec.get('risk_level', 'N/A')}")
         print(f"   Description: {rec.get('description', 'N/A')}")
@@ -44,66 +144,36 @@ def view_recommendations():
         for step in rec.get('steps', []):
             print(f"     - {step}")
 
-def export_report():
+def export_report(report_path: str = os.path.join(DEFAULT_DATA_DIR, REPORT_FILENAME),
+                  output_file: str = os.path.join(DEFAULT_DATA_DIR, "cost_optimization_report.txt")):
     """Export the cost optimization report to a readable format."""
+    from src.exporters import TextExporter
+
     try:
-        with open("data/cost_optimization_report.json", "r", encoding="utf-8") as f:
+        with open(report_path, "r", encoding="utf-8") as f:
             report = json.load(f)
     except FileNotFoundError:
         print("❌ No cost optimization report found. Please run 'Complete Cost Analysis' first.")
         return
-    
-    # Export as text file
-    output_file = "data/cost_optimization_report.txt"
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("="*70 + "\n")
-        f.write(f"COST OPTIMIZATION REPORT\n")
-        f.write("="*70 + "\n\n")
-        f.write(f"Project: {report.get('project_name', 'N/A')}\n\n")
-        
-        analysis = report.get("analysis", {})
-        f.write("COST ANALYSIS\n")
-        f.write("-"*70 + "\n")
-        f.write(f"Total Monthly Cost: ₹{analysis.get('total_monthly_cost', 0)}\n")
-        f.write(f"Budget: ₹{analysis.get('budget', 0)}\n")
-        f.write(f"Budget Variance: ₹{analysis.get('budget_variance', 0)}\n")
-        f.write(f"Status: {'OVER BUDGET' if analysis.get('is_over_budget') else 'WITHIN BUDGET'}\n\n")
-        
-        f.write("Service Costs:\n")
-        for service, cost in analysis.get('service_costs', {}).items():
-            f.write(f"  {service}: ₹{cost}\n")
-        f.write("\n")
-        
-        summary = report.get("summary", {})
-        f.write("SUMMARY\n")
-        f.write("-"*70 + "\n")
-        f.write(f"Total Potential Savings: ₹{summary.get('total_potential_savings', 0)}\n")
-        f.write(f"Savings Percentage: {summary.get('savings_percentage', 0)}%\n")
-        f.write(f"Recommendations Count: {summary.get('recommendations_count', 0)}\n\n")
-        
-        recommendations = report.get("recommendations", [])
-        f.write("RECOMMENDATIONS\n")
-        f.write("-"*70 + "\n\n")
-        
-        for i, rec in enumerate(recommendations, 1):
-            f.write(f"{i}. {rec.get('title', 'N/A')}\n")
-            f.write(f"   Service: {rec.get('service', 'N/A')}\n")
-            f.write(f"   Current Cost: ₹{rec.get('current_cost', 0)}\n")
-            f.write(f"   Potential Savings: ₹{rec.get('potential_savings', 0)}\n")
-            f.write(f"   Type: {rec.get('recommendation_type', 'N/A')}\n")
-            f.write(f"   Implementation Effort: {rec.get('implementation_effort', 'N/A')}\n")
-            f.write(f"   Risk Level: {rec.get('risk_level', 'N/A')}\n")
-            f.write(f"   Description: {rec.get('description', 'N/A')}\n")
-            f.write(f"   Cloud Providers: {', '.join(rec.get('cloud_providers', []))}\n")
-            f.write(f"   Implementation Steps:\n")
-            for step in rec.get('steps', []):
-                f.write(f"     - {step}\n")
-            f.write("\n")
-    
+
+    exporter = TextExporter(output_file, suffix="")
+    exporter.begin()
+    try:
+        exporter.write_report(report)
+    finally:
+        exporter.close()
+
     print(f"✅ Report exported to {output_file}")
+    return output_file
 
-def menu():
-    """Main CLI menu for Cloud Cost Optimizer."""
+def menu(profile: bool = False, metrics_file: str = None):
+    """
+    Main CLI menu for Cloud Cost Optimizer.
+
+    Args:
+        profile (bool): Print a per-stage profile after each analysis run
+        metrics_file (str): Rewrite this metrics file (.json, else Prometheus text) after each run
+    """
     while True:
         print("\n" + "="*50)
         print("   Cloud Cost Optimizer (LLM-Driven)")
@@ -135,30 +205,14 @@ def menu():
                 print("❌ Project description cannot be empty.")
                 continue
             
-            # Ensure data directory exists
-            os.makedirs("data", exist_ok=True)
-            
-            with open("data/project_description.txt", "w", encoding="utf-8") as f:
-                f.write(description)
-            
-            print("✅ Project description saved to data/project_description.txt")
+            path = save_description(description)
+            print(f"✅ Project description saved to {path}")
 
         elif choice == "2":
             print("\n🔄 Running Complete Cost Analysis...")
             print("-"*50)
             try:
-                print("\nStep 1: Extracting project profile...")
-                extract_project_profile()
-                
-                print("\nStep 2: Generating synthetic billing data...")
-                generate_billing()
-                
-                print("\nStep 3: Analyzing costs and generating recommendations...")
-                analyze_cost()
-                
-                print("\n" + "="*50)
-                print("✅ Complete Cost Analysis finished successfully!")
-                print("="*50)
+                run_analysis(profile=profile, metrics_file=metrics_file)
             except Exception as e:
                 print(f"\n❌ Error during analysis: {e}")
                 print("Please check your inputs and try again.")
@@ -174,3 +228,426 @@ def menu():
             break
         else:
             print("❌ Invalid option. Please choose 1-5.")
+
+
+# -------------------------------
+# Non-interactive subcommands
+# -------------------------------
+def _cmd_describe(args):
+    if args.text is not None:
+        description = args.text
+    elif args.file and args.file != "-":
+        with open(args.file, "r", encoding="utf-8") as f:
+            description = f.read()
+    else:
+        description = sys.stdin.read()
+    description = description.strip()
+    if not description:
+        raise ValueError("Project description cannot be empty.")
+
+    path = save_description(description, args.data_dir)
+    print(f"✅ Project description saved to {path}")
+    return 0, {"description_path": path, "chars": len(description)}
+
+
+def _cmd_analyze(args):
+    report = run_analysis(args.data_dir, stream=args.stream or None, force=args.force,
+                          profile=args.profile, metrics_file=args.metrics_file,
+                          billing_files=args.billing, workers=args.workers, use_llm=not args.no_llm)
+    return 0, report
+
+
+def _open_history(data_dir: str):
+    from src.report_history import HISTORY_DB_FILENAME, connect
+
+    history_path = os.path.join(data_dir, HISTORY_DB_FILENAME)
+    if not os.path.exists(history_path):
+        raise FileNotFoundError(f"{history_path} not found. Run 'analyze' first.")
+    return contextlib.closing(connect(history_path))
+
+
+def _cmd_view(args):
+    if args.run:
+        from src.report_history import resolve_run, get_run
+
+        with _open_history(args.data_dir) as conn:
+            report = get_run(conn, resolve_run(conn, args.run))["report"]
+    else:
+        report_path = args.report or os.path.join(args.data_dir, REPORT_FILENAME)
+        with open(report_path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+    if not args.json:
+        view_recommendations(report=report)
+    return 0, report
+
+
+def _cmd_export(args):
+    formats = [name.strip() for value in (args.format or ["txt"]) for name in value.split(",") if name.strip()]
+    patterns = args.report or ([] if args.run else [os.path.join(args.data_dir, REPORT_FILENAME)])
+
+    if not args.run and formats == ["txt"] and len(patterns) == 1 and not glob.has_magic(patterns[0]):
+        report_path = patterns[0]
+        output_file = args.output or os.path.join(args.data_dir, "cost_optimization_report.txt")
+        if not os.path.exists(report_path):
+            raise FileNotFoundError(f"{report_path} not found. Run 'analyze' first.")
+        export_report(report_path, output_file)
+        return 0, {"report_path": report_path, "output_path": output_file}
+
+    from src.exporters import export_reports
+
+    report_paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        if not all(os.path.exists(path) for path in matches) or not matches:
+            raise FileNotFoundError(f"{pattern} matched no report files")
+        report_paths.extend(matches)
+    output_base = args.output or os.path.join(args.data_dir, "cost_optimization_report")
+    run_ids = []
+    with contextlib.ExitStack() as stack:
+        reports = report_paths
+        if args.run:
+            from src.report_history import resolve_run, get_run
+
+            conn = stack.enter_context(_open_history(args.data_dir))
+            run_ids = [resolve_run(conn, ref) for ref in args.run]
+            # Runs are fetched one at a time as the exporters consume them
+            reports = itertools.chain(report_paths, (get_run(conn, run_id)["report"] for run_id in run_ids))
+        written = export_reports(reports, output_base, formats)
+    print(f"✅ Exported {len(report_paths) + len(run_ids)} report(s) to:")
+    for path in written:
+        print(f"   {path}")
+    return 0, {"report_paths": report_paths, "run_ids": run_ids, "output_paths": written}
+
+
+def _cmd_optimize(args):
+    from src.savings_optimizer import optimize_portfolio
+
+    report_path = args.report or os.path.join(args.data_dir, REPORT_FILENAME)
+    if not os.path.exists(report_path):
+        raise FileNotFoundError(f"{report_path} not found. Run 'analyze' first.")
+    with open(report_path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+
+    analysis = report.get("analysis", {})
+    recommendations = report.get("recommendations", [])
+    portfolio = optimize_portfolio(recommendations, analysis.get("service_costs", {}),
+                                   analysis.get("total_cost", analysis.get("total_monthly_cost", 0)),
+                                   analysis.get("budget", 0) * analysis.get("billing_months", 1),
+                                   max_effort=args.max_effort, max_risk=args.max_risk)
+
+    print(f"Portfolio (effort <= {args.max_effort}, risk <= {args.max_risk}; "
+          f"{portfolio['excluded']} recommendation(s) excluded):")
+    for i in portfolio["selected"]:
+        rec = recommendations[i]
+        print(f"  #{i + 1} {rec.get('title', 'N/A')} [{rec.get('service', 'N/A')}, "
+              f"effort {rec.get('implementation_effort', 'N/A')}, risk {rec.get('risk_level', 'N/A')}]")
+    print(f"Savings: ₹{portfolio['total_savings']} (needed ₹{portfolio['savings_needed']})")
+    print(f"Projected cost: ₹{portfolio['projected_monthly_cost']}{_period(analysis)} vs budget ₹{portfolio['budget']} "
+          f"({'within' if portfolio['meets_budget'] else 'still over'} budget)")
+
+    if args.save:
+        report["portfolio"] = portfolio
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"✅ Portfolio saved to {report_path}")
+    return 0, portfolio
+
+
+def _cmd_query(args):
+    from src.cost_analyzer import query_costs
+
+    rows = query_costs(
+        args.data_dir, billing_paths=args.add or None, group_by=args.group_by, month=args.month,
+        service=args.service, region=args.region, resource_id=args.resource_id, usage_type=args.usage_type,
+        min_usage=args.min_usage, min_cost=args.min_cost, limit=args.limit or None,
+    )
+    if not args.json:
+        if not rows:
+            print("No matching billing records.")
+        for row in rows:
+            key = "  ".join(str(row[column]) for column in row
+                            if column not in ("cost_inr", "usage_quantity", "line_items"))
+            usage = "" if row["usage_quantity"] is None else f"{row['usage_quantity']:,}"
+            print(f"₹{row['cost_inr']:>14,}  {usage:>14}  {key}")
+    return 0, rows
+
+
+def _cmd_whatif(args):
+    from src.cost_analyzer import simulate_scenarios
+    from src.price_catalog import PRICE_CATALOG_PATH
+
+    results = simulate_scenarios(args.data_dir, billing_path=args.billing, scenarios_path=args.scenarios,
+                                 catalog_path=args.catalog or PRICE_CATALOG_PATH)
+    results = results[:args.limit] if args.limit else results
+    if not args.json:
+        for result in results:
+            print(f"₹{result['total_cost']:>14,}  saves ₹{result['savings']:>12,}  {result['name']}")
+    return 0, results
+
+
+def _print_change(label: str, change: dict) -> None:
+    print(f"{label}: ₹{change['old']} -> ₹{change['new']} ({change['delta']:+,.2f})")
+
+
+def _cmd_history(args):
+    from src.report_history import list_runs, resolve_run, get_run, previous_run, diff_runs
+
+    with _open_history(args.data_dir) as conn:
+        if args.history_command == "show":
+            run = get_run(conn, resolve_run(conn, args.run, args.project))
+            if not args.json:
+                print(f"Run #{run['run_id']} ({run['created_at']})")
+                view_recommendations(report=run["report"])
+            return 0, run
+
+        if args.history_command == "diff":
+            new_id = resolve_run(conn, args.new, args.project)
+            old_id = resolve_run(conn, args.old, args.project) if args.old else previous_run(conn, new_id)
+            if old_id is None:
+                raise LookupError(f"Run {new_id} is the first run of its project: nothing to diff against")
+            diff = diff_runs(conn, old_id, new_id)
+            if not args.json:
+                old, new = diff["old_run"], diff["new_run"]
+                print(f"Run #{old['run_id']} ({old['created_at']}) -> #{new['run_id']} ({new['created_at']})")
+                _print_change("Total monthly cost", diff["total_monthly_cost"])
+                _print_change("Budget variance", diff["budget_variance"])
+                _print_change("Potential savings", diff["total_potential_savings"])
+                costs = diff["service_costs"]
+                print(f"\nService costs ({costs['unchanged']} unchanged):")
+                for service, cost in costs["added"].items():
+                    print(f"  + {service}: ₹{cost}")
+                for service, cost in costs["removed"].items():
+                    print(f"  - {service}: ₹{cost}")
+                for service, change in costs["changed"].items():
+                    print(f"  ~ {service}: ₹{change['old']} -> ₹{change['new']} ({change['delta']:+,.2f})")
+                recs = diff["recommendations"]
+                print(f"\nRecommendations ({recs['unchanged']} unchanged):")
+                for sign, key in (("+", "added"), ("-", "removed")):
+                    for rec in recs[key]:
+                        print(f"  {sign} {rec['title']} [{rec['service']}] (save ₹{rec['potential_savings']})")
+                for rec in recs["changed"]:
+                    change = rec["potential_savings"]
+                    print(f"  ~ {rec['title']} [{rec['service']}]: save ₹{change['old']} -> ₹{change['new']}")
+            return 0, diff
+
+        runs = list_runs(conn, args.project, args.limit)
+        if not args.json:
+            if not runs:
+                print("No runs in the report history.")
+            for run in runs:
+                print(f"#{run['run_id']:<5} {run['created_at']}  ₹{run['total_cost']:>12,}  "
+                      f"variance ₹{run['budget_variance']:>12,}  {run['recommendations']:>2} rec(s) "
+                      f"save ₹{run['potential_savings']:>10,}  {run['project']}")
+        return 0, runs
+
+
+def _cmd_serve(args):
+    from src.service import serve, SERVICE_WORKERS, SERVICE_QUEUE
+
+    serve(args.host, args.port, args.data_dir, args.workers or SERVICE_WORKERS, args.queue or SERVICE_QUEUE)
+    return 0, None
+
+
+def _cmd_batch(args):
+    from src.batch import run_batch, DEFAULT_CONCURRENCY
+    from src import metrics
+
+    concurrency = DEFAULT_CONCURRENCY if args.concurrency is None else args.concurrency
+    if concurrency < 1:
+        raise ValueError("--concurrency must be at least 1")
+    results = run_batch(args.input_dir, args.output_dir, concurrency, use_llm=not args.no_llm)
+    if args.profile:
+        print("\nProfile (all projects):")
+        print(metrics.format_profile())
+    if args.metrics_file:
+        metrics.write_metrics(args.metrics_file)
+        print(f"Metrics written to {args.metrics_file}")
+    return (0 if all(r["status"] == "ok" for r in results) else 1), results
+
+
+def _common_options(keep_earlier: bool = False) -> argparse.ArgumentParser:
+    """
+    --data-dir and --json, shared by every subcommand.
+
+    Args:
+        keep_earlier (bool): Leave the options unset when absent, so values
+            given before a nested subcommand (`history --data-dir X list`) stand
+    """
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument("--data-dir", default=argparse.SUPPRESS if keep_earlier else DEFAULT_DATA_DIR,
+                         help=f"Directory for pipeline inputs and outputs (default: {DEFAULT_DATA_DIR})")
+    options.add_argument("--json", action="store_true", default=argparse.SUPPRESS if keep_earlier else False,
+                         help="Print a JSON result to stdout; progress messages go to stderr")
+    return options
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Cloud Cost Optimizer. Run without a command for the interactive menu."
+    )
+    common = _common_options()
+    profiling = argparse.ArgumentParser(add_help=False)
+    profiling.add_argument("--profile", action="store_true",
+                           help="Print per-stage timings, token usage and I/O")
+    profiling.add_argument("--metrics-file",
+                           help="Write stage metrics here (.json, otherwise Prometheus text)")
+
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    describe = commands.add_parser("describe", parents=[common], help="Save a project description")
+    source = describe.add_mutually_exclusive_group()
+    source.add_argument("--text", help="Description text")
+    source.add_argument("--file", help="Read the description from this file ('-' for stdin, the default)")
+    describe.set_defaults(handler=_cmd_describe)
+
+    analyze = commands.add_parser("analyze", parents=[common, profiling],
+                                  help="Run profile extraction, billing generation and cost analysis")
+    analyze.add_argument("--force", action="store_true", help="Rerun every stage even if inputs are unchanged")
+    analyze.add_argument("--stream", action="store_true", help="Stream LLM output as it is generated")
+    analyze.add_argument("--billing", action="append", metavar="FILE_OR_GLOB",
+                         help="Analyse these billing files instead of generating mock_billing.json; "
+                              "repeat or use a glob for many files")
+    analyze.add_argument("--workers", type=int,
+                         help="Processes parsing --billing files in parallel (default: BILLING_WORKERS or one per CPU)")
+    analyze.add_argument("--no-llm", action="store_true",
+                         help="Keep only the rule-based recommendations; the analysis makes no LLM call")
+    analyze.set_defaults(handler=_cmd_analyze)
+
+    view = commands.add_parser("view", parents=[common], help="Show the recommendations report")
+    view_source = view.add_mutually_exclusive_group()
+    view_source.add_argument("--report", help="Report JSON (default: <data-dir>/cost_optimization_report.json)")
+    view_source.add_argument("--run", help="Show this run from the report history (id, latest, previous or -N)")
+    view.set_defaults(handler=_cmd_view)
+
+    export = commands.add_parser("export", parents=[common],
+                                 help="Export one or more reports as txt, csv, md, html or columnar")
+    export.add_argument("--report", action="append",
+                        help="Report JSON or glob; repeat to combine reports into one export "
+                             "(default: <data-dir>/cost_optimization_report.json)")
+    export.add_argument("--run", action="append",
+                        help="Report history run (id, latest, previous or -N); repeat to export several")
+    export.add_argument("--format", "-f", action="append",
+                        help="Output format(s), comma-separated or repeated: txt, csv, md, html, columnar "
+                             "(default: txt)")
+    export.add_argument("--output", "-o",
+                        help="Output file for a single text export, otherwise the output path without "
+                             "extension (default: <data-dir>/cost_optimization_report)")
+    export.set_defaults(handler=_cmd_export)
+
+    optimize = commands.add_parser("optimize", parents=[common],
+                                   help="Choose the least-effort recommendations that meet the budget")
+    optimize.add_argument("--report", help="Report JSON (default: <data-dir>/cost_optimization_report.json)")
+    optimize.add_argument("--max-effort", default="high", choices=["low", "medium", "high"],
+                          help="Exclude recommendations above this implementation effort (default: high)")
+    optimize.add_argument("--max-risk", default="high", choices=["low", "medium", "high"],
+                          help="Exclude recommendations above this risk level (default: high)")
+    optimize.add_argument("--save", action="store_true", help="Store the result as the report's portfolio")
+    optimize.set_defaults(handler=_cmd_optimize)
+
+    query = commands.add_parser("query", parents=[common],
+                                help="Query billing costs by resource, service, region or month")
+    query.add_argument("--add", nargs="+", metavar="BILLING_FILE",
+                       help="Index these billing files first (default: <data-dir>/mock_billing.json); "
+                            "unchanged files are skipped")
+    query.add_argument("--group-by", default="resource",
+                       choices=["resource", "resource_month", "service", "region", "month", "usage_type"],
+                       help="Rows to report (default: resource)")
+    query.add_argument("--month", help="Only this month (YYYY-MM)")
+    query.add_argument("--service", help="Only this service")
+    query.add_argument("--region", help="Only this region")
+    query.add_argument("--resource-id", help="Only this resource")
+    query.add_argument("--usage-type", help="Only this usage type")
+    query.add_argument("--min-usage", type=float,
+                       help="Only groups with at least this much usage_quantity (resource, resource_month "
+                            "and usage_type groupings)")
+    query.add_argument("--min-cost", type=float, help="Only groups costing at least this many INR")
+    query.add_argument("--limit", type=int, default=20, help="Maximum rows, 0 for all (default: 20)")
+    query.set_defaults(handler=_cmd_query)
+
+    whatif = commands.add_parser("whatif", parents=[common],
+                                 help="Reprice the billing under other providers, regions and pricing tiers")
+    whatif.add_argument("--billing", help="Billing file (default: <data-dir>/mock_billing.json)")
+    whatif.add_argument("--scenarios", help="JSON list of scenarios with provider, region, tier, services "
+                                            "(default: every catalog combination)")
+    whatif.add_argument("--catalog", help="Price catalog (default: data/price_catalog.json)")
+    whatif.add_argument("--limit", type=int, default=20, help="Cheapest scenarios shown, 0 for all (default: 20)")
+    whatif.set_defaults(handler=_cmd_whatif)
+
+    # Bare `history` lists runs. Options may go before or after the action;
+    # after it they are left unset when absent, keeping any given before it.
+    project_help = "Only this project's runs (also scopes latest, previous and -N)"
+    limit_help = f"Runs shown, 0 for all (default: {HISTORY_LIST_LIMIT})"
+    history = commands.add_parser("history", parents=[common], help="List, show and diff earlier analysis runs")
+    history.add_argument("--project", help=project_help)
+    history.add_argument("--limit", type=int, default=HISTORY_LIST_LIMIT, help=limit_help)
+    history.set_defaults(handler=_cmd_history)
+    action_options = _common_options(keep_earlier=True)
+    action_options.add_argument("--project", default=argparse.SUPPRESS, help=project_help)
+    runs = history.add_subparsers(dest="history_command", metavar="action")
+    history_list = runs.add_parser("list", parents=[action_options], help="List runs, newest first (the default)")
+    history_list.add_argument("--limit", type=int, default=argparse.SUPPRESS, help=limit_help)
+    history_show = runs.add_parser("show", parents=[action_options], help="Show one run's report")
+    history_show.add_argument("run", nargs="?", default="latest",
+                              help="Run id, latest, previous or -N (default: latest)")
+    history_diff = runs.add_parser("diff", parents=[action_options],
+                                   help="Compare service costs, budget variance and recommendations of two runs")
+    history_diff.add_argument("old", nargs="?",
+                              help="Earlier run (default: the run before NEW of the same project)")
+    history_diff.add_argument("new", nargs="?", default="latest", help="Later run (default: latest)")
+
+    serve = commands.add_parser("serve", parents=[common],
+                                help="Serve analysis, recommendations and reports over HTTP with warm state")
+    serve.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8000, help="Port (default: 8000)")
+    serve.add_argument("--workers", type=int,
+                       help="Requests handled at once (default: SERVICE_WORKERS or 4)")
+    serve.add_argument("--queue", type=int,
+                       help="Requests allowed to wait for a worker before 503 (default: SERVICE_QUEUE or 16)")
+    serve.set_defaults(handler=_cmd_serve)
+
+    batch = commands.add_parser("batch", parents=[common, profiling],
+                                help="Analyse every *.txt description in a directory")
+    batch.add_argument("input_dir", help="Directory containing one .txt description per project")
+    batch.add_argument("output_dir", help="Directory to write one sub-directory of results per project")
+    batch.add_argument("--concurrency", type=int,
+                       help="Maximum projects analysed at once (default: batch.DEFAULT_CONCURRENCY, 4)")
+    batch.add_argument("--no-llm", action="store_true",
+                       help="Keep only the rule-based recommendations; the analysis makes no LLM call")
+    batch.set_defaults(handler=_cmd_batch)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    """
+    Entry point for main.py. With a subcommand, run it non-interactively and
+    return the exit status; without one, start the interactive menu.
+
+    Each subcommand handler returns (exit status, JSON-serializable result);
+    with --json the result is the only thing written to stdout.
+    """
+    parser = build_parser()
+    # Menu-only flags, kept for `python main.py --profile`
+    parser.add_argument("--profile", dest="menu_profile", action="store_true",
+                        help="Menu: print a stage profile after each analysis")
+    parser.add_argument("--metrics-file", dest="menu_metrics_file",
+                        help="Menu: write stage metrics after each analysis")
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        menu(profile=args.menu_profile, metrics_file=args.menu_metrics_file)
+        return 0
+
+    try:
+        if args.json:
+            with contextlib.redirect_stdout(sys.stderr):
+                status, result = args.handler(args)
+            json.dump(result, sys.stdout, indent=2, ensure_ascii=False)
+            sys.stdout.write("\n")
+        else:
+            status, _ = args.handler(args)
+        return status
+    except Exception as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
@@ -1,59 +1,37 @@
+import os
 import json
-from collections import defaultdict
-from src.llm_client import call_llm
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.billing_columns import CostAggregator, TopRecords, TopResources
+from src.billing_reader import iter_billing_chunks, DEFAULT_CHUNK_SIZE
+from src.cost_trends import (HISTORY_FILENAME, load_history, save_history, record_file, prune_history,
+                             merged_month_service_paise, compute_trends)
+from src.cost_index import INDEX_FILENAME, update_index, query_index
+from src.anomaly_detector import (AnomalyDetector, ANOMALY_STATE_FILENAME, load_anomaly_state,
+                                  save_anomaly_state)
+from src.billing_shards import BILLING_WORKERS, expand_billing_paths, iter_shards, shard_workers
+from src.price_catalog import (PRICE_CATALOG_PATH, ScenarioSimulator, load_catalog, what_if_summary,
+                               ground_recommendations)
+from src.report_history import HISTORY_DB_FILENAME, record_run, recommendation_key
+from src.llm_client import call_llm, stream_llm
+from src.recommendation_rules import RuleEngine
+from src.savings_optimizer import combined_savings, optimize_portfolio
+from src.schemas import validate_billing_records, validate_recommendations
+from src import metrics
+from src.prompt_builder import compact_json, fit_prompt, PROMPT_TOKEN_BUDGET, ROW_LIMITS
 
-def analyze_cost():
-    """
-    Analyze costs and generate optimization recommendations.
-    Input: project_profile.json, mock_billing.json
-    Output: cost_optimization_report.json with analysis and detailed recommendations.
-    """
-    try:
-        with open("data/project_profile.json", "r") as f:
-            profile = json.load(f)
-    except FileNotFoundError:
-        raise FileNotFoundError("project_profile.json not found. Please run profile extraction first.")
+# Bump when the prompt or rules change so the pipeline reruns this stage
+PROMPT_VERSION = 4
 
-    try:
-        with open("data/mock_billing.json", "r") as f:
-            billing = json.load(f)
-    except FileNotFoundError:
-        raise FileNotFoundError("mock_billing.json not found. Please run billing generation first.")
-
-    # Calculate total cost
-    total_cost = sum(item["cost_inr"] for item in billing)
-
-    # Calculate service costs
-    service_costs = defaultdict(int)
-    for item in billing:
-        service_costs[item["service"]] += item["cost_inr"]
+MIN_RECOMMENDATIONS = 6
+MAX_RECOMMENDATIONS = 10
 
-    # Find high cost services (top 3)
-    sorted_services = sorted(service_costs.items(), key=lambda x: x[1], reverse=True)
-    high_cost_services = {service: cost for service, cost in sorted_services[:3]}
-
-    budget = profile["budget_inr_per_month"]
-    budget_variance = total_cost - budget
-    is_over_budget = total_cost > budget
-
-    analysis = {
-        "total_monthly_cost": total_cost,
-        "budget": budget,
-        "budget_variance": budget_variance,
-        "service_costs": dict(service_costs),
-        "high_cost_services": high_cost_services,
-        "is_over_budget": is_over_budget
-    }
-
-    # Generate recommendations using LLM
-    prompt = f"""You are a cloud cost optimization expert. Generate 6-10 detailed cost optimization recommendations.
-
-CRITICAL: Return ONLY the JSON object. Do not include any text before or after the JSON. Do not use markdown code blocks.
-
-Return ONLY a JSON object with this exact structure:
-{{
+# Output format shared by the single-call and per-service prompts
+RECOMMENDATION_FORMAT = """Return ONLY a JSON object with this exact structure:
+{
   "recommendations": [
-    {{
+    {
       "title": "<recommendation title>",
       "service": "<service name>",
       "current_cost": <number>,
@@ -64,67 +42,436 @@ Return ONLY a JSON object with this exact structure:
       "risk_level": "<low|medium|high>",
       "steps": ["step1", "step2", "step3"],
       "cloud_providers": ["AWS", "Azure", "GCP", "Open Source", ...]
-    }},
+    },
     ...
   ]
-}}
+}
+"""
+
+# Set LLM_SHARDED_RECOMMENDATIONS=1 to request recommendations per service in parallel
+SHARDED_RECOMMENDATIONS = os.getenv("LLM_SHARDED_RECOMMENDATIONS", "").lower() in ("1", "true", "yes")
+SHARD_WORKERS = int(os.getenv("LLM_SHARD_WORKERS", "4"))
+SHARD_MAX_TOKENS = 1200
+MIN_SHARDS = 3
+
+# Most expensive resources listed in the report's analysis section
+TOP_RESOURCES = 10
+
+
+def aggregate_billing(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, consumers=()) -> CostAggregator:
+    """
+    Aggregate a billing file (JSON array, JSON Lines or CUR CSV, optionally
+    gzipped) in a single streaming pass with bounded memory.
+
+    Each object in consumers (anything with add_records(chunk), e.g. a
+    RuleEngine) sees every chunk during the same pass.
+    """
+    aggregator = CostAggregator()
+    metrics.add_file_read(path)
+    started = time.perf_counter()
+    for chunk in iter_billing_chunks(path, chunk_size):
+        validate_billing_records(chunk, start=aggregator.rows)
+        aggregator.add_records(chunk)
+        for consumer in consumers:
+            consumer.add_records(chunk)
+    elapsed = time.perf_counter() - started
+
+    rate = aggregator.rows / elapsed if elapsed > 0 else 0
+    print(f"   Read {aggregator.rows:,} billing records in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    return aggregator
+
+
+def aggregate_billing_files(paths, rules: RuleEngine, top_records: TopRecords, anomalies: AnomalyDetector,
+                            simulator: ScenarioSimulator, history: dict = None, workers: int = BILLING_WORKERS,
+                            chunk_size: int = DEFAULT_CHUNK_SIZE, top_resources: TopResources = None) -> CostAggregator:
+    """
+    Aggregate many billing files, parsing them in a pool of worker processes.
+
+    Each worker turns one file into a BillingShard of partial totals. Shards
+    are merged here in file order into the returned aggregator and into
+    rules, top_records, anomalies, simulator and top_resources (the
+    consumers analyze_cost passes to aggregate_billing). Sums are integers
+    and the merge order is fixed, so the result is the same for any number
+    of workers and equals one aggregate_billing pass over the files in order.
 
+    Args:
+        paths: Billing files, in the order their records should be taken
+        history (dict): cost_trends state to record each file's totals in
+        workers (int): Worker processes (1 parses every file in this process)
+
+    Returns:
+        CostAggregator: Totals over every file
+    """
+    aggregator = CostAggregator()
+    started = time.perf_counter()
+    for shard in iter_shards(paths, top_records.k, workers, chunk_size):
+        metrics.add_file_read(shard.path)
+        if history is not None:
+            record_file(history, shard.path, shard.aggregator, paths)
+        aggregator.merge(shard.aggregator)
+        rules.merge(shard.rules)
+        top_records.merge(shard.top_records)
+        simulator.merge(shard.simulator)
+        anomalies.merge(shard.anomalies)
+        if top_resources is not None:
+            top_resources.merge(shard.top_resources)
+    elapsed = time.perf_counter() - started
+
+    rate = aggregator.rows / elapsed if elapsed > 0 else 0
+    print(f"   Read {aggregator.rows:,} billing records from {len(paths)} files in {elapsed:.2f}s "
+          f"({rate:,.0f} rows/s, {shard_workers(paths, workers)} worker process(es))")
+    return aggregator
+
+
+def build_recommendation_prompt(profile: dict, analysis: dict, billing: list,
+                                min_count: int = MIN_RECOMMENDATIONS, max_count: int = MAX_RECOMMENDATIONS,
+                                existing: list = ()) -> str:
+    """
+    Build the LLM prompt asking for min_count-max_count recommendations.
+
+    existing recommendations (e.g. from the rule engine) are listed so the
+    LLM fills gaps instead of repeating them.
+    """
+    covered = ""
+    if existing:
+        covered = "\nAlready recommended (do NOT repeat or overlap these):\n" + "\n".join(
+            f"- {rec['title']} ({rec['service']})" for rec in existing
+        ) + "\n"
+
+    prompt = f"""You are a cloud cost optimization expert. Generate {min_count}-{max_count} detailed cost optimization recommendations.
+
+CRITICAL: Return ONLY the JSON object. Do not include any text before or after the JSON. Do not use markdown code blocks.
+
+{RECOMMENDATION_FORMAT}
 Requirements:
-1. Generate EXACTLY 6-10 recommendations (preferably 7-9)
+1. Generate EXACTLY {min_count}-{max_count} recommendations
 2. Include multi-cloud alternatives (AWS, Azure, GCP)
 3. Include open-source/free-tier alternatives where applicable
 4. Focus on high-cost services first
 5. Each recommendation must have all fields above
 6. recommendation_type should be one of: open_source, free_tier, alternative_provider, optimization, right_sizing, cost-effective_storage
-7. Make potential_savings realistic (typically 20-50% of current_cost)
+7. Make potential_savings realistic: use the what_if scenario totals in Cost Analysis where they apply, otherwise typically 20-50% of current_cost
 8. Include at least one open-source alternative recommendation
 9. Each recommendation must have at least 3 steps in the steps array
 
 Project Profile:
-{json.dumps(profile, indent=2)}
+{compact_json(profile)}
 
 Cost Analysis:
-{json.dumps(analysis, indent=2)}
+{compact_json(analysis)}
+
+Billing Data (most expensive records; the last row aggregates the rest):
+{compact_json(billing)}
+{covered}
+Return ONLY the JSON object with recommendations array, nothing else."""
+    return prompt
+
+
+def generate_llm_recommendations(prompt: str, stream: bool = False, start_index: int = 0,
+                                 max_tokens: int = 4000) -> list:
+    """
+    Ask the LLM for recommendations and validate each one.
+
+    With stream=True recommendations are validated and printed as they
+    arrive; the stream is aborted at the first invalid one.
+    """
+    if stream:
+        recommendations = []
+        items = stream_llm(prompt, max_tokens=max_tokens)
+        try:
+            for rec in items:
+                validate_recommendations([rec], start=start_index + len(recommendations))
+                recommendations.append(rec)
+                print(f"   • {rec['title']} (save ₹{rec['potential_savings']})")
+        finally:
+            items.close()
+        return recommendations
+
+    llm_response = call_llm(prompt, max_tokens=max_tokens)
+    
+    # Extract recommendations
+    if isinstance(llm_response, dict) and "recommendations" in llm_response:
+        recommendations = llm_response["recommendations"]
+    elif isinstance(llm_response, list):
+        recommendations = llm_response
+    else:
+        raise ValueError("LLM response format invalid")
+    
+    # Validate recommendations structure, reporting every error
+    validate_recommendations(recommendations, start=start_index)
+    return recommendations
+
+
+def build_service_prompt(profile: dict, analysis: dict, service: str, billing: list,
+                         count: int, existing: list = ()) -> str:
+    """Build a small prompt asking for `count` recommendations for one service only."""
+    covered = ""
+    if existing:
+        covered = "\nAlready recommended (do NOT repeat or overlap these):\n" + "\n".join(
+            f"- {rec['title']} ({rec['service']})" for rec in existing
+        ) + "\n"
 
-Billing Data (sample):
-{json.dumps(billing[:5], indent=2)}
+    context = {
+        "project": profile.get("name"),
+        "tech_stack": profile.get("tech_stack", {}),
+        "budget": analysis["budget"],
+        "total_monthly_cost": analysis["total_monthly_cost"],
+        "service": service,
+        "service_cost": analysis["service_costs"][service],
+    }
+
+    prompt = f"""You are a cloud cost optimization expert. Generate 1-{count} detailed cost optimization recommendations for the {service} service ONLY.
+
+CRITICAL: Return ONLY the JSON object. Do not include any text before or after the JSON. Do not use markdown code blocks.
 
+{RECOMMENDATION_FORMAT}
+Requirements:
+1. Every recommendation must have "service": "{service}" and current_cost no higher than {analysis["service_costs"][service]}
+2. Prefer multi-cloud (AWS, Azure, GCP) or open-source/free-tier alternatives where applicable
+3. recommendation_type should be one of: open_source, free_tier, alternative_provider, optimization, right_sizing, cost-effective_storage
+4. Make potential_savings realistic (typically 20-50% of current_cost)
+5. Each recommendation must have at least 3 steps in the steps array
+
+Context:
+{compact_json(context)}
+
+{service} billing records (most expensive first):
+{compact_json(billing)}
+{covered}
 Return ONLY the JSON object with recommendations array, nothing else."""
+    return prompt
+
 
+def merge_recommendations(existing: list, candidates: list, limit: int) -> list:
+    """
+    Add candidates to existing, dropping duplicates by (service, normalized
+    title) and candidates repeating an existing (service, type) pair, which
+    the rule engine already covers with computed savings. At most `limit`
+    candidates are kept, highest potential_savings first.
+    """
+    seen = {recommendation_key(rec) for rec in existing}
+    covered_types = {(rec["service"], rec["recommendation_type"]) for rec in existing}
+    merged = []
+    for rec in sorted(candidates, key=lambda r: r.get("potential_savings") or 0, reverse=True):
+        key = recommendation_key(rec)
+        if key in seen or (rec["service"], rec["recommendation_type"]) in covered_types:
+            continue
+        seen.add(key)
+        merged.append(rec)
+    return list(existing) + merged[:max(0, limit)]
+
+
+def generate_sharded_recommendations(profile: dict, analysis: dict, top_rows: list, existing: list,
+                                     missing: int, max_workers: int = SHARD_WORKERS) -> list:
+    """
+    Request recommendations with one small LLM call per high-cost service,
+    run concurrently on a thread pool.
+
+    A failed shard is reported and skipped; the others are kept. Results are
+    merged with existing and deduplicated.
+
+    Returns:
+        list: existing plus the new recommendations
+    """
+    ranked = sorted(analysis["service_costs"].items(), key=lambda x: x[1], reverse=True)
+    services = [service for service, _ in ranked[:max(MIN_SHARDS, missing)]]
+    per_shard = 2
+
+    def run_shard(service):
+        rows = [row for row in top_rows if row.get("service") == service]
+        prompt = build_service_prompt(profile, analysis, service, rows, per_shard,
+                                      [rec for rec in existing if rec["service"] == service])
+        recs = generate_llm_recommendations(prompt, max_tokens=SHARD_MAX_TOKENS)[:per_shard]
+        for rec in recs:
+            rec["service"] = service
+        return recs
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Each shard reports its LLM metrics into the calling stage
+        futures = {pool.submit(contextvars.copy_context().run, run_shard, service): service
+                   for service in services}
+        for future in as_completed(futures):
+            service = futures[future]
+            try:
+                results[service] = future.result()
+                print(f"   ✅ {service}: {len(results[service])} recommendation(s)")
+            except Exception as e:
+                print(f"   ❌ {service} shard failed: {e}")
+
+    if not results:
+        raise Exception("every recommendation shard failed")
+
+    # Candidates in service rank order, not completion order, so equal savings merge the same way every run
+    candidates = [rec for service in services for rec in results.get(service, [])]
+    return merge_recommendations(existing, candidates, MAX_RECOMMENDATIONS - len(existing))
+
+
+def billing_analysis(aggregator: CostAggregator, budget: float) -> dict:
+    """
+    The report's analysis section computed from aggregated billing totals.
+
+    The budget is monthly, so it is compared with the latest billing month;
+    total_cost and the service, region and usage type breakdowns cover every
+    month in the billing data.
+    """
+    # Calculate total cost
+    total_cost = aggregator.total_cost()
+    month_costs = aggregator.group_cost("month")
+    months = sorted(m for m in month_costs if m)
+    latest_month = months[-1] if months else None
+    monthly_cost = month_costs[latest_month] if months else total_cost
+
+    return {
+        "total_monthly_cost": monthly_cost,
+        "latest_month": latest_month,
+        "average_monthly_cost": round(total_cost / max(1, len(months)), 2),
+        "total_cost": total_cost,
+        "billing_months": max(1, len(months)),
+        "budget": budget,
+        "budget_variance": round(monthly_cost - budget, 2),
+        "service_costs": aggregator.group_cost("service"),
+        # Find high cost services (top 3)
+        "high_cost_services": aggregator.top_cost("service", 3),
+        "is_over_budget": monthly_cost > budget,
+        "region_costs": aggregator.group_cost("region"),
+        "month_costs": month_costs,
+        "usage_type_costs": aggregator.group_cost("usage_type")
+    }
+
+
+@metrics.timed_stage("analysis")
+def analyze_cost(data_dir: str = "data", stream: bool = False, billing_path=None,
+                 use_llm: bool = True, token_budget: int = PROMPT_TOKEN_BUDGET,
+                 sharded: bool = SHARDED_RECOMMENDATIONS, workers: int = BILLING_WORKERS):
+    """
+    Analyze costs and generate optimization recommendations.
+    Input: <data_dir>/project_profile.json, <data_dir>/mock_billing.json
+    (or billing_path: any JSON array, JSON Lines or CUR CSV file, optionally
+    gzipped, or a glob or list of them)
+    Output: cost_optimization_report.json with analysis and detailed recommendations.
+
+    Several billing files are parsed in parallel by up to `workers`
+    processes and their partial totals merged (see aggregate_billing_files).
+
+    Recommendations come from the deterministic rule engine first; the LLM
+    is only asked for the remainder when rules yield fewer than
+    MIN_RECOMMENDATIONS. With use_llm=False the report is built offline from
+    rules alone.
+
+    The LLM prompt is compacted to fit token_budget (estimated tokens),
+    showing the most expensive billing rows plus an aggregated remainder.
+
+    With sharded=True the LLM is called once per high-cost service in
+    parallel and partial results survive a failed shard; stream is ignored.
+
+    With stream=True each recommendation is validated and printed as soon as
+    the LLM finishes it, and generation is aborted at the first invalid one.
+    """
     try:
-        llm_response = call_llm(prompt, max_tokens=4000)
-        
-        # Extract recommendations
-        if isinstance(llm_response, dict) and "recommendations" in llm_response:
-            recommendations = llm_response["recommendations"]
-        elif isinstance(llm_response, list):
-            recommendations = llm_response
+        with open(os.path.join(data_dir, "project_profile.json"), "r") as f:
+            profile = json.load(f)
+        metrics.add_file_read(os.path.join(data_dir, "project_profile.json"))
+    except FileNotFoundError:
+        raise FileNotFoundError("project_profile.json not found. Please run profile extraction first.")
+
+    billing_paths = expand_billing_paths(billing_path or os.path.join(data_dir, "mock_billing.json"))
+    rules = RuleEngine()
+    top_records = TopRecords(max(ROW_LIMITS))
+    top_resources = TopResources(TOP_RESOURCES)
+    # Per-resource anomaly statistics carried over from earlier analyses of this data_dir
+    anomaly_path = os.path.join(data_dir, ANOMALY_STATE_FILENAME)
+    anomalies = AnomalyDetector(load_anomaly_state(anomaly_path))
+    simulator = ScenarioSimulator()
+    # Time series across every billing file analysed into this data_dir
+    history_path = os.path.join(data_dir, HISTORY_FILENAME)
+    history = load_history(history_path)
+    prune_history(history)
+    try:
+        if len(billing_paths) == 1:
+            aggregator = aggregate_billing(billing_paths[0],
+                                           consumers=(rules, top_records, top_resources, anomalies, simulator))
+            record_file(history, billing_paths[0], aggregator)
         else:
-            raise ValueError("LLM response format invalid")
-        
-        # Validate recommendations structure
-        required_fields = ["title", "service", "current_cost", "potential_savings", 
-                          "recommendation_type", "description", "implementation_effort", 
-                          "risk_level", "steps", "cloud_providers"]
-        
-        for i, rec in enumerate(recommendations):
-            if not isinstance(rec, dict):
-                raise ValueError(f"Recommendation {i} is not an object")
-            for field in required_fields:
-                if field not in rec:
-                    raise ValueError(f"Recommendation {i} missing required field: {field}")
+            aggregator = aggregate_billing_files(billing_paths, rules, top_records, anomalies, simulator,
+                                                 history=history, workers=workers, top_resources=top_resources)
+    except FileNotFoundError as e:
+        raise FileNotFoundError(f"{os.path.basename(e.filename or billing_paths[0])} not found. Please run billing generation first.")
+
+    analysis = billing_analysis(aggregator, profile["budget_inr_per_month"])
+    analysis["top_resources"] = top_resources.top()
+    monthly_cost = analysis["total_monthly_cost"]
+    # Savings are estimated from service costs over the whole billing period
+    total_cost = analysis["total_cost"]
+    service_costs = analysis["service_costs"]
+    budget = analysis["budget"]
+    budget_variance = analysis["budget_variance"]
+    is_over_budget = analysis["is_over_budget"]
+
+    save_history(history_path, history)
+    metrics.add_file_written(history_path)
+    analysis["trends"] = compute_trends(merged_month_service_paise(history), budget)
+
+    # Reprice the bill under every catalog scenario so savings are grounded in prices
+    catalog = None
+    scenario_results = []
+    try:
+        catalog = load_catalog()
+        scenario_results = simulator.simulate(catalog)
+        analysis["what_if"] = what_if_summary(scenario_results, simulator.total_paise, catalog,
+                                              simulator.priced_share(catalog))
+    except FileNotFoundError:
+        print(f"   ⚠️ Price catalog {PRICE_CATALOG_PATH} not found: skipping what-if scenarios")
+
+    # Rule-based recommendations first; the LLM only fills the gap
+    rule_recommendations = rules.recommendations()[:MAX_RECOMMENDATIONS]
+    missing = MIN_RECOMMENDATIONS - len(rule_recommendations)
+    print(f"   Rule engine: {len(rule_recommendations)} recommendation(s)")
+
+    try:
+        recommendations = list(rule_recommendations)
+        if missing > 0 and use_llm and sharded:
+            print(f"   Requesting recommendations per service (up to {SHARD_WORKERS} in parallel)...")
+            recommendations = generate_sharded_recommendations(
+                profile, analysis, top_records.records(), rule_recommendations, missing
+            )
+        elif missing > 0 and use_llm:
+            prompt, prompt_stats = fit_prompt(
+                lambda compact, rows: build_recommendation_prompt(
+                    profile, compact, rows,
+                    min_count=missing,
+                    max_count=MAX_RECOMMENDATIONS - len(rule_recommendations),
+                    existing=rule_recommendations
+                ),
+                analysis, top_records.records(), aggregator.rows, aggregator.total_paise,
+                token_budget=token_budget
+            )
+            print(f"   Prompt: {prompt_stats['chars']:,} chars, ~{prompt_stats['estimated_tokens']:,} tokens "
+                  f"(budget {token_budget:,}), {prompt_stats['billing_rows']} billing rows")
+            recommendations += generate_llm_recommendations(prompt, stream, start_index=len(recommendations))
+        elif missing > 0:
+            print(f"   ⚠️ LLM disabled: report has {len(recommendations)} rule-based recommendation(s)")
+
+        if catalog is not None:
+            grounded = ground_recommendations(recommendations, scenario_results, catalog)
+            print(f"   Priced {grounded} recommendation(s) against catalog {catalog.version}")
         
-        # Calculate summary statistics
-        total_potential_savings = sum(rec.get("potential_savings", 0) for rec in recommendations)
+        # Calculate summary statistics; overlapping savings on a service
+        # compound instead of adding up, and never exceed its cost
+        claimed_savings = sum(rec.get("potential_savings", 0) for rec in recommendations)
+        total_potential_savings = round(sum(combined_savings(recommendations, service_costs).values()), 2)
         savings_percentage = (total_potential_savings / total_cost * 100) if total_cost > 0 else 0
         high_impact_count = sum(1 for rec in recommendations if rec.get("potential_savings", 0) > total_cost * 0.1)
         
         summary = {
             "total_potential_savings": total_potential_savings,
+            "claimed_savings": round(claimed_savings, 2),
             "savings_percentage": round(savings_percentage, 2),
             "recommendations_count": len(recommendations),
             "high_impact_recommendations": high_impact_count
         }
+        portfolio = optimize_portfolio(recommendations, service_costs, total_cost,
+                                       budget * analysis["billing_months"])
         
     except Exception as e:
         raise Exception(f"Failed to generate recommendations: {e}")
@@ -134,17 +481,97 @@ Return ONLY the JSON object with recommendations array, nothing else."""
         "project_name": profile["name"],
         "analysis": analysis,
         "recommendations": recommendations,
-        "summary": summary
+        "summary": summary,
+        "portfolio": portfolio,
+        "anomalies": anomalies.report()
     }
 
-    with open("data/cost_optimization_report.json", "w", encoding="utf-8") as f:
+    with open(os.path.join(data_dir, "cost_optimization_report.json"), "w", encoding="utf-8") as f:
         json.dump(report, f, indent=2, ensure_ascii=False)
+    metrics.add_file_written(os.path.join(data_dir, "cost_optimization_report.json"))
+    save_anomaly_state(anomaly_path, anomalies)
+    metrics.add_file_written(anomaly_path)
+    run_id = record_run(os.path.join(data_dir, HISTORY_DB_FILENAME), report)
 
     print("✅ cost_optimization_report.json generated")
-    print(f"   Total Cost: ₹{total_cost}")
+    # Portfolio and what-if costs cover every month of the billing data
+    period = "/month" if analysis["billing_months"] == 1 else f" over {analysis['billing_months']} months"
+    if analysis["billing_months"] > 1:
+        print(f"   Total Cost: ₹{total_cost} over {analysis['billing_months']} months "
+              f"(average ₹{analysis['average_monthly_cost']}/month)")
+    print(f"   Monthly Cost: ₹{monthly_cost}" + (f" ({analysis['latest_month']})" if analysis["latest_month"] else ""))
     print(f"   Budget: ₹{budget}")
     print(f"   Variance: ₹{budget_variance} ({'Over' if is_over_budget else 'Under'} budget)")
     print(f"   Recommendations: {len(recommendations)}")
     print(f"   Potential Savings: ₹{total_potential_savings} ({savings_percentage:.2f}%)")
+    print(f"   Portfolio: {len(portfolio['selected'])} recommendation(s) save ₹{portfolio['total_savings']} "
+          f"-> ₹{portfolio['projected_monthly_cost']}{period} "
+          f"({'within' if portfolio['meets_budget'] else 'still over'} budget)")
+    what_if = analysis.get("what_if")
+    if what_if and what_if["scenarios"]:
+        cheapest = what_if["scenarios"][0]
+        print(f"   What-if: cheapest of {what_if['scenarios_evaluated']} scenarios is {cheapest['name']} "
+              f"at ₹{cheapest['total_cost']}{period} (saves ₹{cheapest['savings']})")
+    print(f"   Anomalies: {report['anomalies']['count']} across "
+          f"{report['anomalies']['resources_scanned']:,} resource(s)")
+    print(f"   History: saved as run #{run_id}")
     
     return report
+
+
+def query_costs(data_dir: str = "data", billing_paths=None, group_by: str = "resource", **filters) -> list:
+    """
+    Drill down into billing costs through the SQLite index in data_dir.
+
+    billing_paths (default: <data_dir>/mock_billing.json, if present) are
+    indexed first; unchanged files cost one stat each, so the query time
+    depends on the size of the answer, not of the billing history.
+
+    Args:
+        data_dir (str): Directory holding cost_index.db
+        billing_paths: Billing files to add or refresh before querying
+        group_by (str): resource, resource_month, service, region, month or usage_type
+        **filters: month, service, region, resource_id, usage_type,
+            min_usage, min_cost and limit (see cost_index.query_index)
+
+    Returns:
+        list: Groups with cost_inr, usage_quantity and line_items, highest cost first
+    """
+    index_path = os.path.join(data_dir, INDEX_FILENAME)
+    if billing_paths is None:
+        default_billing = os.path.join(data_dir, "mock_billing.json")
+        billing_paths = [default_billing] if os.path.exists(default_billing) else []
+    if billing_paths:
+        update_index(billing_paths, index_path)
+    return query_index(index_path, group_by=group_by, **filters)
+
+
+def simulate_scenarios(data_dir: str = "data", billing_path: str = None, scenarios_path: str = None,
+                       catalog_path: str = PRICE_CATALOG_PATH) -> list:
+    """
+    Reprice a billing file under what-if scenarios without running the analysis.
+
+    Args:
+        data_dir (str): Directory holding mock_billing.json
+        billing_path (str): Billing file to reprice (default: <data_dir>/mock_billing.json)
+        scenarios_path (str): JSON list of scenarios (provider, region, tier,
+            services, name); default: every catalog combination
+        catalog_path (str): Price catalog file
+
+    Returns:
+        list: Scenario results, cheapest first
+    """
+    catalog = load_catalog(catalog_path)
+    scenarios = None
+    if scenarios_path:
+        with open(scenarios_path, "r", encoding="utf-8") as f:
+            scenarios = json.load(f)
+        metrics.add_file_read(scenarios_path)
+
+    simulator = ScenarioSimulator()
+    aggregate_billing(billing_path or os.path.join(data_dir, "mock_billing.json"), consumers=(simulator,))
+    try:
+        results = simulator.simulate(catalog, scenarios)
+    except ValueError as e:
+        raise Exception(f"Invalid scenario: {e}")
+    return sorted(results, key=lambda r: r["total_cost"])
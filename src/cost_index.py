@@ -0,0 +1,313 @@
+import os
+import time
+import sqlite3
+from src.billing_columns import to_inr
+from src.billing_reader import iter_billing_chunks
+from src.schemas import validate_billing_records
+from src import metrics
+
+# SQLite rollup of billing records for drill-down queries without rescanning files
+INDEX_FILENAME = "cost_index.db"
+INDEX_VERSION = 2
+
+# resources holds each distinct (resource_id, service, region, usage_type,
+# unit) once; resource_costs rolls line items up per file, chunk, month and
+# resource with integer keys, which keeps its indexes small and inserts fast.
+# resource_totals keeps running all-month totals per resource and unit, so
+# top-N resources is a walk of the cost index instead of a scan of history.
+# Usage is only ever summed within one unit: hours and GB-months do not add.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    fingerprint TEXT NOT NULL,
+    row_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS resources (
+    resource_key INTEGER PRIMARY KEY,
+    resource_id TEXT NOT NULL,
+    service TEXT NOT NULL,
+    region TEXT NOT NULL,
+    usage_type TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    UNIQUE (resource_id, service, region, usage_type, unit)
+);
+CREATE INDEX IF NOT EXISTS resources_service ON resources (service, region);
+CREATE INDEX IF NOT EXISTS resources_region ON resources (region);
+CREATE INDEX IF NOT EXISTS resources_usage_type ON resources (usage_type);
+CREATE TABLE IF NOT EXISTS resource_costs (
+    resource_key INTEGER NOT NULL,
+    month TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    usage_quantity REAL NOT NULL,
+    cost_paise INTEGER NOT NULL,
+    line_items INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS costs_resource_month ON resource_costs (resource_key, month);
+CREATE INDEX IF NOT EXISTS costs_month ON resource_costs (month);
+CREATE INDEX IF NOT EXISTS costs_file ON resource_costs (file_id);
+CREATE TABLE IF NOT EXISTS resource_totals (
+    resource_id TEXT NOT NULL,
+    service TEXT NOT NULL,
+    region TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    usage_quantity REAL NOT NULL,
+    cost_paise INTEGER NOT NULL,
+    line_items INTEGER NOT NULL,
+    PRIMARY KEY (resource_id, service, region, unit)
+);
+CREATE INDEX IF NOT EXISTS totals_cost ON resource_totals (cost_paise);
+CREATE INDEX IF NOT EXISTS totals_service_cost ON resource_totals (service, cost_paise);
+CREATE INDEX IF NOT EXISTS totals_region_cost ON resource_totals (region, cost_paise);
+"""
+
+# group_by name -> columns reported per group. usage_quantity is reported
+# (and min_usage applies) only for groupings that include the unit.
+GROUPINGS = {
+    "resource": ("resource_id", "service", "region", "unit"),
+    "resource_month": ("resource_id", "service", "region", "unit", "month"),
+    "service": ("service",),
+    "region": ("region",),
+    "month": ("month",),
+    "usage_type": ("service", "usage_type", "unit"),
+}
+
+# Per-file resource totals, added to or subtracted from resource_totals
+_FILE_TOTALS = """
+    SELECT r.resource_id, r.service, r.region, r.unit, SUM(c.usage_quantity),
+           SUM(c.cost_paise), SUM(c.line_items)
+    FROM resource_costs c JOIN resources r ON r.resource_key = c.resource_key
+    WHERE c.file_id = ? GROUP BY r.resource_id, r.service, r.region, r.unit
+"""
+
+
+def _fingerprint(path: str) -> str:
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def connect(index_path: str) -> sqlite3.Connection:
+    """Open (creating if needed) the index at index_path."""
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(index_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+        conn.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS resources; "
+                           "DROP TABLE IF EXISTS resource_costs; DROP TABLE IF EXISTS resource_totals;")
+        conn.execute(f"PRAGMA user_version={INDEX_VERSION}")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def rollup_chunk(records) -> dict:
+    """
+    Sum usage, exact paise cost and line items per ((resource_id, service,
+    region, usage_type, unit), month) within one chunk of billing records.
+    """
+    groups = {}
+    for r in records:
+        key = ((r["resource_id"], r["service"], r["region"], r["usage_type"], r["unit"]), r["month"])
+        entry = groups.get(key)
+        if entry is None:
+            groups[key] = [r["usage_quantity"], round(r["cost_inr"] * 100), 1]
+        else:
+            entry[0] += r["usage_quantity"]
+            entry[1] += round(r["cost_inr"] * 100)
+            entry[2] += 1
+    return groups
+
+
+def _resource_keys(conn: sqlite3.Connection) -> dict:
+    return {tuple(row[1:]): row[0] for row in conn.execute(
+        "SELECT resource_key, resource_id, service, region, usage_type, unit FROM resources")}
+
+
+def _resource_key(conn: sqlite3.Connection, resource: tuple) -> int:
+    """Key of a resource, inserting it if needed; SQLite assigns new keys."""
+    cursor = conn.execute("INSERT OR IGNORE INTO resources (resource_id, service, region, usage_type, unit) "
+                          "VALUES (?, ?, ?, ?, ?)", resource)
+    if cursor.rowcount:
+        return cursor.lastrowid
+    return conn.execute("SELECT resource_key FROM resources WHERE resource_id = ? AND service = ? AND region = ? "
+                        "AND usage_type = ? AND unit = ?", resource).fetchone()[0]
+
+
+def _apply_file_totals(conn: sqlite3.Connection, file_id: int, sign: int) -> None:
+    """
+    Add (sign 1) or subtract (sign -1) a file's per-resource totals to
+    resource_totals. Plain INSERT and UPDATE statements, so any SQLite
+    Python ships with will do (no UPDATE ... FROM or upsert).
+    """
+    totals = conn.execute(_FILE_TOTALS, (file_id,)).fetchall()
+    if sign > 0:
+        conn.executemany("INSERT OR IGNORE INTO resource_totals VALUES (?, ?, ?, ?, 0, 0, 0)",
+                         [row[:4] for row in totals])
+    conn.executemany(
+        "UPDATE resource_totals SET usage_quantity = usage_quantity + ?, cost_paise = cost_paise + ?, "
+        "line_items = line_items + ? WHERE resource_id = ? AND service = ? AND region = ? AND unit = ?",
+        [(sign * usage, sign * paise, sign * items, *row[:4]) for *row, usage, paise, items in totals])
+
+
+def _remove_file(conn: sqlite3.Connection, file_id: int) -> None:
+    """Subtract a file's contribution from resource_totals and drop its rows."""
+    _apply_file_totals(conn, file_id, -1)
+    conn.execute("DELETE FROM resource_totals WHERE line_items <= 0")
+    conn.execute("DELETE FROM resource_costs WHERE file_id = ?", (file_id,))
+    conn.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+
+
+def index_file(conn: sqlite3.Connection, path: str, resource_keys: dict = None) -> int:
+    """
+    (Re)index one billing file in a single transaction, replacing any
+    earlier contribution from the same path. Chunks are rolled up and
+    inserted as they are read, so memory does not grow with the file.
+
+    Args:
+        conn: Connection from connect()
+        path (str): Billing file (JSON, JSON Lines or CUR CSV, optionally gzipped)
+        resource_keys (dict): Cache of the resources table, updated after commit
+
+    Returns:
+        int: Billing rows read
+    """
+    if resource_keys is None:
+        resource_keys = _resource_keys(conn)
+    key = os.path.abspath(path)
+    rows = 0
+    # Resources first seen in this file; cached only once the transaction commits
+    added = {}
+    metrics.add_file_read(path)
+    with conn:
+        row = conn.execute("SELECT file_id FROM files WHERE path = ?", (key,)).fetchone()
+        if row:
+            _remove_file(conn, row[0])
+        file_id = conn.execute("INSERT INTO files (path, fingerprint, row_count) VALUES (?, ?, 0)",
+                               (key, _fingerprint(path))).lastrowid
+        for chunk in iter_billing_chunks(path):
+            validate_billing_records(chunk, start=rows)
+            cost_rows = []
+            for (resource, month), (usage, paise, items) in rollup_chunk(chunk).items():
+                resource_key = resource_keys.get(resource) or added.get(resource)
+                if resource_key is None:
+                    resource_key = added[resource] = _resource_key(conn, resource)
+                cost_rows.append((resource_key, month, file_id, usage, paise, items))
+            conn.executemany("INSERT INTO resource_costs VALUES (?, ?, ?, ?, ?, ?)", cost_rows)
+            rows += len(chunk)
+        conn.execute("UPDATE files SET row_count = ? WHERE file_id = ?", (rows, file_id))
+        _apply_file_totals(conn, file_id, 1)
+    resource_keys.update(added)
+    return rows
+
+
+def update_index(billing_paths, index_path: str) -> dict:
+    """
+    Bring the index up to date with billing_paths.
+
+    Files whose size and mtime are unchanged since they were indexed are
+    skipped; new or modified files are read once and replace any earlier
+    rows from the same path.
+
+    Returns:
+        dict: {"indexed": files read, "unchanged": files skipped, "rows": rows read}
+    """
+    conn = connect(index_path)
+    stats = {"indexed": 0, "unchanged": 0, "rows": 0}
+    resource_keys = None
+    started = time.perf_counter()
+    try:
+        for path in billing_paths:
+            row = conn.execute("SELECT fingerprint FROM files WHERE path = ?",
+                               (os.path.abspath(path),)).fetchone()
+            if row and row[0] == _fingerprint(path):
+                stats["unchanged"] += 1
+                continue
+            if resource_keys is None:
+                resource_keys = _resource_keys(conn)
+            stats["rows"] += index_file(conn, path, resource_keys)
+            stats["indexed"] += 1
+    finally:
+        conn.close()
+    if stats["indexed"]:
+        metrics.add_file_written(index_path)
+    print(f"   Cost index: {stats['indexed']} new/changed file(s) ({stats['rows']:,} rows) "
+          f"in {time.perf_counter() - started:.2f}s, {stats['unchanged']} unchanged")
+    return stats
+
+
+def query_index(index_path: str, group_by: str = "resource", month: str = None, service: str = None,
+                region: str = None, resource_id: str = None, usage_type: str = None,
+                min_usage: float = None, min_cost: float = None, limit: int = 20) -> list:
+    """
+    Cost drill-down over the index, highest cost first.
+
+    Args:
+        index_path (str): Index built by update_index
+        group_by (str): One of GROUPINGS
+        month, service, region, resource_id, usage_type: Exact-match filters
+        min_usage (float): Keep groups whose summed usage_quantity is at least
+            this; only for groupings that include the unit
+        min_cost (float): Keep groups costing at least this many INR
+        limit (int): Maximum groups returned (None for all)
+
+    Returns:
+        list: One dict per group with its key columns, cost_inr,
+            usage_quantity (None when the group spans units) and line_items
+    """
+    if group_by not in GROUPINGS:
+        raise ValueError(f"Unknown group_by '{group_by}'. Choose from: {', '.join(GROUPINGS)}")
+    per_unit = "unit" in GROUPINGS[group_by]
+    if min_usage is not None and not per_unit:
+        raise ValueError(f"min_usage needs a grouping by unit "
+                         f"({', '.join(name for name, cols in GROUPINGS.items() if 'unit' in cols)}), "
+                         f"not '{group_by}'")
+    if not os.path.exists(index_path):
+        raise FileNotFoundError(f"{index_path} not found. Index billing files first.")
+
+    filters = {"month": month, "service": service, "region": region,
+               "resource_id": resource_id, "usage_type": usage_type}
+    filters = {field: value for field, value in filters.items() if value is not None}
+    columns = GROUPINGS[group_by]
+    params = list(filters.values())
+
+    if group_by == "resource" and not set(filters) - {"service", "region", "resource_id"}:
+        # Maintained at index time: no GROUP BY, ORDER BY ... LIMIT walks totals_cost
+        conditions = [f"{field} = ?" for field in filters]
+        if min_usage is not None:
+            conditions.append("usage_quantity >= ?")
+        if min_cost is not None:
+            conditions.append("cost_paise >= ?")
+        sql = (f"SELECT {', '.join(columns)}, usage_quantity, cost_paise, line_items FROM resource_totals"
+               + (f" WHERE {' AND '.join(conditions)}" if conditions else ""))
+    else:
+        qualified = [f"c.{c}" if c == "month" else f"r.{c}" for c in columns]
+        conditions = [f"c.{field} = ?" if field == "month" else f"r.{field} = ?" for field in filters]
+        having = []
+        if min_usage is not None:
+            having.append("SUM(c.usage_quantity) >= ?")
+        if min_cost is not None:
+            having.append("SUM(c.cost_paise) >= ?")
+        sql = (f"SELECT {', '.join(qualified)}, SUM(c.usage_quantity), SUM(c.cost_paise), SUM(c.line_items) "
+               f"FROM resource_costs c JOIN resources r ON r.resource_key = c.resource_key"
+               + (f" WHERE {' AND '.join(conditions)}" if conditions else "")
+               + f" GROUP BY {', '.join(qualified)}"
+               + (f" HAVING {' AND '.join(having)}" if having else ""))
+    if min_usage is not None:
+        params.append(min_usage)
+    if min_cost is not None:
+        params.append(round(min_cost * 100))
+    sql += f" ORDER BY {len(columns) + 2} DESC, 1"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    conn = connect(index_path)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+    return [
+        {**dict(zip(columns, row)), "cost_inr": to_inr(row[-2]),
+         "usage_quantity": round(row[-3], 4) if per_unit else None, "line_items": row[-1]}
+        for row in rows
+    ]
@@ -0,0 +1,208 @@
+import os
+import json
+import numpy as np
+from src.billing_columns import CostAggregator, to_inr
+from src.billing_reader import iter_billing_chunks
+
+# Month x service totals per (month, source file), so new files never reprocess history
+HISTORY_FILENAME = "cost_history.json"
+HISTORY_VERSION = 2
+
+
+def _fingerprint(path: str) -> str:
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def load_history(state_path: str) -> dict:
+    """Load the persisted aggregate state, or an empty one."""
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") == HISTORY_VERSION:
+            return state
+    except (FileNotFoundError, ValueError):
+        pass
+    return {"version": HISTORY_VERSION, "sources": {}, "months": {}}
+
+
+def save_history(state_path: str, state: dict) -> None:
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, state_path)
+
+
+def _drop_source(state: dict, source: str) -> None:
+    state["sources"].pop(source, None)
+    for month in list(state["months"]):
+        state["months"][month].pop(source, None)
+        if not state["months"][month]:
+            del state["months"][month]
+
+
+def record_file(state: dict, path: str, aggregator: CostAggregator, batch=()) -> None:
+    """
+    Store one billing file's month x service totals in state.
+
+    Entries are keyed by (month, source). The file's earlier entries are
+    replaced, and each month it covers is replaced too: that month keeps
+    only the sources in batch (the files analysed together with path), so a
+    month exported again in another file is not counted twice.
+
+    Args:
+        batch: Billing files of the current run (default: just path)
+    """
+    source = os.path.abspath(path)
+    keep = {os.path.abspath(p) for p in batch} | {source}
+    _drop_source(state, source)
+    for month, services in aggregator.month_service_paise.items():
+        sources = state["months"].get(month, {})
+        state["months"][month] = {s: totals for s, totals in sources.items() if s in keep}
+        state["months"][month][source] = services
+    state["sources"][source] = {"fingerprint": _fingerprint(path), "rows": aggregator.rows}
+    # Sources that lost every month to a newer export are gone from the history
+    for other in list(state["sources"]):
+        if not any(other in sources for sources in state["months"].values()):
+            state["sources"].pop(other)
+
+
+def prune_history(state: dict) -> int:
+    """Drop sources whose billing file no longer exists; returns how many were dropped."""
+    missing = [source for source in state["sources"] if not os.path.exists(source)]
+    for source in missing:
+        _drop_source(state, source)
+    return len(missing)
+
+
+def update_history(billing_paths, state_path: str) -> dict:
+    """
+    Bring the persisted state up to date with billing_paths.
+
+    Files whose size and mtime are unchanged since they were last recorded
+    are skipped; new or modified files are aggregated and replace their own
+    earlier entries and the months they cover. Sources that no longer exist
+    are pruned.
+
+    Returns:
+        dict: The updated state
+    """
+    state = load_history(state_path)
+    billing_paths = list(billing_paths)
+    pruned = prune_history(state)
+    processed = 0
+    for path in billing_paths:
+        entry = state["sources"].get(os.path.abspath(path))
+        if entry and entry["fingerprint"] == _fingerprint(path):
+            continue
+        aggregator = CostAggregator()
+        for chunk in iter_billing_chunks(path):
+            aggregator.add_records(chunk)
+        record_file(state, path, aggregator, billing_paths)
+        processed += 1
+
+    if processed or pruned:
+        save_history(state_path, state)
+    print(f"   Cost history: {processed} new/changed file(s), {len(billing_paths) - processed} unchanged, "
+          f"{pruned} removed")
+    return state
+
+
+def merged_month_service_paise(state: dict) -> dict:
+    """Month x service totals over every source recorded for each month."""
+    merged = {}
+    for month, sources in state["months"].items():
+        totals = merged.setdefault(month, {})
+        for services in sources.values():
+            for service, paise in services.items():
+                totals[service] = totals.get(service, 0) + paise
+    return merged
+
+
+def _next_month(month: str) -> str:
+    year, mon = (int(part) for part in month.split("-"))
+    return f"{year + mon // 12:04d}-{mon % 12 + 1:02d}"
+
+
+def _growth_pct(previous: int, current: int):
+    if previous == 0:
+        return None
+    return round((current - previous) / previous * 100, 2)
+
+
+def compute_trends(month_service_paise: dict, budget) -> dict:
+    """
+    Build per-month and per-service time series, month-over-month growth and
+    a next-month forecast from month x service paise totals.
+
+    The forecast is a least-squares linear trend over the monthly totals
+    (last value for a single month), floored at zero.
+    """
+    months = sorted(m for m in month_service_paise if m)
+    services = sorted({s for m in months for s in month_service_paise[m]})
+
+    # Dense month x service matrix in paise
+    matrix = np.array(
+        [[month_service_paise[m].get(s, 0) for s in services] for m in months],
+        dtype=np.int64
+    ).reshape(len(months), len(services))
+    monthly = matrix.sum(axis=1)
+
+    monthly_costs = {m: to_inr(total) for m, total in zip(months, monthly.tolist())}
+    service_monthly_costs = {
+        s: {m: to_inr(matrix[i, j]) for i, m in enumerate(months)}
+        for j, s in enumerate(services)
+    }
+
+    month_over_month = {}
+    for i in range(1, len(months)):
+        prev, cur = int(monthly[i - 1]), int(monthly[i])
+        month_over_month[months[i]] = {
+            "delta": to_inr(cur - prev),
+            "growth_pct": _growth_pct(prev, cur),
+        }
+
+    service_growth_pct = {}
+    if len(months) >= 2:
+        for j, s in enumerate(services):
+            service_growth_pct[s] = _growth_pct(int(matrix[-2, j]), int(matrix[-1, j]))
+
+    forecast = None
+    if months:
+        if len(months) >= 2:
+            slope, intercept = np.polyfit(np.arange(len(months)), monthly / 100, 1)
+            forecast_cost = max(0.0, slope * len(months) + intercept)
+        else:
+            forecast_cost = monthly[-1] / 100
+        forecast_cost = round(float(forecast_cost), 2)
+        forecast = {
+            "month": _next_month(months[-1]),
+            "forecast_cost": forecast_cost,
+            "budget": budget,
+            "forecast_variance": round(forecast_cost - budget, 2),
+            "forecast_over_budget": forecast_cost > budget,
+            "method": "linear_trend" if len(months) >= 2 else "last_month",
+        }
+
+    return {
+        "months": months,
+        "monthly_costs": monthly_costs,
+        "service_monthly_costs": service_monthly_costs,
+        "month_over_month": month_over_month,
+        "service_growth_pct": service_growth_pct,
+        "forecast": forecast,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Update cost history from billing files and print trends.")
+    parser.add_argument("billing_files", nargs="+", help="Billing files (JSON, JSON Lines or CUR CSV)")
+    parser.add_argument("--state", default=os.path.join("data", HISTORY_FILENAME), help="Aggregate state file")
+    parser.add_argument("--budget", type=float, default=0, help="Monthly budget in INR for the forecast")
+    args = parser.parse_args()
+
+    history = update_history(args.billing_files, args.state)
+    trends = compute_trends(merged_month_service_paise(history), args.budget)
+    print(json.dumps(trends, indent=2, ensure_ascii=False))
@@ -0,0 +1,390 @@
+"""
+Pluggable report exporters.
+
+Every exporter receives reports one at a time through write_report(), so a
+consolidated export over any number of reports holds only one report in
+memory. Output is built per report section and written through large
+buffers, and several formats are produced in a single pass over the reports.
+"""
+
+import os
+import csv
+import json
+import html
+
+# Write buffer per output file
+BUFFER_SIZE = 1024 * 1024
+
+# Rows per Parquet row group / columnar JSON line
+ROW_GROUP_SIZE = 10_000
+
+RECOMMENDATION_COLUMNS = ["project", "rank", "title", "service", "current_cost", "potential_savings",
+                          "recommendation_type", "implementation_effort", "risk_level", "source",
+                          "cloud_providers", "steps", "description"]
+SERVICE_COST_COLUMNS = ["project", "service", "cost", "share_pct"]
+
+
+def recommendation_rows(report: dict):
+    """Flat rows (dicts keyed by RECOMMENDATION_COLUMNS) for a report's recommendations."""
+    project = report.get("project_name", "N/A")
+    for rank, rec in enumerate(report.get("recommendations", []), 1):
+        yield {
+            "project": project,
+            "rank": rank,
+            "title": rec.get("title", ""),
+            "service": rec.get("service", ""),
+            "current_cost": rec.get("current_cost", 0),
+            "potential_savings": rec.get("potential_savings", 0),
+            "recommendation_type": rec.get("recommendation_type", ""),
+            "implementation_effort": rec.get("implementation_effort", ""),
+            "risk_level": rec.get("risk_level", ""),
+            "source": rec.get("source", "llm"),
+            "cloud_providers": "; ".join(rec.get("cloud_providers", [])),
+            "steps": " | ".join(rec.get("steps", [])),
+            "description": rec.get("description", ""),
+        }
+
+
+def service_cost_rows(report: dict):
+    """Flat rows (dicts keyed by SERVICE_COST_COLUMNS) for a report's service costs."""
+    project = report.get("project_name", "N/A")
+    analysis = report.get("analysis", {})
+    # Service costs cover the whole billing period
+    total = analysis.get("total_cost", analysis.get("total_monthly_cost")) or 0
+    for service, cost in analysis.get("service_costs", {}).items():
+        yield {
+            "project": project,
+            "service": service,
+            "cost": cost,
+            "share_pct": round(cost / total * 100, 2) if total else None,
+        }
+
+
+def _open(path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return open(path, "w", encoding="utf-8", newline="", buffering=BUFFER_SIZE)
+
+
+class Exporter:
+    """
+    Base class. Subclasses set suffix (appended to the output base path)
+    and implement write_report(); begin() and close() bracket the export.
+    Passing suffix="" writes a single-file format to base_path exactly.
+    """
+
+    suffix = ""
+
+    def __init__(self, base_path: str, suffix: str = None):
+        self.base_path = base_path
+        if suffix is not None:
+            self.suffix = suffix
+        self.paths = []
+
+    def output_path(self, suffix: str = None) -> str:
+        path = self.base_path + (self.suffix if suffix is None else suffix)
+        self.paths.append(path)
+        return path
+
+    def begin(self) -> None:
+        pass
+
+    def write_report(self, report: dict) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class TextExporter(Exporter):
+    """The readable text layout of the original export_report."""
+
+    suffix = ".txt"
+
+    def begin(self):
+        self.f = _open(self.output_path())
+        self.count = 0
+
+    def write_report(self, report):
+        analysis = report.get("analysis", {})
+        summary = report.get("summary", {})
+        out = ["\n"] if self.count else []
+        self.count += 1
+
+        out.append("=" * 70 + "\n")
+        out.append("COST OPTIMIZATION REPORT\n")
+        out.append("=" * 70 + "\n\n")
+        out.append(f"Project: {report.get('project_name', 'N/A')}\n\n")
+
+        out.append("COST ANALYSIS\n")
+        out.append("-" * 70 + "\n")
+        out.append(f"Total Monthly Cost: ₹{analysis.get('total_monthly_cost', 0)}\n")
+        out.append(f"Budget: ₹{analysis.get('budget', 0)}\n")
+        out.append(f"Budget Variance: ₹{analysis.get('budget_variance', 0)}\n")
+        out.append(f"Status: {'OVER BUDGET' if analysis.get('is_over_budget') else 'WITHIN BUDGET'}\n\n")
+
+        out.append("Service Costs:\n")
+        for service, cost in analysis.get("service_costs", {}).items():
+            out.append(f"  {service}: ₹{cost}\n")
+        out.append("\n")
+
+        out.append("SUMMARY\n")
+        out.append("-" * 70 + "\n")
+        out.append(f"Total Potential Savings: ₹{summary.get('total_potential_savings', 0)}\n")
+        out.append(f"Savings Percentage: {summary.get('savings_percentage', 0)}%\n")
+        out.append(f"Recommendations Count: {summary.get('recommendations_count', 0)}\n\n")
+
+        out.append("RECOMMENDATIONS\n")
+        out.append("-" * 70 + "\n\n")
+        for i, rec in enumerate(report.get("recommendations", []), 1):
+            out.append(f"{i}. {rec.get('title', 'N/A')}\n")
+            out.append(f"   Service: {rec.get('service', 'N/A')}\n")
+            out.append(f"   Current Cost: ₹{rec.get('current_cost', 0)}\n")
+            out.append(f"   Potential Savings: ₹{rec.get('potential_savings', 0)}\n")
+            out.append(f"   Type: {rec.get('recommendation_type', 'N/A')}\n")
+            out.append(f"   Implementation Effort: {rec.get('implementation_effort', 'N/A')}\n")
+            out.append(f"   Risk Level: {rec.get('risk_level', 'N/A')}\n")
+            out.append(f"   Description: {rec.get('description', 'N/A')}\n")
+            out.append(f"   Cloud Providers: {', '.join(rec.get('cloud_providers', []))}\n")
+            out.append("   Implementation Steps:\n")
+            for step in rec.get("steps", []):
+                out.append(f"     - {step}\n")
+            out.append("\n")
+        self.f.write("".join(out))
+
+    def close(self):
+        self.f.close()
+
+
+class CsvExporter(Exporter):
+    """Two CSV files: <base>_recommendations.csv and <base>_service_costs.csv."""
+
+    def begin(self):
+        self.rec_file = _open(self.output_path("_recommendations.csv"))
+        self.cost_file = _open(self.output_path("_service_costs.csv"))
+        self.recs = csv.DictWriter(self.rec_file, RECOMMENDATION_COLUMNS)
+        self.costs = csv.DictWriter(self.cost_file, SERVICE_COST_COLUMNS)
+        self.recs.writeheader()
+        self.costs.writeheader()
+
+    def write_report(self, report):
+        self.recs.writerows(recommendation_rows(report))
+        self.costs.writerows(service_cost_rows(report))
+
+    def close(self):
+        self.rec_file.close()
+        self.cost_file.close()
+
+
+def _md_cell(value) -> str:
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+class MarkdownExporter(Exporter):
+    """One Markdown document with a section per report."""
+
+    suffix = ".md"
+
+    def begin(self):
+        self.f = _open(self.output_path())
+        self.f.write("# Cost Optimization Report\n")
+
+    def write_report(self, report):
+        analysis = report.get("analysis", {})
+        summary = report.get("summary", {})
+        status = "over budget" if analysis.get("is_over_budget") else "within budget"
+        out = [
+            f"\n## {_md_cell(report.get('project_name', 'N/A'))}\n\n",
+            f"- Total monthly cost: ₹{analysis.get('total_monthly_cost', 0)}\n",
+            f"- Budget: ₹{analysis.get('budget', 0)} (variance ₹{analysis.get('budget_variance', 0)}, {status})\n",
+            f"- Potential savings: ₹{summary.get('total_potential_savings', 0)} "
+            f"({summary.get('savings_percentage', 0)}%)\n\n",
+            "### Service Costs\n\n| Service | Cost (₹) | Share |\n|---|---:|---:|\n",
+        ]
+        for row in service_cost_rows(report):
+            share = "" if row["share_pct"] is None else f"{row['share_pct']}%"
+            out.append(f"| {_md_cell(row['service'])} | {row['cost']} | {share} |\n")
+        out.append("\n### Recommendations\n\n"
+                   "| # | Title | Service | Current (₹) | Savings (₹) | Type | Effort | Risk |\n"
+                   "|---:|---|---|---:|---:|---|---|---|\n")
+        for row in recommendation_rows(report):
+            out.append(
+                f"| {row['rank']} | {_md_cell(row['title'])} | {_md_cell(row['service'])} | "
+                f"{row['current_cost']} | {row['potential_savings']} | {_md_cell(row['recommendation_type'])} | "
+                f"{_md_cell(row['implementation_effort'])} | {_md_cell(row['risk_level'])} |\n"
+            )
+        self.f.write("".join(out))
+
+    def close(self):
+        self.f.close()
+
+
+class HtmlExporter(Exporter):
+    """A standalone HTML page with a section per report."""
+
+    suffix = ".html"
+
+    def begin(self):
+        self.f = _open(self.output_path())
+        self.f.write(
+            "<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"utf-8\">\n"
+            "<title>Cost Optimization Report</title>\n<style>\n"
+            "body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin-bottom:1.5em}"
+            "th,td{border:1px solid #ccc;padding:4px 8px;text-align:left}td.num{text-align:right}\n"
+            "</style>\n</head>\n<body>\n<h1>Cost Optimization Report</h1>\n"
+        )
+
+    def write_report(self, report):
+        esc = html.escape
+        analysis = report.get("analysis", {})
+        summary = report.get("summary", {})
+        status = "Over budget" if analysis.get("is_over_budget") else "Within budget"
+        out = [
+            f"<section>\n<h2>{esc(str(report.get('project_name', 'N/A')))}</h2>\n<ul>\n",
+            f"<li>Total monthly cost: ₹{analysis.get('total_monthly_cost', 0)}</li>\n",
+            f"<li>Budget: ₹{analysis.get('budget', 0)} (variance ₹{analysis.get('budget_variance', 0)}, {status})</li>\n",
+            f"<li>Potential savings: ₹{summary.get('total_potential_savings', 0)} "
+            f"({summary.get('savings_percentage', 0)}%)</li>\n</ul>\n",
+            "<h3>Service Costs</h3>\n<table>\n<tr><th>Service</th><th>Cost (₹)</th><th>Share</th></tr>\n",
+        ]
+        for row in service_cost_rows(report):
+            share = "" if row["share_pct"] is None else f"{row['share_pct']}%"
+            out.append(f"<tr><td>{esc(str(row['service']))}</td><td class=\"num\">{row['cost']}</td>"
+                       f"<td class=\"num\">{share}</td></tr>\n")
+        out.append("</table>\n<h3>Recommendations</h3>\n<table>\n<tr><th>#</th><th>Title</th><th>Service</th>"
+                   "<th>Current (₹)</th><th>Savings (₹)</th><th>Type</th><th>Effort</th><th>Risk</th>"
+                   "<th>Steps</th></tr>\n")
+        for i, rec in enumerate(report.get("recommendations", []), 1):
+            steps = "".join(f"<li>{esc(str(step))}</li>" for step in rec.get("steps", []))
+            out.append(
+                f"<tr><td class=\"num\">{i}</td>"
+                f"<td>{esc(str(rec.get('title', '')))}<br><small>{esc(str(rec.get('description', '')))}</small></td>"
+                f"<td>{esc(str(rec.get('service', '')))}</td>"
+                f"<td class=\"num\">{rec.get('current_cost', 0)}</td>"
+                f"<td class=\"num\">{rec.get('potential_savings', 0)}</td>"
+                f"<td>{esc(str(rec.get('recommendation_type', '')))}</td>"
+                f"<td>{esc(str(rec.get('implementation_effort', '')))}</td>"
+                f"<td>{esc(str(rec.get('risk_level', '')))}</td>"
+                f"<td><ol>{steps}</ol></td></tr>\n"
+            )
+        out.append("</table>\n</section>\n")
+        self.f.write("".join(out))
+
+    def close(self):
+        self.f.write("</body>\n</html>\n")
+        self.f.close()
+
+
+class ColumnarExporter(Exporter):
+    """
+    Column-oriented tables for analytics tools. With pyarrow installed,
+    writes <base>_recommendations.parquet and <base>_service_costs.parquet;
+    otherwise <base>_<table>.columns.jsonl, one {column: [values]} row group
+    per line. Rows are flushed every ROW_GROUP_SIZE rows either way.
+    """
+
+    def begin(self):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+            self.pa = pyarrow
+        except ImportError:
+            self.pa = None
+        self.tables = {}
+        for name, columns in (("recommendations", RECOMMENDATION_COLUMNS),
+                              ("service_costs", SERVICE_COST_COLUMNS)):
+            suffix = f"_{name}.parquet" if self.pa else f"_{name}.columns.jsonl"
+            path = self.output_path(suffix)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.tables[name] = {"path": path, "columns": columns, "rows": [], "writer": None,
+                                 "file": None if self.pa else _open(path)}
+
+    def write_report(self, report):
+        for name, rows in (("recommendations", recommendation_rows(report)),
+                           ("service_costs", service_cost_rows(report))):
+            table = self.tables[name]
+            table["rows"].extend(rows)
+            if len(table["rows"]) >= ROW_GROUP_SIZE:
+                self._flush(table)
+
+    def _flush(self, table):
+        rows = table["rows"]
+        if not rows:
+            return
+        columns = {column: [row[column] for row in rows] for column in table["columns"]}
+        table["rows"] = []
+        if self.pa is None:
+            table["file"].write(json.dumps(columns, ensure_ascii=False) + "\n")
+            return
+        batch = self.pa.table(columns)
+        if table["writer"] is None:
+            table["writer"] = self.pa.parquet.ParquetWriter(table["path"], batch.schema)
+        table["writer"].write_table(batch.cast(table["writer"].schema))
+
+    def close(self):
+        for table in self.tables.values():
+            self._flush(table)
+            if table["file"] is not None:
+                table["file"].close()
+            elif table["writer"] is not None:
+                table["writer"].close()
+
+
+# Format name -> exporter class; register_exporter() adds more
+EXPORTERS = {
+    "txt": TextExporter,
+    "csv": CsvExporter,
+    "md": MarkdownExporter,
+    "html": HtmlExporter,
+    "columnar": ColumnarExporter,
+}
+
+
+def register_exporter(name: str, exporter_class) -> None:
+    """Make exporter_class (an Exporter subclass) available as format name."""
+    EXPORTERS[name] = exporter_class
+
+
+def iter_reports(report_paths):
+    """
+    Yield (path, report) for each report JSON, loading one file at a time.
+    Report dicts (e.g. runs from the report history) pass through with path None.
+    """
+    for path in report_paths:
+        if isinstance(path, dict):
+            yield None, path
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            yield path, json.load(f)
+
+
+def export_reports(report_paths, output_base: str, formats=("txt",)) -> list:
+    """
+    Export any number of reports to every format in one pass.
+
+    Args:
+        report_paths: Report JSON paths or report dicts (any iterable; read lazily)
+        output_base (str): Output path without extension; each format
+            appends its own suffix (e.g. ".md", "_recommendations.csv")
+        formats: Names from EXPORTERS
+
+    Returns:
+        list: Paths of the files written
+    """
+    unknown = [name for name in formats if name not in EXPORTERS]
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(unknown)}. "
+                         f"Choose from: {', '.join(EXPORTERS)}")
+
+    exporters = [EXPORTERS[name](output_base) for name in formats]
+    started = []
+    try:
+        for exporter in exporters:
+            exporter.begin()
+            started.append(exporter)
+        for _, report in iter_reports(report_paths):
+            for exporter in exporters:
+                exporter.write_report(report)
+    finally:
+        for exporter in started:
+            exporter.close()
+    return [path for exporter in exporters for path in exporter.paths]
@@ -0,0 +1,179 @@
+import re
+import json
+
+# Opening positions tried before giving up on prose full of brackets
+MAX_CANDIDATES = 20
+
+_FENCE = re.compile(r"```[A-Za-z]*[ \t]*\r?\n?(.*?)```", re.S)
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class JSONExtractionError(ValueError):
+    """
+    No JSON value could be recovered from LLM text.
+
+    partial holds the text from the first opening bracket onward and
+    truncated is True when that text ended inside an unclosed value (the
+    usual max_tokens cut-off), so a caller can ask the model to continue it.
+    """
+
+    def __init__(self, message: str, partial: str = "", truncated: bool = False):
+        super().__init__(message)
+        self.partial = partial
+        self.truncated = truncated
+
+
+def _strip_fence(text: str):
+    """Body of the first fenced code block holding JSON, or None."""
+    for match in _FENCE.finditer(text):
+        body = match.group(1).strip()
+        if body[:1] in ("{", "["):
+            return body
+    return None
+
+
+def _scan(text: str, start: int):
+    """
+    Scan one JSON value starting at text[start] in a single pass.
+
+    String literals and escapes are tracked so brackets inside strings are
+    ignored. Commas directly before a closing bracket are dropped. Inside
+    arrays, the positions after each complete element are remembered so a
+    truncated value can be cut back to its last complete element.
+
+    Returns:
+        tuple: (json text, repairs, safe cut points or None if the value closed)
+    """
+    out = []
+    stack = []
+    repairs = []
+    in_string = escape = False
+    comma_at = None
+    safe = []                # (array depth, len(out), open brackets, after an element) at array cut points
+
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch in " \t\r\n":
+            out.append(ch)
+            continue
+
+        if ch in "}]" and comma_at is not None:
+            del out[comma_at]
+            if "trailing_comma" not in repairs:
+                repairs.append("trailing_comma")
+        comma_at = None
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+        elif ch in "}]":
+            if not stack or _CLOSERS[stack[-1]] != ch:
+                raise JSONExtractionError(f"❌ Mismatched '{ch}' in LLM JSON at offset {i}")
+            stack.pop()
+        elif ch == ",":
+            if stack and stack[-1] == "[":
+                safe.append((len(stack), len(out), tuple(stack), True))
+            comma_at = len(out)
+
+        out.append(ch)
+        if not stack:
+            return "".join(out), repairs, None
+        if ch == "[":
+            safe.append((len(stack), len(out), tuple(stack), False))
+        elif ch in "}]" and stack[-1] == "[":
+            safe.append((len(stack), len(out), tuple(stack), True))
+
+    return "".join(out), repairs, safe
+
+
+def _close_truncated(safe: list):
+    """
+    Cut a truncated value back to the last complete element of its
+    outermost array and close every open bracket. None if no array was open
+    or that array has no complete element yet: closing it empty would pass
+    for a valid answer, so the caller should ask the model to continue.
+    """
+    if not safe:
+        return None
+    depth = min(point[0] for point in safe)
+    _, length, stack, after_element = [point for point in safe if point[0] == depth][-1]
+    if not after_element:
+        return None
+    return length, "".join(_CLOSERS[ch] for ch in reversed(stack))
+
+
+def extract_json_value(text: str, return_array: bool = False):
+    """
+    Find and parse the first complete JSON array (return_array=True) or
+    object in LLM text, repairing common defects.
+
+    Repairs applied are reported by name:
+        code_fence      - JSON was taken from a ``` fenced block
+        prose_skipped   - bracketed prose before the JSON was skipped
+        trailing_comma  - commas before a closing bracket were removed
+        truncated       - an unclosed value was cut back to its last complete
+                          array element and closed
+
+    Text after the first balanced value (e.g. a second object or trailing
+    commentary) is ignored.
+
+    Returns:
+        tuple: (parsed value, list of repair names)
+
+    Raises:
+        JSONExtractionError: If nothing parseable can be recovered
+    """
+    repairs = []
+    fenced = _strip_fence(text)
+    if fenced is not None:
+        text = fenced
+        repairs.append("code_fence")
+
+    opener = "[" if return_array else "{"
+    start = text.find(opener)
+    if start == -1:
+        raise JSONExtractionError(f"❌ No JSON found in LLM response:\n{text}")
+
+    error = None
+    for attempt in range(MAX_CANDIDATES):
+        try:
+            json_text, scan_repairs, safe = _scan(text, start)
+        except JSONExtractionError as e:
+            error = e
+        else:
+            if safe is not None:
+                closed = _close_truncated(safe)
+                if closed is None:
+                    raise JSONExtractionError(
+                        "❌ LLM response ended before the JSON was complete",
+                        partial=text[start:], truncated=True
+                    )
+                length, closers = closed
+                json_text = json_text[:length].rstrip().rstrip(",") + closers
+                scan_repairs = scan_repairs + ["truncated"]
+            try:
+                value = json.loads(json_text)
+            except json.JSONDecodeError as e:
+                error = JSONExtractionError(f"❌ JSON parsing failed:\n{e}\n\nExtracted text:\n{json_text}",
+                                            partial=text[start:])
+            else:
+                if attempt:
+                    repairs.append("prose_skipped")
+                return value, repairs + scan_repairs
+
+        start = text.find(opener, start + 1)
+        if start == -1:
+            break
+
+    raise error
@@ -0,0 +1,111 @@
+import json
+
+# Give up if this much text arrives without the JSON array starting
+MAX_PREAMBLE_CHARS = 4000
+
+
+class ArrayItemParser:
+    """
+    Incremental parser that yields the elements of the first JSON array in a
+    text stream as soon as each element is complete.
+
+    Text is fed in arbitrary chunks (e.g. SSE token deltas). Each character
+    is scanned once; string literals and escapes are tracked so brackets
+    inside strings are ignored. Both a bare array and an object wrapping an
+    array (e.g. {"recommendations": [...]}) work, because only the first
+    '[' outside a string is treated as the item array.
+    """
+
+    def __init__(self):
+        self.done = False
+        self.items_parsed = 0
+        self._started = False
+        self._preamble_chars = 0
+        self._depth = 0            # nesting depth relative to the item array
+        self._in_string = False
+        self._escape = False
+        self._item = []            # characters of the element being collected
+
+    def feed(self, text: str):
+        """
+        Consume a chunk of text.
+
+        Returns:
+            list: Elements completed within this chunk
+
+        Raises:
+            ValueError: If the text is not a well-formed JSON array stream
+        """
+        items = []
+        for ch in text:
+            if self.done:
+                break
+            if not self._started:
+                self._scan_preamble(ch)
+            else:
+                self._scan_array(ch, items)
+        return items
+
+    def _scan_preamble(self, ch):
+        # Outer object keys may contain '[', so respect strings here too
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+        elif ch == '"':
+            self._in_string = True
+        elif ch == "[":
+            self._started = True
+            self._depth = 1
+            return
+
+        self._preamble_chars += 1
+        if self._preamble_chars > MAX_PREAMBLE_CHARS:
+            raise ValueError("❌ No JSON array found at the start of the LLM stream")
+
+    def _scan_array(self, ch, items):
+        if self._in_string:
+            self._item.append(ch)
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+            return
+
+        if self._depth == 1:
+            # Between elements of the item array
+            if ch in ", \t\r\n":
+                if ch == "," and self._item:
+                    items.append(self._finish_item())
+                return
+            if ch == "]":
+                if self._item:
+                    items.append(self._finish_item())
+                self.done = True
+                return
+
+        if ch == '"':
+            self._in_string = True
+        elif ch in "{[":
+            self._depth += 1
+        elif ch in "}]":
+            self._depth -= 1
+
+        self._item.append(ch)
+        if self._depth == 1 and ch in "}]":
+            items.append(self._finish_item())
+
+    def _finish_item(self):
+        text = "".join(self._item)
+        self._item = []
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"❌ Malformed JSON element in LLM stream: {e}\n{text}")
+        self.items_parsed += 1
+        return value
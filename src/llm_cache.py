@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+
+# -------------------------------
+# Cache Configuration
+# -------------------------------
+CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join("data", ".llm_cache"))
+
+# Entries expire this many seconds after they were written (default: 7 days)
+CACHE_MAX_AGE = int(os.getenv("LLM_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+# Keep the cache directory under this many bytes (default: 50 MB)
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Scan the cache directory for eviction at most once per this many writes,
+# unless the bytes written since the last scan push it over CACHE_MAX_BYTES
+CACHE_EVICT_INTERVAL = int(os.getenv("LLM_CACHE_EVICT_INTERVAL", "100"))
+
+# Set LLM_CACHE_DISABLED=1 to bypass the cache for every call
+CACHE_DISABLED = os.getenv("LLM_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+
+# Most recently used entries also kept in memory, so long-running processes
+# (e.g. the HTTP service) answer repeated requests without touching disk
+CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+
+CACHE_STATS = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+# `+=` on a dict item is a read then a write: threads update CACHE_STATS under this lock
+_stats_lock = threading.Lock()
+
+# key -> (created timestamp, JSON text); parsed on every hit so callers get a fresh copy.
+# Order is recency of use; created only decides expiry.
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+
+# Estimated directory size and writes since the last eviction scan
+# (bytes is None until this process has scanned once)
+_disk = {"bytes": None, "writes": 0}
+_disk_lock = threading.Lock()
+
+
+def _count(stat: str, n: int = 1) -> None:
+    with _stats_lock:
+        CACHE_STATS[stat] += n
+
+
+def _remember(key: str, created: float, text: str) -> None:
+    if CACHE_MEMORY_ENTRIES <= 0:
+        return
+    with _memory_lock:
+        _memory[key] = (created, text)
+        _memory.move_to_end(key)
+        while len(_memory) > CACHE_MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def cache_key(model: str, system: str, prompt: str, temperature: float,
+              max_tokens: int, return_array: bool = False) -> str:
+    """
+    Build a content-addressed key for an LLM request.
+
+    return_array is part of the key because it changes which JSON value
+    is extracted from the same completion text.
+    """
+    material = json.dumps(
+        [model, system, prompt, temperature, max_tokens, return_array],
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def cache_get(key: str):
+    """
+    Return the cached parsed JSON for key, or None on a miss.
+
+    Entries expire CACHE_MAX_AGE seconds after their stored "created" time,
+    however often they are read; expired entries are removed and counted
+    as misses.
+    """
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            if time.time() - entry[0] <= CACHE_MAX_AGE:
+                _memory.move_to_end(key)
+                _count("hits")
+                return json.loads(entry[1])["value"]
+            del _memory[key]
+
+    path = _entry_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        entry = json.loads(text)
+        created, value = float(entry["created"]), entry["value"]
+    except (OSError, ValueError, KeyError, TypeError):
+        _count("misses")
+        return None
+    if time.time() - created > CACHE_MAX_AGE:
+        try:
+            os.remove(path)
+            _count("evictions")
+        except OSError:
+            pass
+        _count("misses")
+        return None
+    _remember(key, created, text)
+
+    # The file's mtime is its last access time: size-based eviction drops
+    # least recently used entries first (expiry reads "created" instead)
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+    _count("hits")
+    return value
+
+
+def cache_put(key: str, value) -> None:
+    """
+    Store parsed JSON under key.
+
+    The directory is scanned for eviction on the first write in this
+    process, every CACHE_EVICT_INTERVAL writes, and whenever the estimated
+    cache size exceeds CACHE_MAX_BYTES.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _entry_path(key)
+    # Unique per writer, so threads and processes never share a temp file
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    created = time.time()
+    data = json.dumps({"created": created, "value": value}, ensure_ascii=False).encode("utf-8")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    _remember(key, created, data.decode("utf-8"))
+    _count("writes")
+
+    with _disk_lock:
+        _disk["writes"] += 1
+        if _disk["bytes"] is not None:
+            _disk["bytes"] += len(data)
+        due = (_disk["bytes"] is None or _disk["bytes"] > CACHE_MAX_BYTES
+               or _disk["writes"] >= CACHE_EVICT_INTERVAL)
+        if due:
+            _disk["writes"] = 0
+    if due:
+        evict()
+
+
+def evict() -> int:
+    """
+    Remove entries not used for CACHE_MAX_AGE seconds (so certainly
+    expired), then the least recently used ones until the cache fits in
+    CACHE_MAX_BYTES. Only file metadata is read; an entry that was used
+    recently but written too long ago expires when it is next read.
+
+    Returns:
+        int: Number of entries removed
+    """
+    try:
+        names = [n for n in os.listdir(CACHE_DIR) if n.endswith(".json")]
+    except FileNotFoundError:
+        return 0
+
+    now = time.time()
+    entries = []
+    removed = 0
+    for name in names:
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if now - st.st_mtime > CACHE_MAX_AGE:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        else:
+            entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+            total -= size
+        except OSError:
+            pass
+
+    with _disk_lock:
+        _disk["bytes"] = total
+    _count("evictions", removed)
+    return removed
+
+
+def clear_cache() -> int:
+    """Delete every cache entry. Returns the number of entries removed."""
+    with _memory_lock:
+        _memory.clear()
+    with _disk_lock:
+        _disk["bytes"] = None
+    try:
+        names = [n for n in os.listdir(CACHE_DIR) if n.endswith(".json")]
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        try:
+            os.remove(os.path.join(CACHE_DIR, name))
+        except OSError:
+            pass
+    return len(names)
@@ -1,7 +1,19 @@
 import os
+import time
+import asyncio
+import random
+import threading
+import contextvars
+from collections import deque
+from email.utils import parsedate_to_datetime
 import requests
+from requests.adapters import HTTPAdapter
 import json
 from dotenv import load_dotenv
+from src.llm_cache import cache_key, cache_get, cache_put, CACHE_DISABLED
+from src.json_stream import ArrayItemParser
+from src.json_repair import extract_json_value, JSONExtractionError
+from src import metrics as stage_metrics
 
 # Load environment variables from .env
 load_dotenv()
@@ -11,9 +23,6 @@ load_dotenv()
 # -------------------------------
 HF_API_KEY = os.getenv("HF_API_KEY")
 
-if not HF_API_KEY:
-    raise EnvironmentError("❌ HF_API_KEY not found. Add it to your .env file")
-
 # Hugging Face Router Chat Completion endpoint
 MODEL_URL = os.getenv(
     "HF_MODEL_URL",
@@ -31,108 +40,512 @@ MODEL_NAME = os.getenv(
 )
 
 HEADERS = {
-    "Authorization": f"Bearer {HF_API_KEY}",
     "Content-Type": "application/json"
 }
 
+SYSTEM_PROMPT = (
+    "You are a strict JSON generator. "
+    "Return ONLY valid JSON. "
+    "No markdown, no explanation, no text outside JSON."
+)
+
+TEMPERATURE = 0.2
+
 # -------------------------------
-# LLM Call Function
+# HTTP Session & Retry Settings
 # -------------------------------
-def call_llm(prompt: str, max_tokens: int = 1500, return_array: bool = False):
+# Connections kept alive per host; raise this for concurrent batch runs
+POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "10"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30.0"))
+REQUEST_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+# Set LLM_STREAM=1 to have the CLI stream billing records and recommendations
+STREAM_OUTPUT = os.getenv("LLM_STREAM", "").lower() in ("1", "true", "yes")
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Latency/retry record for the most recent calls (newest last)
+CALL_METRICS = deque(maxlen=1000)
+
+# Follow-up calls allowed per response when its JSON cannot be repaired
+JSON_FOLLOWUPS = int(os.getenv("LLM_JSON_FOLLOWUPS", "1"))
+
+# How often each JSON repair / follow-up was needed
+JSON_REPAIRS = {}
+
+CONTINUE_PROMPT = (
+    "The JSON below was cut off before it was complete. Output ONLY the "
+    "remaining characters needed to finish it, starting exactly where it "
+    "stops. Do not repeat any of it.\n\n"
+)
+
+FIX_PROMPT = (
+    "The text below should be a single JSON value but does not parse. "
+    "Return ONLY the corrected JSON, keeping every field and value.\n\n"
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class LLMNotConfiguredError(EnvironmentError):
+    """HF_API_KEY is not set, so no LLM request can be made."""
+
+
+def get_session() -> requests.Session:
     """
-    Calls Hugging Face LLM via Router API and extracts JSON safely.
+    Return the shared keep-alive session, creating it on first use.
+
+    The API key is checked here rather than at import, so commands that
+    never call the LLM work without one.
+
+    Raises:
+        LLMNotConfiguredError: If HF_API_KEY is not set
+    """
+    global _session
+    if _session is None:
+        if not HF_API_KEY:
+            raise LLMNotConfiguredError("❌ HF_API_KEY not found. Add it to your .env file")
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update(HEADERS)
+                session.headers["Authorization"] = f"Bearer {HF_API_KEY}"
+                _session = session
+    return _session
+
+
+def _retry_after_seconds(response):
+    """Parse a Retry-After header (seconds or HTTP date); None if absent."""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff_delay(attempt: int, response=None) -> float:
+    """Exponential backoff with full jitter, overridden by Retry-After."""
+    retry_after = _retry_after_seconds(response)
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _post_once(session, body: bytes, stream: bool, attempt: int, metrics: dict):
+    """
+    One attempt of post_with_retry.
+
+    Returns:
+        tuple: (response, None) when done, or (None, delay) to retry after delay seconds
+    """
+    metrics["attempts"] = attempt + 1
+    try:
+        response = session.post(
+            MODEL_URL,
+            data=body,
+            timeout=REQUEST_TIMEOUT,
+            stream=stream
+        )
+    except requests.exceptions.RequestException as e:
+        if attempt == MAX_RETRIES:
+            raise Exception(f"❌ Network error while calling LLM: {e}")
+        metrics["retries"] += 1
+        return None, _backoff_delay(attempt)
+
+    metrics["status"] = response.status_code
+    if response.status_code in RETRY_STATUS_CODES and attempt < MAX_RETRIES:
+        metrics["retries"] += 1
+        delay = _backoff_delay(attempt, response)
+        response.close()
+        return None, delay
+    return response, None
+
+
+def _record_call(metrics: dict, started: float, body: bytes) -> None:
+    metrics["latency_s"] = round(time.perf_counter() - started, 4)
+    CALL_METRICS.append(metrics)
+    stage_metrics.add(llm_calls=1, llm_s=metrics["latency_s"], retries=metrics["retries"],
+                      bytes_sent=len(body) * metrics["attempts"])
+
+
+def post_with_retry(payload: dict, stream: bool = False):
+    """
+    POST payload to MODEL_URL over the shared session, retrying network
+    errors and 429/5xx responses.
 
     Args:
-        prompt (str): User prompt (must ask for JSON output)
-        max_tokens (int): Maximum tokens to generate
-        return_array (bool): Expect JSON array if True, else JSON object
+        payload (dict): Chat completion request body
+        stream (bool): Leave the response body unread for streaming
 
     Returns:
-        dict or list: Parsed JSON output from LLM
+        requests.Response: Final response (may be a non-200 after retries)
     """
+    session = get_session()
+    started = time.perf_counter()
+    metrics = {"latency_s": 0.0, "attempts": 0, "retries": 0, "status": None}
+    # Serialized once, not per attempt
+    body = json.dumps(payload).encode("utf-8")
+
+    try:
+        for attempt in range(MAX_RETRIES + 1):
+            response, delay = _post_once(session, body, stream, attempt, metrics)
+            if delay is None:
+                return response
+            time.sleep(delay)
+    finally:
+        _record_call(metrics, started, body)
+
 
+async def apost_with_retry(payload: dict, executor=None):
+    """
+    Asyncio counterpart of post_with_retry over the same pooled session.
+
+    Each attempt's blocking request runs on executor (default: the loop's
+    default executor); backoff between attempts is an asyncio.sleep, so
+    waiting retries hold no thread.
+
+    Returns:
+        requests.Response: Final response (may be a non-200 after retries)
+    """
+    session = get_session()
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    metrics = {"latency_s": 0.0, "attempts": 0, "retries": 0, "status": None}
+    body = json.dumps(payload).encode("utf-8")
+
+    try:
+        for attempt in range(MAX_RETRIES + 1):
+            response, delay = await loop.run_in_executor(
+                executor, _post_once, session, body, False, attempt, metrics)
+            if delay is None:
+                return response
+            await asyncio.sleep(delay)
+    finally:
+        _record_call(metrics, started, body)
+
+# -------------------------------
+# Request / Response Helpers
+# -------------------------------
+def _build_payload(prompt: str, max_tokens: int, stream: bool = False) -> dict:
     payload = {
         "model": MODEL_NAME,
         "messages": [
             {
                 "role": "system",
-                "content": (
-                    "You are a strict JSON generator. "
-                    "Return ONLY valid JSON. "
-                    "No markdown, no explanation, no text outside JSON."
-                )
+                "content": SYSTEM_PROMPT
             },
             {
                 "role": "user",
                 "content": prompt
             }
         ],
-        "temperature": 0.2,
+        "temperature": TEMPERATURE,
         "max_tokens": max_tokens
     }
+    if stream:
+        payload["stream"] = True
+    return payload
+
+
+def _raise_for_status(response) -> None:
+    """Raise a descriptive exception for a non-200 router response."""
+    if response.status_code == 200:
+        return
+
+    error_text = response.text
+    error_msg = f"❌ LLM API Error {response.status_code}:\n{error_text}"
+    
+    # Provide helpful suggestions for common errors
+    if response.status_code == 400:
+        try:
+            error_json = response.json()
+            if "model_not_supported" in error_text or "model" in error_json.get("error", {}).get("code", ""):
+                error_msg += "\n\n💡 Suggestion: The model is not available on this endpoint."
+                error_msg += "\n   Try setting HF_MODEL_NAME in .env to one of these:"
+                error_msg += "\n   - meta-llama/Llama-3.1-8B-Instruct"
+                error_msg += "\n   - mistralai/Mistral-7B-Instruct-v0.2"
+                error_msg += "\n   - google/gemma-7b-it"
+        except:
+            pass
+    
+    raise Exception(error_msg)
 
+
+def _record_usage(result: dict, nbytes: int) -> None:
+    """Add the router's token usage and the response size to the current stage's metrics."""
+    usage = result.get("usage") or {}
+    stage_metrics.add(
+        bytes_received=nbytes,
+        prompt_tokens=usage.get("prompt_tokens") or 0,
+        completion_tokens=usage.get("completion_tokens") or 0,
+    )
+
+
+def _completion_text(response) -> str:
+    """
+    Message content of a non-streamed completion, recording its usage.
+
+    A body that is not JSON (e.g. an HTML error page with status 200) or
+    lacks choices[0].message.content raises like any malformed response.
+    """
     try:
-        response = requests.post(
-            MODEL_URL,
-            headers=HEADERS,
-            json=payload,
-            timeout=60
-        )
-    except requests.exceptions.RequestException as e:
-        raise Exception(f"❌ Network error while calling LLM: {e}")
+        result = response.json()
+        _record_usage(result, len(response.content))
+        return result["choices"][0]["message"]["content"]
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+        raise Exception(f"❌ Unexpected LLM response format:\n{response.text}")
 
-    # -------------------------------
-    # Error Handling
-    # -------------------------------
-    if response.status_code != 200:
-        error_text = response.text
-        error_msg = f"❌ LLM API Error {response.status_code}:\n{error_text}"
-        
-        # Provide helpful suggestions for common errors
-        if response.status_code == 400:
-            try:
-                error_json = response.json()
-                if "model_not_supported" in error_text or "model" in error_json.get("error", {}).get("code", ""):
-                    error_msg += "\n\n💡 Suggestion: The model is not available on this endpoint."
-                    error_msg += "\n   Try setting HF_MODEL_NAME in .env to one of these:"
-                    error_msg += "\n   - meta-llama/Llama-3.1-8B-Instruct"
-                    error_msg += "\n   - mistralai/Mistral-7B-Instruct-v0.2"
-                    error_msg += "\n   - google/gemma-7b-it"
-            except:
-                pass
-        
-        raise Exception(error_msg)
-
-    result = response.json()
 
-    # -------------------------------
-    # Extract text from HF response
-    # -------------------------------
+def _count_repairs(repairs) -> None:
+    for name in repairs:
+        JSON_REPAIRS[name] = JSON_REPAIRS.get(name, 0) + 1
+    if repairs:
+        print(f"   🔧 Repaired LLM JSON: {', '.join(repairs)}")
+
+
+def extract_json(text: str, return_array: bool = False):
+    """
+    Extract the JSON array (return_array=True) or object from LLM text,
+    repairing code fences, trailing commas and truncation
+    (see src/json_repair.py).
+
+    Raises:
+        ValueError: If no JSON is found or it fails to parse
+    """
+    started = time.perf_counter()
     try:
-        text = result["choices"][0]["message"]["content"].strip()
-    except (KeyError, IndexError):
-        raise Exception(f"❌ Unexpected LLM response format:\n{result}")
+        value, repairs = extract_json_value(text, return_array)
+    finally:
+        stage_metrics.add(parse_s=time.perf_counter() - started)
+    _count_repairs(repairs)
+    return value
+
+
+def _followup_text(error: JSONExtractionError, text: str, max_tokens: int) -> str:
+    """
+    Recover unrepairable JSON with one small follow-up request that carries
+    only the broken output, not the original prompt.
+
+    A truncated value is continued and the two parts joined; anything else
+    is sent back to be corrected.
+
+    Returns:
+        str: Text to extract the JSON from next
+    """
+    if error.truncated:
+        prompt = CONTINUE_PROMPT + error.partial
+        repair = "continued"
+    else:
+        prompt = FIX_PROMPT + (error.partial or text)
+        repair = "regenerated"
+
+    response = post_with_retry(_build_payload(prompt, max_tokens))
+    _raise_for_status(response)
+    reply = _completion_text(response)
+
+    _count_repairs([repair])
+    return error.partial + reply if error.truncated else reply
+
+# -------------------------------
+# LLM Call Function
+# -------------------------------
+def call_llm(prompt: str, max_tokens: int = 1500, return_array: bool = False,
+             use_cache: bool = True):
+    """
+    Calls Hugging Face LLM via Router API and extracts JSON safely.
+
+    Responses are cached on disk (see src/llm_cache.py), so repeating an
+    identical request returns the stored JSON without any HTTP call.
+
+    Common JSON defects are repaired locally. If the JSON still cannot be
+    recovered, a follow-up call asks the model to continue (truncated) or
+    correct (malformed) only its own output.
+
+    Args:
+        prompt (str): User prompt (must ask for JSON output)
+        max_tokens (int): Maximum tokens to generate
+        return_array (bool): Expect JSON array if True, else JSON object
+        use_cache (bool): Read from and write to the response cache
+
+    Returns:
+        dict or list: Parsed JSON output from LLM
+    """
+
+    use_cache = use_cache and not CACHE_DISABLED
+    key = cache_key(MODEL_NAME, SYSTEM_PROMPT, prompt, TEMPERATURE, max_tokens, return_array)
+    if use_cache:
+        cached = cache_get(key)
+        if cached is not None:
+            return cached
+
+    response = post_with_retry(_build_payload(prompt, max_tokens))
+    _raise_for_status(response)
 
     # -------------------------------
-    # Extract JSON safely
+    # Extract text from HF response
     # -------------------------------
-    if return_array:
-        start = text.find("[")
-        end = text.rfind("]") + 1
-    else:
-        start = text.find("{")
-        end = text.rfind("}") + 1
+    text = _completion_text(response).strip()
 
-    if start == -1 or end == -1:
-        raise ValueError(
-            f"❌ No JSON found in LLM response:\n{text}"
-        )
+    # Unrepairable JSON gets up to JSON_FOLLOWUPS small follow-up calls
+    for followup in range(JSON_FOLLOWUPS + 1):
+        try:
+            parsed = extract_json(text, return_array)
+            break
+        except JSONExtractionError as e:
+            if followup == JSON_FOLLOWUPS:
+                raise
+            text = _followup_text(e, text, max_tokens)
+
+    if use_cache:
+        cache_put(key, parsed)
+
+    return parsed
+
+
+async def acall_llm(prompt: str, max_tokens: int = 1500, return_array: bool = False,
+                    use_cache: bool = True, executor=None):
+    """
+    Asyncio counterpart of call_llm with the same caching, retries, JSON
+    repair and follow-up recovery.
 
-    json_text = text[start:end]
+    The request goes through apost_with_retry on the shared session, so
+    many calls can be awaited at once; at most as many are on the wire as
+    executor has threads (default: the loop's default executor).
+    Follow-up calls are rare and run the blocking _followup_text on the
+    same executor.
 
+    Returns:
+        dict or list: Parsed JSON output from LLM
+    """
+    use_cache = use_cache and not CACHE_DISABLED
+    key = cache_key(MODEL_NAME, SYSTEM_PROMPT, prompt, TEMPERATURE, max_tokens, return_array)
+    if use_cache:
+        cached = cache_get(key)
+        if cached is not None:
+            return cached
+
+    response = await apost_with_retry(_build_payload(prompt, max_tokens), executor)
+    _raise_for_status(response)
+    text = _completion_text(response).strip()
+
+    loop = asyncio.get_running_loop()
+    for followup in range(JSON_FOLLOWUPS + 1):
+        try:
+            parsed = extract_json(text, return_array)
+            break
+        except JSONExtractionError as e:
+            if followup == JSON_FOLLOWUPS:
+                raise
+            # Copy the context so the follow-up's metrics land in the caller's stage
+            text = await loop.run_in_executor(executor, contextvars.copy_context().run,
+                                              _followup_text, e, text, max_tokens)
+
+    if use_cache:
+        cache_put(key, parsed)
+
+    return parsed
+
+# -------------------------------
+# Streaming LLM Call
+# -------------------------------
+def _cached_items(value):
+    """Items a stream would have yielded for a cached parsed response."""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        for item in value.values():
+            if isinstance(item, list):
+                return item
+    return []
+
+
+def _iter_sse_content(response, usage: dict = None):
+    """
+    Yield content deltas from an OpenAI-style server-sent event stream.
+
+    If the router sends a usage object (usually on the final chunk, which
+    may have no choices) it is copied into usage.
+    """
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        try:
+            chunk = json.loads(data)
+            if chunk.get("usage") and usage is not None:
+                usage.update(chunk["usage"])
+            choices = chunk["choices"]
+            delta = choices[0].get("delta", {}).get("content") if choices else None
+        except (ValueError, KeyError, IndexError, AttributeError):
+            raise Exception(f"❌ Unexpected LLM stream chunk:\n{data}")
+        if delta:
+            yield delta
+
+
+def stream_llm(prompt: str, max_tokens: int = 1500, return_array: bool = False,
+               use_cache: bool = True):
+    """
+    Stream a completion and yield each element of the first JSON array in
+    it as soon as that element is complete.
+
+    For billing prompts this yields billing records; for the
+    {"recommendations": [...]} object it yields each recommendation.
+    Closing the generator early (e.g. after a validation failure) closes
+    the HTTP stream, so the router stops generating tokens.
+
+    The full response is cached exactly as call_llm would cache it.
+
+    Yields:
+        Parsed JSON elements of the response array
+    """
+    use_cache = use_cache and not CACHE_DISABLED
+    key = cache_key(MODEL_NAME, SYSTEM_PROMPT, prompt, TEMPERATURE, max_tokens, return_array)
+    if use_cache:
+        cached = cache_get(key)
+        if cached is not None:
+            yield from _cached_items(cached)
+            return
+
+    response = post_with_retry(_build_payload(prompt, max_tokens, stream=True), stream=True)
     try:
-        return json.loads(json_text)
-    except json.JSONDecodeError as e:
-        raise ValueError(
-            f"❌ JSON parsing failed:\n{e}\n\nExtracted text:\n{json_text}"
-        )
+        _raise_for_status(response)
+
+        parser = ArrayItemParser()
+        chunks = []
+        usage = {}
+        # Time spent waiting on the stream, excluding the consumer's work between items
+        waiting = 0.0
+        wait_started = time.perf_counter()
+        for delta in _iter_sse_content(response, usage):
+            waiting += time.perf_counter() - wait_started
+            chunks.append(delta)
+            yield from parser.feed(delta)
+            wait_started = time.perf_counter()
+        waiting += time.perf_counter() - wait_started
+        stage_metrics.add(llm_s=waiting)
+        _record_usage({"usage": usage}, sum(len(chunk.encode("utf-8")) for chunk in chunks))
+
+        if not parser.done:
+            raise ValueError(
+                "❌ LLM stream ended before the JSON array was complete "
+                f"(max_tokens={max_tokens} may be too low)"
+            )
+    finally:
+        response.close()
+
+    if use_cache:
+        cache_put(key, extract_json("".join(chunks).strip(), return_array))
@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+
+# One dict per completed stage run, oldest first
+STAGE_METRICS = []
+
+# (record key, Prometheus metric name, help text) in summary order
+METRIC_FIELDS = [
+    ("wall_s", "cco_stage_duration_seconds_total", "Wall time spent in the stage"),
+    ("llm_calls", "cco_llm_calls_total", "LLM requests made"),
+    ("llm_s", "cco_llm_request_seconds_total", "Time waiting on LLM responses (network and generation)"),
+    ("retries", "cco_llm_retries_total", "LLM request retries"),
+    ("prompt_tokens", "cco_llm_prompt_tokens_total", "Prompt tokens reported by the router"),
+    ("completion_tokens", "cco_llm_completion_tokens_total", "Completion tokens reported by the router"),
+    ("parse_s", "cco_json_parse_seconds_total", "Time extracting JSON from LLM output"),
+    ("validate_s", "cco_validate_seconds_total", "Time validating records against schemas"),
+    ("bytes_sent", "cco_llm_bytes_sent_total", "Request bytes sent to the LLM"),
+    ("bytes_received", "cco_llm_bytes_received_total", "Response bytes received from the LLM"),
+    ("bytes_read", "cco_file_bytes_read_total", "Input file bytes read"),
+    ("bytes_written", "cco_file_bytes_written_total", "Output file bytes written"),
+]
+
+_current = contextvars.ContextVar("cco_stage", default=None)
+_lock = threading.Lock()
+
+
+def add(**values) -> None:
+    """
+    Add values to the stage running in this context; a no-op outside a
+    stage. Threads started with contextvars.copy_context() (and
+    asyncio.to_thread) report into the stage that started them.
+    """
+    record = _current.get()
+    if record is None:
+        return
+    with _lock:
+        for key, value in values.items():
+            record[key] = record.get(key, 0) + value
+
+
+def add_file_read(path: str) -> None:
+    try:
+        add(bytes_read=os.path.getsize(path))
+    except OSError:
+        pass
+
+
+def add_file_written(path: str) -> None:
+    try:
+        add(bytes_written=os.path.getsize(path))
+    except OSError:
+        pass
+
+
+@contextmanager
+def stage(name: str):
+    """Record wall time and every add() made while the block runs as one stage run."""
+    record = {"stage": name}
+    token = _current.set(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["wall_s"] = time.perf_counter() - started
+        _current.reset(token)
+        with _lock:
+            STAGE_METRICS.append(record)
+
+
+def timed_stage(name: str):
+    """Decorator running the function inside stage(name)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def summarize(records=None) -> dict:
+    """Totals per stage name: {stage: {"runs": n, "wall_s": ..., "llm_calls": ..., ...}}."""
+    totals = {}
+    for record in (STAGE_METRICS if records is None else records):
+        entry = totals.setdefault(record["stage"], {"runs": 0})
+        # Records merged by compact() stand for several runs
+        entry["runs"] += record.get("runs", 1)
+        for key, _, _ in METRIC_FIELDS:
+            entry[key] = entry.get(key, 0) + record.get(key, 0)
+        entry["max_wall_s"] = max(entry.get("max_wall_s", 0), record.get("max_wall_s", record.get("wall_s", 0)))
+    return totals
+
+
+def compact(max_records: int = 1000) -> None:
+    """
+    Keep STAGE_METRICS bounded in long-running processes: once it holds more
+    than max_records, the oldest records are merged into one per stage, so
+    summarize() totals (and Prometheus counters) never go down.
+    """
+    with _lock:
+        if len(STAGE_METRICS) <= max_records:
+            return
+        old = STAGE_METRICS[:len(STAGE_METRICS) - max_records // 2]
+        merged = [dict(totals, stage=name) for name, totals in summarize(old).items()]
+        STAGE_METRICS[:len(old)] = merged
+
+
+def _size(n) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+
+
+def format_profile(records=None) -> str:
+    """Human-readable per-stage table for --profile."""
+    totals = summarize(records)
+    if not totals:
+        return "No stages recorded."
+    lines = [
+        f"{'stage':<10} {'runs':>4} {'wall s':>8} {'llm s':>8} {'parse s':>8} {'valid s':>8} "
+        f"{'calls':>5} {'retry':>5} {'prompt tok':>10} {'compl tok':>9} {'read':>8} {'written':>8}"
+    ]
+    for name, t in totals.items():
+        lines.append(
+            f"{name:<10} {t['runs']:>4} {t['wall_s']:>8.3f} {t['llm_s']:>8.3f} {t['parse_s']:>8.3f} "
+            f"{t['validate_s']:>8.3f} {t['llm_calls']:>5} {t['retries']:>5} {t['prompt_tokens']:>10,} "
+            f"{t['completion_tokens']:>9,} {_size(t['bytes_read']):>8} {_size(t['bytes_written']):>8}"
+        )
+    return "\n".join(lines)
+
+
+def to_prometheus(records=None) -> str:
+    """Per-stage totals in the Prometheus text exposition format."""
+    totals = summarize(records)
+    lines = [
+        "# HELP cco_stage_runs_total Completed stage runs",
+        "# TYPE cco_stage_runs_total counter",
+    ]
+    lines += [f'cco_stage_runs_total{{stage="{name}"}} {t["runs"]}' for name, t in totals.items()]
+    lines += [
+        "# HELP cco_stage_duration_seconds_max Slowest single run of the stage",
+        "# TYPE cco_stage_duration_seconds_max gauge",
+    ]
+    lines += [f'cco_stage_duration_seconds_max{{stage="{name}"}} {t["max_wall_s"]:.6f}'
+              for name, t in totals.items()]
+    for key, metric, help_text in METRIC_FIELDS:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for name, t in totals.items():
+            value = t[key]
+            lines.append(f'{metric}{{stage="{name}"}} {value:.6f}' if isinstance(value, float)
+                         else f'{metric}{{stage="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path: str, records=None) -> None:
+    """
+    Write metrics to path: JSON (per-run records plus per-stage totals) for
+    a .json file, Prometheus text for anything else (e.g. .prom).
+    """
+    records = STAGE_METRICS if records is None else records
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            json.dump({"stages": summarize(records), "runs": records}, f, indent=2)
+        else:
+            f.write(to_prometheus(records))
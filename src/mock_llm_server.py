@@ -0,0 +1,254 @@
+"""
+Local stand-in for the Hugging Face router's /v1/chat/completions endpoint,
+for benchmarks and offline runs.
+
+Usage:
+    python -m src.mock_llm_server [--port 8080] [--latency 0.2] [--error-rate 0.1]
+
+then point the client at it:
+    HF_MODEL_URL=http://127.0.0.1:8080/v1/chat/completions HF_API_KEY=mock python main.py
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8080
+
+CANNED_PROFILE = {
+    "name": "Food Delivery App",
+    "budget_inr_per_month": 50000,
+    "description": "A scalable food delivery platform serving ~10k monthly users.",
+    "tech_stack": {"frontend": "React", "backend": "Node.js", "database": "PostgreSQL", "hosting": "AWS"},
+    "non_functional_requirements": ["scalability", "high availability", "low latency"],
+}
+
+# (service, resource_id, region, usage_type, usage_quantity, unit, cost_inr, desc)
+_CANNED_BILLING_ROWS = [
+    ("EC2", "i-0a1b2c3d4e5f60001", "ap-south-1", "BoxUsage:m5.large", 600, "hours", 4782.0, "API server"),
+    ("EC2", "i-0a1b2c3d4e5f60002", "ap-south-1", "BoxUsage:m5.large", 600, "hours", 4782.0, "API server"),
+    ("EC2", "i-0a1b2c3d4e5f60003", "ap-south-1", "BoxUsage:c5.xlarge", 500, "hours", 7055.0, "Batch worker"),
+    ("EC2", "i-0a1b2c3d4e5f60004", "ap-south-1", "BoxUsage:r5.2xlarge", 744, "hours", 31130.0, "Cache node"),
+    ("RDS", "db-orders-primary", "ap-south-1", "InstanceUsage:db.m5.large", 744, "hours", 9850.0, "PostgreSQL primary"),
+    ("RDS", "db-orders-replica", "ap-south-1", "InstanceUsage:db.m5.large", 744, "hours", 9850.0, "PostgreSQL replica"),
+    ("S3", "s3-assets-bucket", "ap-south-1", "TimedStorage-ByteHrs", 1800, "GB-month", 3240.0, "Static assets"),
+    ("S3", "s3-logs-bucket", "ap-south-1", "TimedStorage-ByteHrs", 950, "GB-month", 1710.0, "Access logs"),
+    ("CloudFront", "cf-dist-main", "global", "DataTransfer-Out-Bytes", 2500, "GB", 4150.0, "CDN for web app"),
+    ("Lambda", "fn-notifications", "ap-south-1", "Request", 3000000, "requests", 1250.0, "Push notifications"),
+    ("DynamoDB", "ddb-sessions", "ap-south-1", "WriteCapacityUnit-Hrs", 1440, "hours", 2100.0, "Session store"),
+    ("CloudWatch", "cw-logs-main", "ap-south-1", "DataProcessing-Bytes", 300, "GB", 1520.0, "Application logs"),
+    ("Load Balancer", "alb-public", "ap-south-1", "LoadBalancerUsage", 744, "hours", 1870.0, "Public ALB"),
+    ("ElastiCache", "redis-cluster-1", "ap-south-1", "NodeUsage:cache.t3.medium", 600, "hours", 2701.0, "Redis cache"),
+]
+
+CANNED_BILLING = [
+    {"month": "2025-01", "service": s, "resource_id": rid, "region": region, "usage_type": usage_type,
+     "usage_quantity": qty, "unit": unit, "cost_inr": cost, "desc": desc}
+    for s, rid, region, usage_type, qty, unit, cost, desc in _CANNED_BILLING_ROWS
+]
+
+CANNED_RECOMMENDATIONS = {
+    "recommendations": [
+        {
+            "title": f"Optimize {service} spend",
+            "service": service,
+            "current_cost": cost,
+            "potential_savings": round(cost * 0.3, 2),
+            "recommendation_type": rec_type,
+            "description": f"Reduce {service} cost with {rec_type.replace('_', ' ')} changes.",
+            "implementation_effort": "medium",
+            "risk_level": "low",
+            "steps": ["Review current usage", "Apply the change in staging", "Roll out and monitor"],
+            "cloud_providers": ["AWS", "Azure", "GCP"],
+        }
+        for service, cost, rec_type in [
+            ("EC2", 47749.0, "right_sizing"), ("RDS", 19700.0, "optimization"),
+            ("S3", 4950.0, "cost-effective_storage"), ("CloudFront", 4150.0, "alternative_provider"),
+            ("ElastiCache", 2701.0, "open_source"), ("DynamoDB", 2100.0, "optimization"),
+            ("Load Balancer", 1870.0, "alternative_provider"), ("CloudWatch", 1520.0, "open_source"),
+        ]
+    ]
+}
+
+# (prompt substring, response) checked in order; the last entry matches anything
+DEFAULT_RESPONSES = [
+    ("extracts structured project", CANNED_PROFILE),
+    ("billing data generator", CANNED_BILLING),
+    ("", CANNED_RECOMMENDATIONS),
+]
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """
+    ThreadingHTTPServer answering chat completion requests with canned JSON.
+
+    Args:
+        port (int): Port to listen on (0 picks a free one)
+        latency (float): Seconds to wait before every response
+        jitter (float): Extra random latency, uniform in [0, jitter]
+        error_rate (float): Fraction of requests answered with error_status
+        error_status (int): Status for injected errors (429 and 503 carry Retry-After: 0)
+        stream_chunk_chars (int): Characters per server-sent event when streaming
+        stream_chunk_delay (float): Seconds between streamed events
+        responses (list): (prompt substring, response) pairs; strings are sent
+            verbatim, anything else as JSON
+        seed (int): Seed for jitter and error injection
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = DEFAULT_PORT, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503, stream_chunk_chars: int = 16,
+                 stream_chunk_delay: float = 0.0, responses=None, seed: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stream_chunk_chars = max(1, stream_chunk_chars)
+        self.stream_chunk_delay = stream_chunk_delay
+        self.responses = responses or DEFAULT_RESPONSES
+        self.stats = {"requests": 0, "errors": 0, "streamed": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/v1/chat/completions"
+
+    def content_for(self, prompt: str) -> str:
+        for match, response in self.responses:
+            if match in prompt:
+                return response if isinstance(response, str) else json.dumps(response, ensure_ascii=False)
+        return "{}"
+
+    def _draw(self):
+        """(delay seconds, inject error?) for one request."""
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.stats["errors"] += 1
+        return delay, failed
+
+    def start(self):
+        """Serve from a daemon thread and return self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; avoid delayed-ACK stalls
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            prompt = body["messages"][-1]["content"]
+        except (ValueError, KeyError, IndexError, TypeError):
+            return self._send_json(400, {"error": {"message": "Malformed chat completion request"}})
+
+        delay, failed = server._draw()
+        if delay:
+            time.sleep(delay)
+        if failed:
+            headers = {"Retry-After": "0"} if server.error_status in (429, 503) else {}
+            return self._send_json(server.error_status, {"error": {"message": "Injected mock error"}}, headers)
+
+        content = server.content_for(prompt)
+        if body.get("stream"):
+            with server._lock:
+                server.stats["streamed"] += 1
+            return self._send_stream(content)
+
+        self._send_json(200, {
+            "id": "mock-completion",
+            "object": "chat.completion",
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        })
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, content: str):
+        server = self.server
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        step = server.stream_chunk_chars
+        try:
+            for i in range(0, len(content), step):
+                event = {"choices": [{"index": 0, "delta": {"content": content[i:i + step]}}]}
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                if server.stream_chunk_delay:
+                    time.sleep(server.stream_chunk_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client closed the stream early (e.g. after a validation failure)
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def load_responses(path: str) -> list:
+    """
+    Read canned responses from a JSON file: a list of {"match": "<prompt
+    substring>", "response": <string or JSON>} objects, checked in order.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    return [(entry.get("match", ""), entry["response"]) for entry in entries]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local mock of the HF chat completions endpoint.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status for injected failures")
+    parser.add_argument("--stream-chunk-chars", type=int, default=16, help="Characters per streamed event")
+    parser.add_argument("--stream-chunk-delay", type=float, default=0.0, help="Seconds between streamed events")
+    parser.add_argument("--responses", help="JSON file of canned responses (see load_responses)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for jitter and error injection")
+    args = parser.parse_args(argv)
+
+    server = MockLLMServer(
+        port=args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        error_status=args.error_status, stream_chunk_chars=args.stream_chunk_chars,
+        stream_chunk_delay=args.stream_chunk_delay,
+        responses=load_responses(args.responses) if args.responses else None, seed=args.seed,
+    )
+    print(f"✅ Mock LLM server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
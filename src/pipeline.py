@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import hashlib
+from src.llm_client import MODEL_NAME
+from src.profile_extractor import extract_project_profile, PROMPT_VERSION as PROFILE_PROMPT_VERSION
+from src.billing_generator import generate_billing, generate_billing_local, PROMPT_VERSION as BILLING_PROMPT_VERSION
+from src.cost_analyzer import analyze_cost, PROMPT_VERSION as ANALYSIS_PROMPT_VERSION, SHARDED_RECOMMENDATIONS
+from src.billing_shards import BILLING_WORKERS, expand_billing_paths
+from src.prompt_builder import PROMPT_TOKEN_BUDGET
+from src.price_catalog import PRICE_CATALOG_PATH
+
+MANIFEST_FILENAME = ".pipeline_manifest.json"
+
+# Stages that call the LLM; with use_llm=False an existing output is reused instead
+LLM_STAGES = ("profile", "billing")
+
+
+def _file_digest(path: str):
+    """SHA-256 of a file's bytes, or None if it does not exist."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def _fingerprint(parts: dict) -> str:
+    material = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _files_state(paths) -> list:
+    """(path, size, mtime_ns) per file: enough to notice a changed export without hashing hundreds of them."""
+    state = []
+    for path in paths:
+        st = os.stat(path)
+        state.append([os.path.abspath(path), st.st_size, st.st_mtime_ns])
+    return state
+
+
+def _stages(data_dir: str, stream: bool, billing_files=None, workers: int = BILLING_WORKERS,
+            use_llm: bool = True):
+    """
+    (name, label, inputs, output path, run) for each stage, in order.
+
+    inputs is called just before the stage runs, so it sees the outputs of
+    the stages before it. With billing_files (paths or globs) the billing
+    stage is dropped and the analysis reads those files instead. With
+    use_llm=False no stage calls the LLM: the analysis keeps only rule-based
+    recommendations, a missing mock_billing.json is generated locally and a
+    missing project_profile.json is an error.
+    """
+    description = os.path.join(data_dir, "project_description.txt")
+    profile = os.path.join(data_dir, "project_profile.json")
+    billing = os.path.join(data_dir, "mock_billing.json")
+    report = os.path.join(data_dir, "cost_optimization_report.json")
+
+    billing_paths = expand_billing_paths(billing_files) if billing_files else None
+
+    def analysis_inputs():
+        if billing_paths:
+            billing_input = {"billing_files": _files_state(billing_paths)}
+        else:
+            billing_input = {"billing": _file_digest(billing)}
+        return {"profile": _file_digest(profile), **billing_input,
+                "price_catalog": _file_digest(PRICE_CATALOG_PATH), "model": MODEL_NAME,
+                "prompt_version": ANALYSIS_PROMPT_VERSION, "token_budget": PROMPT_TOKEN_BUDGET, "sharded": SHARDED_RECOMMENDATIONS,
+                "use_llm": use_llm}
+
+    def offline_profile():
+        raise FileNotFoundError("❌ project_profile.json not found. Without the LLM (--no-llm) "
+                                "the profile cannot be extracted; run once with the LLM or write it by hand.")
+
+    stages = [
+        ("profile", "Extracting project profile",
+         lambda: {"description": _file_digest(description), "model": MODEL_NAME,
+                  "prompt_version": PROFILE_PROMPT_VERSION},
+         profile,
+         (lambda: extract_project_profile(data_dir)) if use_llm else offline_profile),
+        ("billing", "Generating synthetic billing data",
+         lambda: {"profile": _file_digest(profile), "model": MODEL_NAME,
+                  "prompt_version": BILLING_PROMPT_VERSION, **({} if use_llm else {"generator": "local"})},
+         billing,
+         (lambda: generate_billing(data_dir, stream=stream)) if use_llm else (lambda: generate_billing_local(data_dir))),
+        ("analysis", "Analyzing costs and generating recommendations",
+         analysis_inputs,
+         report,
+         lambda: analyze_cost(data_dir, stream=stream, billing_path=billing_paths, use_llm=use_llm,
+                              workers=workers)),
+    ]
+    return [stage for stage in stages if not (billing_paths and stage[0] == "billing")]
+
+
+def load_manifest(data_dir: str) -> dict:
+    try:
+        with open(os.path.join(data_dir, MANIFEST_FILENAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_manifest(data_dir: str, manifest: dict) -> None:
+    with open(os.path.join(data_dir, MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def run_pipeline(data_dir: str = "data", force: bool = False, stream: bool = False, billing_files=None,
+                 workers: int = BILLING_WORKERS, use_llm: bool = True) -> list:
+    """
+    Run profile extraction -> billing generation -> cost analysis, skipping
+    every stage whose inputs are unchanged since its last successful run.
+
+    A stage's fingerprint covers its input files (by content hash), the
+    model name and its prompt template version. A stage also reruns if its
+    output file is missing. Hand edits to an output (e.g. the budget in
+    project_profile.json) are kept, and only the stages downstream of it
+    rerun.
+
+    With use_llm=False the run works offline: profile and billing outputs
+    that exist are reused as they are (status "reused"), even if stale or
+    forced, and a missing billing file is generated locally. A later run
+    with the LLM reruns a locally generated billing stage.
+
+    Args:
+        data_dir (str): Directory holding the pipeline files and manifest
+        force (bool): Rerun every stage regardless of the manifest
+        stream (bool): Stream LLM output for the billing and analysis stages
+        billing_files: Billing files or globs to analyse instead of generating
+            mock_billing.json; changes are detected by size and modification time
+        workers (int): Worker processes parsing billing_files
+        use_llm (bool): Ask the LLM for recommendations beyond the rule-based ones
+
+    Returns:
+        list: One dict per stage with name, status ("ran", "skipped" or "reused") and seconds
+    """
+    manifest = load_manifest(data_dir)
+    timings = []
+
+    for step, (name, label, inputs, output, run) in enumerate(_stages(data_dir, stream, billing_files, workers, use_llm), 1):
+        print(f"\nStep {step}: {label}...")
+        started = time.perf_counter()
+        fingerprint = _fingerprint(inputs())
+        previous = manifest.get(name, {})
+
+        if not force and previous.get("inputs") == fingerprint and os.path.exists(output):
+            status = "skipped"
+            print(f"   ⏭️  Inputs unchanged, reusing {os.path.basename(output)}")
+        elif not use_llm and name in LLM_STAGES and os.path.exists(output):
+            status = "reused"
+            print(f"   ⏭️  Without the LLM, reusing the existing {os.path.basename(output)}")
+        else:
+            run()
+            status = "ran"
+            manifest[name] = {"inputs": fingerprint, "completed_at": time.time()}
+            save_manifest(data_dir, manifest)
+
+        elapsed = round(time.perf_counter() - started, 3)
+        timings.append({"stage": name, "status": status, "seconds": elapsed})
+
+    print("\nStage timings:")
+    for timing in timings:
+        print(f"   {timing['stage']:<10} {timing['status']:<8} {timing['seconds']:.3f}s")
+    return timings
@@ -0,0 +1,388 @@
+import os
+import re
+import json
+from operator import itemgetter
+import numpy as np
+from src.billing_columns import to_inr
+from src import metrics
+
+# Versioned per-provider price list shipped with the repo
+PRICE_CATALOG_PATH = os.getenv(
+    "PRICE_CATALOG_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "price_catalog.json")
+)
+
+# Provider the billing records come from
+BASELINE_PROVIDER = "AWS"
+
+# Cheapest scenarios listed in the report's what_if section
+WHAT_IF_REPORTED = 10
+
+# Scenario x pricing-key cells evaluated per NumPy block, bounding memory
+MAX_BLOCK_CELLS = 4_000_000
+
+_record_fields = itemgetter("service", "region", "unit", "usage_type", "cost_inr")
+
+
+def _mentions(text: str, phrase: str) -> bool:
+    """
+    True if phrase appears in free text as whole words, so "spot" is not
+    found in "hotspot" nor "reserved" in "preserved". usage_type codes
+    such as SpotUsage run words together and are matched as substrings.
+    """
+    return re.search(rf"(?<!\w){re.escape(phrase)}(?!\w)", text) is not None
+
+
+class PriceCatalog:
+    """
+    A price catalog held as one dense NumPy array.
+
+    prices[provider, service, region, unit, tier] is the INR price of a
+    catalog unit, NaN where the provider has no such offering. Regions are
+    indexed by their baseline (AWS) code and mapped to each provider's own
+    region through the catalog's providers section.
+    """
+
+    def __init__(self, catalog: dict):
+        self.version = catalog.get("version")
+        self.providers = list(catalog["providers"])
+        self.services = catalog["services"]
+        self.service_names = list(self.services)
+        self.regions = list(catalog["providers"][BASELINE_PROVIDER]["regions"])
+        self.tiers = []
+        for info in self.services.values():
+            for tier in [info["default_tier"], *info.get("tiers", {})]:
+                if tier not in self.tiers:
+                    self.tiers.append(tier)
+
+        columns = catalog["columns"]
+        rows = [dict(zip(columns, row)) for row in catalog["prices"]]
+        self.units = list(dict.fromkeys(row["unit"] for row in rows))
+        self._unit_lookup = {unit.lower(): unit for unit in self.units}
+        self._unit_lookup.update((alias.lower(), unit) for alias, unit in catalog.get("unit_aliases", {}).items())
+
+        native_regions = {
+            provider: {native: self.regions.index(region) for region, native in info["regions"].items()}
+            for provider, info in catalog["providers"].items()
+        }
+        self.prices = np.full((len(self.providers), len(self.service_names), len(self.regions),
+                               len(self.units), len(self.tiers)), np.nan)
+        for row in rows:
+            region = native_regions[row["provider"]].get(row["region"])
+            if region is None or row["service"] not in self.services:
+                continue
+            self.prices[self.providers.index(row["provider"]), self.service_names.index(row["service"]),
+                        region, self.units.index(row["unit"]), self.tiers.index(row["tier"])] = row["price_inr"]
+
+        self.provider_aliases = {
+            provider: [provider.lower(), *info.get("aliases", [])] for provider, info in catalog["providers"].items()
+        }
+        # Baseline region code -> its code and every provider's own name for it
+        self.region_aliases = {
+            region: list(dict.fromkeys(info["regions"][region].lower()
+                                       for info in catalog["providers"].values() if region in info["regions"]))
+            for region in self.regions
+        }
+
+    def unit(self, service: str, unit: str):
+        """
+        Catalog spelling of a billing unit, or None if the catalog does not
+        price it. Service aliases come first (e.g. S3 "GB" means GB-month).
+        """
+        unit = str(unit or "").strip().lower()
+        return self.services[service].get("unit_aliases", {}).get(unit) or self._unit_lookup.get(unit)
+
+    def record_tier(self, service: str, usage_type: str) -> str:
+        """Pricing tier a billing line is on, inferred from its usage_type."""
+        info = self.services[service]
+        text = str(usage_type or "").lower()
+        for tier, keywords in info.get("tiers", {}).items():
+            if any(keyword in text for keyword in keywords):
+                return tier
+        return info["default_tier"]
+
+    def text_tiers(self, service: str, text: str) -> list:
+        """Tiers of a service whose keywords appear in free text (e.g. a recommendation)."""
+        info = self.services.get(service, {})
+        return [tier for tier, keywords in info.get("tiers", {}).items()
+                if any(_mentions(text, keyword) for keyword in keywords)]
+
+
+def load_catalog(path: str = PRICE_CATALOG_PATH) -> PriceCatalog:
+    """Load and index a price catalog file."""
+    with open(path, "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+    metrics.add_file_read(path)
+    try:
+        return PriceCatalog(catalog)
+    except (KeyError, ValueError, TypeError) as e:
+        raise Exception(f"Invalid price catalog {path}: {e}")
+
+
+def default_scenarios(catalog: PriceCatalog) -> list:
+    """
+    Every provider x region x tier combination in the catalog.
+
+    region None keeps each billing line in its own region (mapped to the
+    provider's equivalent) and tier None keeps its current pricing tier.
+    """
+    return [
+        {"provider": provider, "region": region, "tier": tier}
+        for provider in catalog.providers
+        for region in [None, *catalog.regions]
+        for tier in [None, *catalog.tiers]
+    ]
+
+
+def scenario_name(scenario: dict) -> str:
+    if scenario.get("name"):
+        return scenario["name"]
+    parts = [scenario.get("provider") or BASELINE_PROVIDER,
+             scenario.get("region") or "same regions",
+             scenario.get("tier") or "current tiers"]
+    if scenario.get("services"):
+        parts.append("+".join(scenario["services"]))
+    return " / ".join(parts)
+
+
+class ScenarioSimulator:
+    """
+    What-if repricing of billing records under alternative scenarios.
+
+    add_records folds line items into cost per (service, region, unit,
+    usage_type), riding along the streaming aggregation pass. Repricing is
+    linear in cost, so simulate() first reduces those to cost per pricing
+    key (service, region, unit, tier) and then reprices every key under
+    every scenario at once: each line's cost is scaled by the ratio of the
+    scenario's catalog price to its current one, so instance sizes and
+    discounts already in the bill carry over. Lines the catalog cannot
+    price, on either side, keep their billed cost.
+    """
+
+    def __init__(self):
+        # (service, region, unit, usage_type) -> cost in paise
+        self.groups = {}
+        self.total_paise = 0
+
+    def add_records(self, records) -> None:
+        groups = self.groups
+        for record in records:
+            service, region, unit, usage_type, cost = _record_fields(record)
+            key = (service, region, unit, usage_type)
+            paise = round(cost * 100)
+            groups[key] = groups.get(key, 0) + paise
+            self.total_paise += paise
+
+    def merge(self, other: "ScenarioSimulator") -> None:
+        """Add another simulator's cost groups (e.g. from another billing file)."""
+        groups = self.groups
+        for key, paise in other.groups.items():
+            groups[key] = groups.get(key, 0) + paise
+        self.total_paise += other.total_paise
+
+    def _pricing_keys(self, catalog: PriceCatalog):
+        """
+        Cost per pricing key as parallel index arrays; index -1 marks a
+        service, region, unit or tier the catalog does not know.
+        """
+        keys = {}
+        for (service, region, unit, usage_type), paise in self.groups.items():
+            if service in catalog.services:
+                unit = catalog.unit(service, unit)
+                key = (catalog.service_names.index(service),
+                       catalog.regions.index(region) if region in catalog.regions else -1,
+                       catalog.units.index(unit) if unit in catalog.units else -1,
+                       catalog.tiers.index(catalog.record_tier(service, usage_type)))
+            else:
+                key = (-1, -1, -1, -1)
+            keys[(service, key)] = keys.get((service, key), 0) + paise
+
+        services = [service for service, _ in keys]
+        index = np.array([key for _, key in keys], dtype=np.int64).reshape(-1, 4)
+        cost = np.array(list(keys.values()), dtype=np.float64)
+        return services, index, cost
+
+    def simulate(self, catalog: PriceCatalog, scenarios=None) -> list:
+        """
+        Reprice the billing records under each scenario.
+
+        A scenario is a dict with optional provider, region (baseline code,
+        e.g. ap-south-1), tier and services (only these services move).
+
+        Returns:
+            list: One dict per scenario, in input order, with name, the
+                scenario fields, total_cost, savings and service_impact
+                ({service: {repriced_cost, savings}} over the lines whose
+                price changes)
+        """
+        scenarios = default_scenarios(catalog) if scenarios is None else list(scenarios)
+        for scenario in scenarios:
+            for field, known in (("provider", catalog.providers), ("region", catalog.regions),
+                                 ("tier", catalog.tiers)):
+                if scenario.get(field) and scenario[field] not in known:
+                    raise ValueError(f"unknown {field} {scenario[field]!r} in {scenario_name(scenario)!r} "
+                                     f"(catalog has {', '.join(known)})")
+        services, index, cost = self._pricing_keys(catalog)
+        service_names = list(dict.fromkeys(services))
+        service_of_key = np.array([service_names.index(s) for s in services], dtype=np.int64)
+
+        svc, reg, unit, tier, base, known = _baseline_prices(catalog, index)
+
+        # Scenario parameters as arrays; -1 keeps the billing line's own value
+        providers = np.array([catalog.providers.index(s.get("provider") or BASELINE_PROVIDER) for s in scenarios],
+                             dtype=np.int64)
+        regions = np.array([catalog.regions.index(s["region"]) if s.get("region") else -1 for s in scenarios],
+                           dtype=np.int64)
+        tiers = np.array([catalog.tiers.index(s["tier"]) if s.get("tier") else -1 for s in scenarios],
+                         dtype=np.int64)
+        applies = np.array([[not s.get("services") or name in s["services"] for name in services]
+                            for s in scenarios], dtype=bool).reshape(len(scenarios), len(services))
+
+        new_cost = np.empty((len(scenarios), len(services)))
+        block = max(1, MAX_BLOCK_CELLS // max(1, len(services)))
+        for start in range(0, len(scenarios), block):
+            rows = slice(start, start + block)
+            p = providers[rows, None]
+            r = np.where(regions[rows, None] < 0, reg, regions[rows, None])
+            t = np.where(tiers[rows, None] < 0, tier, tiers[rows, None])
+            target = catalog.prices[p, svc, r, unit, t]
+            # A tier the provider does not offer for this unit keeps the current tier
+            target = np.where(np.isfinite(target), target, catalog.prices[p, svc, r, unit, tier])
+            ratio = np.where(known & applies[rows] & np.isfinite(target), target / np.where(known, base, 1.0), 1.0)
+            new_cost[rows] = ratio * cost
+
+        savings = cost - new_cost
+        repriced = np.where(np.abs(savings) > 1e-9, cost, 0.0)
+        service_savings = np.zeros((len(scenarios), len(service_names)))
+        service_repriced = np.zeros((len(scenarios), len(service_names)))
+        np.add.at(service_savings.T, service_of_key, savings.T)
+        np.add.at(service_repriced.T, service_of_key, repriced.T)
+
+        totals = np.rint(new_cost.sum(axis=1)).astype(np.int64)
+        results = []
+        for i, scenario in enumerate(scenarios):
+            results.append({
+                "name": scenario_name(scenario),
+                "provider": scenario.get("provider") or BASELINE_PROVIDER,
+                "region": scenario.get("region"),
+                "tier": scenario.get("tier"),
+                "services": scenario.get("services"),
+                "total_cost": to_inr(totals[i]),
+                "savings": to_inr(self.total_paise - int(totals[i])),
+                "service_impact": {
+                    name: {"repriced_cost": to_inr(round(service_repriced[i, j])),
+                           "savings": to_inr(round(service_savings[i, j]))}
+                    for j, name in enumerate(service_names) if service_repriced[i, j] > 0
+                },
+            })
+        return results
+
+    def priced_share(self, catalog: PriceCatalog) -> float:
+        """Percentage of billed cost the catalog can price."""
+        _, index, cost = self._pricing_keys(catalog)
+        known = _baseline_prices(catalog, index)[-1]
+        return round(cost[known].sum() / cost.sum() * 100, 2) if cost.sum() > 0 else 0.0
+
+
+def _baseline_prices(catalog: PriceCatalog, index):
+    """
+    Catalog indices and baseline-provider price of each pricing key, plus a
+    mask of the keys that can be repriced (unknown indices read slot 0).
+    """
+    known = (index >= 0).all(axis=1)
+    svc, reg, unit, tier = (np.where(known, index[:, i], 0) for i in range(4))
+    base = catalog.prices[catalog.providers.index(BASELINE_PROVIDER), svc, reg, unit, tier]
+    return svc, reg, unit, tier, base, known & np.isfinite(base) & (base > 0)
+
+
+def what_if_summary(results: list, total_paise: int, catalog: PriceCatalog, priced_share: float,
+                    limit: int = WHAT_IF_REPORTED) -> dict:
+    """The report's what_if section: the cheapest scenarios next to the billed total."""
+    ranked = sorted(results, key=lambda r: r["total_cost"])
+    return {
+        "catalog_version": catalog.version,
+        "baseline_provider": BASELINE_PROVIDER,
+        "baseline_cost": to_inr(total_paise),
+        "priced_cost_share": priced_share,
+        "scenarios_evaluated": len(results),
+        "scenarios": [
+            {
+                "name": r["name"],
+                "total_cost": r["total_cost"],
+                "savings": r["savings"],
+                "savings_percentage": round(r["savings"] / to_inr(total_paise) * 100, 2) if total_paise > 0 else 0,
+            }
+            for r in ranked[:limit]
+        ],
+    }
+
+
+def named_scenario(rec: dict, results: list, catalog: PriceCatalog):
+    """
+    The whole-bill scenario a recommendation explicitly names, or None.
+
+    Either a scenario's full name appears in its title or description, or
+    the text pins the scenario down: at most one other provider (else the
+    baseline), at most one region and the pricing tier (the first match,
+    as for billing lines), with at least one of the three mentioned. Names
+    and aliases only match as whole words.
+    """
+    text = f"{rec.get('title', '')} {rec.get('description', '')}".lower()
+    whole_bill = [result for result in results if not result["services"]]
+    named = [result for result in whole_bill if _mentions(text, result["name"].lower())]
+    if named:
+        return named[0] if len(named) == 1 else None
+
+    providers = [p for p, aliases in catalog.provider_aliases.items()
+                 if p != BASELINE_PROVIDER and any(_mentions(text, alias) for alias in aliases)]
+    regions = [r for r, aliases in catalog.region_aliases.items()
+               if any(_mentions(text, alias) for alias in aliases)]
+    tiers = catalog.text_tiers(rec.get("service"), text)
+    if len(providers) > 1 or len(regions) > 1 or not (providers or regions or tiers):
+        return None
+
+    wanted = (providers[0] if providers else BASELINE_PROVIDER,
+              regions[0] if regions else None,
+              tiers[0] if tiers else None)
+    for result in whole_bill:
+        if (result["provider"], result["region"], result["tier"]) == wanted:
+            return result
+    return None
+
+
+def ground_recommendations(recommendations: list, results: list, catalog: PriceCatalog) -> int:
+    """
+    Replace guessed LLM potential_savings with catalog-priced figures.
+
+    Rule-based recommendations already compute their savings and are left
+    alone. An LLM recommendation is priced only against the scenario it
+    explicitly names (see named_scenario): that scenario's savings rate on
+    the repriced part of the service is applied to the recommendation's
+    current_cost (capped at that part). The original figure is kept as
+    estimated_savings. A recommendation naming no scenario, or one that
+    does not reprice its service, keeps its value unchanged.
+
+    Returns:
+        int: Number of recommendations grounded
+    """
+    grounded = 0
+    for rec in recommendations:
+        # A rule's savings come from the billed lines it flagged (e.g. only the
+        # always-on, on-demand hours). A scenario's rate averages the whole
+        # service, lines already reserved or on Spot included, so it would
+        # replace a per-resource figure with a blunter one.
+        if rec.get("source") == "rules":
+            continue
+        service = rec.get("service")
+        result = named_scenario(rec, results, catalog)
+        if result is None or service not in result["service_impact"]:
+            continue
+        impact = result["service_impact"][service]
+        if impact["repriced_cost"] <= 0:
+            continue
+        current = min(float(rec.get("current_cost") or 0) or impact["repriced_cost"], impact["repriced_cost"])
+        rec["estimated_savings"] = rec.get("potential_savings", 0)
+        rec["potential_savings"] = round(max(0.0, current * impact["savings"] / impact["repriced_cost"]), 2)
+        rec["pricing_scenario"] = result["name"]
+        grounded += 1
+    return grounded
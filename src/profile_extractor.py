@@ -1,15 +1,24 @@
+import os
 import json
 from src.llm_client import call_llm
+from src.schemas import validate_profile
+from src import metrics
 
-def extract_project_profile():
+# Bump when the prompt changes so the pipeline reruns this stage
+PROMPT_VERSION = 1
+
+@metrics.timed_stage("profile")
+def extract_project_profile(data_dir: str = "data"):
     """
     Extract structured project profile from project description using LLM.
+    Input: <data_dir>/project_description.txt
     Output: project_profile.json with name, budget_inr_per_month, description, 
     tech_stack, and non_functional_requirements.
     """
     try:
-        with open("data/project_description.txt", "r") as f:
+        with open(os.path.join(data_dir, "project_description.txt"), "r") as f:
             description = f.read().strip()
+        metrics.add_file_read(os.path.join(data_dir, "project_description.txt"))
         
         if not description:
             raise ValueError("Project description is empty. Please enter a project description first.")
@@ -44,29 +53,15 @@ Return ONLY the JSON object, nothing else."""
     try:
         profile = call_llm(prompt, max_tokens=1500)
         
-        # Validate required fields
-        required_fields = ["name", "budget_inr_per_month", "description", "tech_stack", "non_functional_requirements"]
-        for field in required_fields:
-            if field not in profile:
-                raise ValueError(f"Missing required field: {field}")
-        
-        # Ensure budget is a number
-        if not isinstance(profile["budget_inr_per_month"], (int, float)):
-            raise ValueError("budget_inr_per_month must be a number")
-        
-        # Ensure tech_stack is an object
-        if not isinstance(profile["tech_stack"], dict):
-            raise ValueError("tech_stack must be an object")
-        
-        # Ensure non_functional_requirements is an array
-        if not isinstance(profile["non_functional_requirements"], list):
-            raise ValueError("non_functional_requirements must be an array")
+        # Validate against the profile schema (budget may arrive as a string)
+        validate_profile(profile)
         
     except Exception as e:
         raise Exception(f"Failed to extract project profile: {e}")
 
-    with open("data/project_profile.json", "w", encoding="utf-8") as f:
+    with open(os.path.join(data_dir, "project_profile.json"), "w", encoding="utf-8") as f:
         json.dump(profile, f, indent=2, ensure_ascii=False)
+    metrics.add_file_written(os.path.join(data_dir, "project_profile.json"))
 
     print("✅ project_profile.json generated")
     return profile
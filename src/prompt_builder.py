@@ -0,0 +1,97 @@
+import os
+import json
+from src.billing_columns import to_inr
+
+# Target size of the recommendation prompt, in estimated tokens
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+
+# Billing rows tried, most first, while fitting the budget
+ROW_LIMITS = (20, 10, 5, 3, 1, 0)
+
+# Rough characters per token for English text and compact JSON
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokenizer-free token estimate (about four characters per token)."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def compact_json(value) -> str:
+    """Serialize without indentation or spaces after separators."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def select_billing_rows(top_rows: list, limit: int, total_rows: int, total_cost_paise: int) -> list:
+    """
+    The `limit` most expensive rows plus one aggregated remainder row
+    covering every other record, so the model still sees their total.
+    """
+    rows = top_rows[:limit]
+    shown_paise = sum(round((row.get("cost_inr") or 0) * 100) for row in rows)
+    remaining = total_rows - len(rows)
+    if remaining > 0:
+        rows = rows + [{
+            "resource_id": f"(remaining {remaining} records)",
+            "cost_inr": to_inr(total_cost_paise - shown_paise),
+        }]
+    return rows
+
+
+def compact_analysis(analysis: dict, level: int) -> dict:
+    """
+    Drop progressively less important analysis detail.
+
+    level 0: everything
+    level 1: no per-service monthly series or usage_type breakdown, top 3 what-if scenarios
+    level 2: core totals, service costs and the forecast only
+    """
+    if level == 0:
+        return analysis
+
+    compact = dict(analysis)
+    compact.pop("usage_type_costs", None)
+    what_if = analysis.get("what_if")
+    if what_if:
+        compact["what_if"] = dict(what_if, scenarios=what_if["scenarios"][:3])
+    trends = analysis.get("trends")
+    if trends:
+        compact["trends"] = {k: v for k, v in trends.items() if k != "service_monthly_costs"}
+
+    if level >= 2:
+        keep = ("total_monthly_cost", "budget", "budget_variance", "service_costs",
+                "high_cost_services", "is_over_budget")
+        compact = {k: analysis[k] for k in keep if k in analysis}
+        if trends and trends.get("forecast"):
+            compact["forecast"] = trends["forecast"]
+    return compact
+
+
+def fit_prompt(render, analysis: dict, top_rows: list, total_rows: int, total_cost_paise: int,
+               token_budget: int = PROMPT_TOKEN_BUDGET):
+    """
+    Find the richest prompt that fits token_budget.
+
+    render(analysis, billing_rows) must return the prompt text. For each
+    billing row count (most first), analysis detail is trimmed before fewer
+    rows are tried. If nothing fits, the smallest variant is returned.
+
+    Returns:
+        tuple: (prompt, stats dict with chars, estimated_tokens, billing_rows, analysis_level)
+    """
+    prompt = stats = None
+    for limit in ROW_LIMITS:
+        for level in (0, 1, 2):
+            rows = select_billing_rows(top_rows, limit, total_rows, total_cost_paise)
+            prompt = render(compact_analysis(analysis, level), rows)
+            tokens = estimate_tokens(prompt)
+            stats = {
+                "chars": len(prompt),
+                "estimated_tokens": tokens,
+                "token_budget": token_budget,
+                "billing_rows": min(limit, len(top_rows)),
+                "analysis_level": level,
+            }
+            if tokens <= token_budget:
+                return prompt, stats
+    return prompt, stats
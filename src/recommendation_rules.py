@@ -0,0 +1,234 @@
+from src.billing_columns import to_inr, USAGE_SCALE
+
+# Billable hours in an average month
+HOURS_PER_MONTH = 730
+
+# Services billed per instance-hour that reserved capacity / right-sizing apply to
+COMPUTE_SERVICES = {"EC2", "RDS", "ElastiCache"}
+
+# Reserved-capacity discount versus on-demand (1-year, no upfront)
+RESERVED_DISCOUNT = {"EC2": 0.30, "RDS": 0.35, "ElastiCache": 0.30}
+
+STEADY_UTILIZATION = 0.90      # >= this share of the month counts as always-on
+INTERMITTENT_UTILIZATION = 0.50
+IDLE_UTILIZATION = 0.03        # < ~22 hours a month
+SPOT_DISCOUNT = 0.60
+RIGHT_SIZE_RATE_RATIO = 2.0    # hourly rate vs. the service median
+STORAGE_CLASS_MIN_GB = 500
+STORAGE_CLASS_DISCOUNT = 0.40
+
+
+def _is_hours(unit: str) -> bool:
+    return unit.strip().lower() in ("hours", "hour", "hrs", "hr", "h")
+
+
+def _is_storage(service: str, usage_type: str, unit: str) -> bool:
+    text = f"{usage_type} {unit}".lower()
+    return service == "S3" and ("storage" in text or "gb-month" in text or "gb-mo" in text)
+
+
+class RuleEngine:
+    """
+    Deterministic recommendation rules evaluated over billing records.
+
+    Records are folded into compact per-resource totals chunk by chunk (so
+    the engine can ride along the streaming aggregation pass), then
+    recommendations() applies the rules and emits entries in the report's
+    recommendation schema with computed potential_savings.
+    """
+
+    def __init__(self):
+        # (resource_id, usage_type) -> [service, usage_type, unit, usage in USAGE_SCALE units, cost_paise, months]
+        self.resources = {}
+
+    def add_records(self, records) -> None:
+        for record in records:
+            key = (record.get("resource_id") or "", record.get("usage_type") or "")
+            entry = self.resources.get(key)
+            if entry is None:
+                entry = self.resources[key] = [
+                    record.get("service") or "", record.get("usage_type") or "",
+                    record.get("unit") or "", 0, 0, set()
+                ]
+            entry[3] += round(float(record.get("usage_quantity") or 0) * USAGE_SCALE)
+            entry[4] += round(float(record.get("cost_inr") or 0) * 100)
+            entry[5].add(record.get("month"))
+
+    def merge(self, other: "RuleEngine") -> None:
+        """Add another engine's per-resource totals (e.g. from another billing file)."""
+        for key, (service, usage_type, unit, usage, paise, months) in other.resources.items():
+            entry = self.resources.get(key)
+            if entry is None:
+                self.resources[key] = [service, usage_type, unit, usage, paise, set(months)]
+            else:
+                entry[3] += usage
+                entry[4] += paise
+                entry[5].update(months)
+
+    def _findings(self):
+        """Yield (rule, service, resource_id, cost_paise, savings_paise) per matching resource."""
+        hourly_rates = {}
+        compute = []
+        for (resource_id, _), (service, usage_type, unit, usage, paise, months) in self.resources.items():
+            if paise <= 0:
+                continue
+            qty = usage / USAGE_SCALE
+            month_count = max(1, len(months))
+            if service in COMPUTE_SERVICES and _is_hours(unit):
+                hours = qty / month_count
+                compute.append((resource_id, service, usage_type, hours, paise, qty))
+                if qty > 0:
+                    hourly_rates.setdefault(service, []).append(paise / qty)
+            elif _is_storage(service, usage_type, unit) and qty / month_count >= STORAGE_CLASS_MIN_GB:
+                yield "storage_class", service, resource_id, paise, round(paise * STORAGE_CLASS_DISCOUNT)
+            elif qty <= 0:
+                yield "idle", service, resource_id, paise, paise
+
+        medians = {s: sorted(r)[len(r) // 2] for s, r in hourly_rates.items()}
+        for resource_id, service, usage_type, hours, paise, qty in compute:
+            utilization = hours / HOURS_PER_MONTH
+            if utilization < IDLE_UTILIZATION:
+                yield "idle", service, resource_id, paise, paise
+                continue
+            rate = paise / qty
+            if len(hourly_rates[service]) > 1 and rate >= RIGHT_SIZE_RATE_RATIO * medians[service]:
+                # Downsize towards the fleet's median instance price
+                yield "right_size", service, resource_id, paise, round(paise - qty * medians[service])
+            elif utilization >= STEADY_UTILIZATION and "reserved" not in usage_type.lower():
+                yield "reserved", service, resource_id, paise, round(paise * RESERVED_DISCOUNT[service])
+            elif utilization < INTERMITTENT_UTILIZATION and service == "EC2":
+                yield "spot", service, resource_id, paise, round(paise * SPOT_DISCOUNT)
+
+    def recommendations(self) -> list:
+        """
+        Apply the rules and return one recommendation per (rule, service),
+        largest potential_savings first.
+        """
+        grouped = {}
+        for rule, service, resource_id, paise, savings in self._findings():
+            group = grouped.setdefault((rule, service), [0, 0, []])
+            group[0] += paise
+            group[1] += savings
+            group[2].append(resource_id)
+
+        recommendations = [
+            _build(rule, service, cost, savings, resource_ids)
+            for (rule, service), (cost, savings, resource_ids) in grouped.items()
+            if savings > 0
+        ]
+        recommendations.sort(key=lambda rec: rec["potential_savings"], reverse=True)
+        return recommendations
+
+
+def _resource_list(resource_ids, limit: int = 5) -> str:
+    shown = ", ".join(resource_ids[:limit])
+    extra = len(resource_ids) - limit
+    return f"{shown} and {extra} more" if extra > 0 else shown
+
+
+def _build(rule: str, service: str, cost_paise: int, savings_paise: int, resource_ids) -> dict:
+    count = len(resource_ids)
+    resources = _resource_list(resource_ids)
+    plural = "s" if count != 1 else ""
+
+    if rule == "reserved":
+        rec = {
+            "title": f"Buy reserved capacity for always-on {service}",
+            "recommendation_type": "optimization",
+            "description": (f"{count} {service} resource{plural} ({resources}) run more than "
+                            f"{int(STEADY_UTILIZATION * 100)}% of the month on on-demand pricing. "
+                            f"A 1-year reservation or Savings Plan cuts the rate by about "
+                            f"{int(RESERVED_DISCOUNT[service] * 100)}%."),
+            "implementation_effort": "low",
+            "risk_level": "low",
+            "steps": [
+                f"Confirm the {service} workload is expected to run for at least 12 months",
+                "Compare 1-year no-upfront reservations with Compute Savings Plans",
+                "Purchase the commitment matching the current instance family and region",
+                "Track utilization of the commitment monthly",
+            ],
+            "cloud_providers": ["AWS", "Azure", "GCP"],
+        }
+    elif rule == "right_size":
+        rec = {
+            "title": f"Right-size oversized {service} instances",
+            "recommendation_type": "right_sizing",
+            "description": (f"{count} {service} resource{plural} ({resources}) cost at least "
+                            f"{RIGHT_SIZE_RATE_RATIO:g}x the median hourly rate of the fleet. "
+                            f"Moving them to the fleet's typical size saves the difference."),
+            "implementation_effort": "medium",
+            "risk_level": "medium",
+            "steps": [
+                "Review CPU, memory and network utilization for the listed instances",
+                "Pick a smaller instance size or a newer, cheaper family",
+                "Resize during a maintenance window and load test",
+                "Monitor performance for a week before resizing the rest",
+            ],
+            "cloud_providers": ["AWS", "Azure", "GCP"],
+        }
+    elif rule == "spot":
+        rec = {
+            "title": f"Move intermittent {service} workloads to Spot instances",
+            "recommendation_type": "optimization",
+            "description": (f"{count} {service} resource{plural} ({resources}) run less than "
+                            f"{int(INTERMITTENT_UTILIZATION * 100)}% of the month, which suggests "
+                            f"batch or interruptible work. Spot capacity is typically "
+                            f"{int(SPOT_DISCOUNT * 100)}% cheaper than on-demand."),
+            "implementation_effort": "medium",
+            "risk_level": "medium",
+            "steps": [
+                "Confirm the workloads tolerate interruption or can checkpoint",
+                "Create a Spot-backed Auto Scaling group or fleet with several instance types",
+                "Add on-demand fallback capacity for critical jobs",
+                "Compare cost and completion times after one billing cycle",
+            ],
+            "cloud_providers": ["AWS", "Azure", "GCP"],
+        }
+    elif rule == "storage_class":
+        rec = {
+            "title": f"Move infrequently accessed {service} data to a cheaper storage class",
+            "recommendation_type": "cost-effective_storage",
+            "description": (f"{count} {service} bucket{plural} ({resources}) store at least "
+                            f"{STORAGE_CLASS_MIN_GB} GB in the standard class. Intelligent-Tiering "
+                            f"or Infrequent Access plus lifecycle rules cut storage cost by about "
+                            f"{int(STORAGE_CLASS_DISCOUNT * 100)}%."),
+            "implementation_effort": "low",
+            "risk_level": "low",
+            "steps": [
+                "Enable storage class analysis on the listed buckets",
+                "Add lifecycle rules moving objects older than 30 days to Infrequent Access",
+                "Archive objects older than 90 days to Glacier where retrieval latency allows",
+                "Enable Intelligent-Tiering for buckets with unpredictable access",
+            ],
+            "cloud_providers": ["AWS", "Azure", "GCP"],
+        }
+    else:
+        rec = {
+            "title": f"Clean up idle {service} resources",
+            "recommendation_type": "optimization",
+            "description": (f"{count} {service} resource{plural} ({resources}) are billed but "
+                            f"show little or no usage. Deleting or stopping them removes the cost."),
+            "implementation_effort": "low",
+            "risk_level": "low",
+            "steps": [
+                "Confirm with the owners that the listed resources are unused",
+                "Snapshot or back up anything that must be retained",
+                "Delete or stop the resources",
+                "Add tagging and a periodic idle-resource report to prevent recurrence",
+            ],
+            "cloud_providers": ["AWS"],
+        }
+
+    return {
+        "title": rec["title"],
+        "service": service,
+        "current_cost": to_inr(cost_paise),
+        "potential_savings": to_inr(savings_paise),
+        "recommendation_type": rec["recommendation_type"],
+        "description": rec["description"],
+        "implementation_effort": rec["implementation_effort"],
+        "risk_level": rec["risk_level"],
+        "steps": rec["steps"],
+        "cloud_providers": rec["cloud_providers"],
+        "source": "rules",
+    }
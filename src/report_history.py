@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+
+# Append-only store of every generated report, one row per analysis run
+HISTORY_DB_FILENAME = "report_history.db"
+HISTORY_DB_VERSION = 1
+
+# Each run keeps its headline figures in columns, so listing runs never
+# decompresses a report; the report itself is zlib-compressed compact JSON
+# fetched by primary key.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    total_cost REAL NOT NULL,
+    budget_variance REAL NOT NULL,
+    recommendations INTEGER NOT NULL,
+    potential_savings REAL NOT NULL,
+    report BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_project ON runs (project, run_id);
+"""
+
+_SUMMARY_COLUMNS = ("run_id", "project", "created_at", "total_cost", "budget_variance",
+                    "recommendations", "potential_savings")
+
+# Relative run references; "-N" also means the Nth newest run
+RUN_ALIASES = {"latest": 1, "previous": 2}
+
+
+def connect(history_path: str) -> sqlite3.Connection:
+    """Open (creating if needed) the report history at history_path."""
+    os.makedirs(os.path.dirname(history_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(history_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version not in (0, HISTORY_DB_VERSION):
+        # Unlike the cost index, history cannot be rebuilt, so never drop it
+        conn.close()
+        raise Exception(f"{history_path} has history version {version}, expected {HISTORY_DB_VERSION}")
+    conn.executescript(_SCHEMA)
+    conn.execute(f"PRAGMA user_version={HISTORY_DB_VERSION}")
+    return conn
+
+
+def recommendation_key(rec: dict):
+    """Identity of a recommendation across runs: (service, normalized title)."""
+    title = "".join(ch for ch in str(rec.get("title", "")).lower() if ch.isalnum())
+    return str(rec.get("service", "")).lower(), title
+
+
+def record_run(history_path: str, report: dict, created_at: str = None) -> int:
+    """
+    Append a report to the history.
+
+    Args:
+        history_path (str): History database path
+        report (dict): Report as written to cost_optimization_report.json
+        created_at (str): UTC timestamp (default: now)
+
+    Returns:
+        int: The new run_id
+    """
+    analysis = report.get("analysis", {})
+    summary = report.get("summary", {})
+    blob = zlib.compress(json.dumps(report, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    conn = connect(history_path)
+    try:
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (project, created_at, total_cost, budget_variance, recommendations, "
+                "potential_savings, report) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (report.get("project_name", "N/A"),
+                 created_at or time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                 analysis.get("total_monthly_cost", 0), analysis.get("budget_variance", 0),
+                 len(report.get("recommendations", [])), summary.get("total_potential_savings", 0),
+                 sqlite3.Binary(blob)),
+            )
+            return cursor.lastrowid
+    finally:
+        conn.close()
+
+
+def list_runs(conn: sqlite3.Connection, project: str = None, limit: int = 0) -> list:
+    """Run summaries (no report bodies), newest first; limit 0 lists every run."""
+    where, params = ("WHERE project = ?", [project]) if project else ("", [])
+    sql = f"SELECT {', '.join(_SUMMARY_COLUMNS)} FROM runs {where} ORDER BY run_id DESC"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return [dict(zip(_SUMMARY_COLUMNS, row)) for row in conn.execute(sql, params)]
+
+
+def resolve_run(conn: sqlite3.Connection, ref, project: str = None) -> int:
+    """
+    Turn a run reference into a run_id.
+
+    ref is a run_id, "latest", "previous" or "-N" (the Nth newest run, in
+    project if given). Ids are a primary-key lookup; relative references
+    walk N entries of the run index.
+    """
+    ref = str(ref).strip().lower()
+    if ref in RUN_ALIASES or (ref.startswith("-") and ref[1:].isdigit()):
+        back = RUN_ALIASES.get(ref) or int(ref[1:])
+        where, params = ("WHERE project = ?", [project]) if project else ("", [])
+        row = conn.execute(f"SELECT run_id FROM runs {where} ORDER BY run_id DESC LIMIT 1 OFFSET ?",
+                           params + [max(back, 1) - 1]).fetchone()
+        if row is None:
+            raise LookupError(f"No run '{ref}' in the report history"
+                              + (f" for project {project}" if project else ""))
+        return row[0]
+    if not ref.isdigit():
+        raise ValueError(f"Invalid run reference '{ref}': use a run id, latest, previous or -N")
+    if conn.execute("SELECT 1 FROM runs WHERE run_id = ?", (int(ref),)).fetchone() is None:
+        raise LookupError(f"Run {ref} not found in the report history")
+    return int(ref)
+
+
+def get_run(conn: sqlite3.Connection, run_id: int) -> dict:
+    """A run's summary plus its full report, fetched by primary key."""
+    row = conn.execute(f"SELECT {', '.join(_SUMMARY_COLUMNS)}, report FROM runs WHERE run_id = ?",
+                       (run_id,)).fetchone()
+    if row is None:
+        raise LookupError(f"Run {run_id} not found in the report history")
+    run = dict(zip(_SUMMARY_COLUMNS, row))
+    run["report"] = json.loads(zlib.decompress(row[-1]).decode("utf-8"))
+    return run
+
+
+def previous_run(conn: sqlite3.Connection, run_id: int) -> int:
+    """The run before run_id of the same project, or None."""
+    row = conn.execute(
+        "SELECT run_id FROM runs WHERE project = (SELECT project FROM runs WHERE run_id = ?) "
+        "AND run_id < ? ORDER BY run_id DESC LIMIT 1", (run_id, run_id)).fetchone()
+    return row[0] if row else None
+
+
+def _change(old, new) -> dict:
+    old, new = old or 0, new or 0
+    return {"old": old, "new": new, "delta": round(new - old, 2)}
+
+
+def diff_reports(old: dict, new: dict) -> dict:
+    """
+    What changed between two reports: total cost, budget variance, cost per
+    service and the recommendation set (matched by recommendation_key).
+
+    Returns:
+        dict: Changes; unchanged services and recommendations are only counted
+    """
+    old_analysis, new_analysis = old.get("analysis", {}), new.get("analysis", {})
+
+    old_costs, new_costs = old_analysis.get("service_costs", {}), new_analysis.get("service_costs", {})
+    changed_costs = {}
+    for service in old_costs.keys() & new_costs.keys():
+        if old_costs[service] != new_costs[service]:
+            changed_costs[service] = _change(old_costs[service], new_costs[service])
+    service_costs = {
+        "added": {s: new_costs[s] for s in new_costs if s not in old_costs},
+        "removed": {s: old_costs[s] for s in old_costs if s not in new_costs},
+        "changed": dict(sorted(changed_costs.items(), key=lambda x: abs(x[1]["delta"]), reverse=True)),
+        "unchanged": len(old_costs.keys() & new_costs.keys()) - len(changed_costs),
+    }
+
+    old_recs = {recommendation_key(rec): rec for rec in old.get("recommendations", [])}
+    new_recs = {recommendation_key(rec): rec for rec in new.get("recommendations", [])}
+
+    def brief(rec):
+        return {"title": rec.get("title", ""), "service": rec.get("service", ""),
+                "potential_savings": rec.get("potential_savings", 0)}
+
+    changed_recs = []
+    for key, rec in new_recs.items():
+        before = old_recs.get(key)
+        if before is not None and before.get("potential_savings") != rec.get("potential_savings"):
+            changed_recs.append({"title": rec.get("title", ""), "service": rec.get("service", ""),
+                                 "potential_savings": _change(before.get("potential_savings"),
+                                                              rec.get("potential_savings"))})
+    recommendations = {
+        "added": [brief(rec) for key, rec in new_recs.items() if key not in old_recs],
+        "removed": [brief(rec) for key, rec in old_recs.items() if key not in new_recs],
+        "changed": changed_recs,
+        "unchanged": len(old_recs.keys() & new_recs.keys()) - len(changed_recs),
+    }
+
+    return {
+        "total_monthly_cost": _change(old_analysis.get("total_monthly_cost"), new_analysis.get("total_monthly_cost")),
+        "budget_variance": _change(old_analysis.get("budget_variance"), new_analysis.get("budget_variance")),
+        "total_potential_savings": _change(old.get("summary", {}).get("total_potential_savings"),
+                                           new.get("summary", {}).get("total_potential_savings")),
+        "service_costs": service_costs,
+        "recommendations": recommendations,
+    }
+
+
+def diff_runs(conn: sqlite3.Connection, old_id: int, new_id: int) -> dict:
+    """diff_reports for two stored runs, labelled with their ids and timestamps."""
+    old, new = get_run(conn, old_id), get_run(conn, new_id)
+    diff = diff_reports(old.pop("report"), new.pop("report"))
+    return {"old_run": old, "new_run": new, **diff}
@@ -0,0 +1,180 @@
+import os
+import math
+import numpy as np
+
+# Ordered levels for implementation_effort and risk_level
+LEVELS = ("low", "medium", "high")
+
+# Implementation cost of a recommendation, minimised by the optimizer
+EFFORT_POINTS = {"low": 1, "medium": 2, "high": 3}
+
+# Default constraints for the report's portfolio section
+PORTFOLIO_MAX_EFFORT = os.getenv("PORTFOLIO_MAX_EFFORT", "high").lower()
+PORTFOLIO_MAX_RISK = os.getenv("PORTFOLIO_MAX_RISK", "high").lower()
+
+# Largest savings fraction of a service, so log(1 - f) stays finite
+_MAX_FRACTION = 1 - 1e-9
+
+
+def _level(value) -> int:
+    """Index of an effort/risk value in LEVELS; unknown values count as medium."""
+    value = str(value or "").strip().lower()
+    return LEVELS.index(value) if value in LEVELS else 1
+
+
+def _service_cost(rec: dict, service_costs: dict) -> float:
+    """The cost a recommendation's savings are capped at: its service's billed cost."""
+    cost = service_costs.get(rec.get("service"))
+    if cost is None:
+        # Service not in the billing breakdown: trust the recommendation's own figure
+        cost = rec.get("current_cost") or rec.get("potential_savings") or 0
+    return float(cost)
+
+
+def _fraction(rec: dict, cost: float) -> float:
+    """Share of its service's cost a recommendation saves, capped at 1."""
+    if cost <= 0:
+        return 0.0
+    return min(max(float(rec.get("potential_savings") or 0), 0.0) / cost, _MAX_FRACTION)
+
+
+def combined_savings(recommendations, service_costs: dict) -> dict:
+    """
+    Overlap-adjusted savings of applying every recommendation together.
+
+    Recommendations on the same service compound multiplicatively: two that
+    each save half of a service's cost save 75% together, never more than
+    the service costs.
+
+    Returns:
+        dict: {service: savings in INR}
+    """
+    remaining = {}
+    costs = {}
+    for rec in recommendations:
+        service = rec.get("service")
+        cost = costs.setdefault(service, _service_cost(rec, service_costs))
+        remaining[service] = remaining.get(service, 1.0) * (1 - _fraction(rec, cost))
+    return {service: round(costs[service] * (1 - left), 2) for service, left in remaining.items()}
+
+
+def _service_options(items: list, cost: float) -> list:
+    """
+    Best subsets of one service's recommendations for every effort total.
+
+    items are (index, effort_points, -log(1 - fraction)); the log turns the
+    multiplicative overlap into a sum, so this is a 0/1 knapsack on effort.
+
+    Returns:
+        list: (effort_points, savings, indices) with savings increasing in
+            effort; dominated subsets are dropped. The first is the empty set.
+    """
+    total_points = sum(points for _, points, _ in items)
+    best = [None] * (total_points + 1)
+    best[0] = (0.0, ())
+    for index, points, value in items:
+        for c in range(total_points, points - 1, -1):
+            previous = best[c - points]
+            if previous is not None and (best[c] is None or previous[0] + value > best[c][0]):
+                best[c] = (previous[0] + value, previous[1] + (index,))
+
+    options = []
+    for c, entry in enumerate(best):
+        if entry is None:
+            continue
+        savings = cost * -math.expm1(-entry[0])
+        if not options or savings > options[-1][1] + 0.005:
+            options.append((c, savings, entry[1]))
+    return options
+
+
+def optimize_portfolio(recommendations, service_costs: dict, total_cost: float, budget: float,
+                       max_effort: str = PORTFOLIO_MAX_EFFORT, max_risk: str = PORTFOLIO_MAX_RISK) -> dict:
+    """
+    Choose which recommendations to implement.
+
+    Candidates above max_effort or max_risk are excluded. Savings are capped
+    at each service's billed cost and overlap multiplicatively (see
+    combined_savings). If the candidates can bring total_cost under budget,
+    the set with the least total effort (low=1, medium=2, high=3 points)
+    that does so is chosen, breaking ties by savings; otherwise, or when
+    already within budget, the set with the largest savings, taking the
+    least effort among sets within a paisa of it.
+
+    Services are groups of a multiple-choice knapsack over effort points:
+    each service's subsets are reduced to one best option per effort total,
+    then a vectorized DP picks one option per service. Time is about
+    O(points x options), milliseconds for hundreds of recommendations.
+
+    Returns:
+        dict: Selected recommendation indices and the projected cost
+    """
+    effort_cap = _level(max_effort)
+    risk_cap = _level(max_risk)
+
+    groups = {}
+    costs = {}
+    excluded = 0
+    for index, rec in enumerate(recommendations):
+        if _level(rec.get("implementation_effort")) > effort_cap or _level(rec.get("risk_level")) > risk_cap:
+            excluded += 1
+            continue
+        service = rec.get("service")
+        cost = costs.setdefault(service, _service_cost(rec, service_costs))
+        fraction = _fraction(rec, cost)
+        if fraction <= 0:
+            continue
+        points = EFFORT_POINTS[LEVELS[_level(rec.get("implementation_effort"))]]
+        groups.setdefault(service, []).append((index, points, -math.log1p(-fraction)))
+
+    services = list(groups)
+    options = [_service_options(groups[service], costs[service]) for service in services]
+    total_points = sum(opts[-1][0] for opts in options)
+
+    # best[c]: largest savings with exactly c effort points; picks[g][c]: option used for service g
+    best = np.full(total_points + 1, -np.inf)
+    best[0] = 0.0
+    picks = []
+    for opts in options:
+        updated = best.copy()
+        pick = np.zeros(total_points + 1, dtype=np.int32)
+        for j, (points, savings, _) in enumerate(opts[1:], 1):
+            candidate = np.full(total_points + 1, -np.inf)
+            candidate[points:] = best[:total_points + 1 - points] + savings
+            better = candidate > updated
+            updated[better] = candidate[better]
+            pick[better] = j
+        best = updated
+        picks.append(pick)
+
+    savings_needed = max(0.0, float(total_cost) - float(budget))
+    reachable = np.flatnonzero(best >= savings_needed - 0.005) if savings_needed > 0 else np.array([], dtype=int)
+    if not len(reachable):
+        # Fewest points within a paisa of the largest savings
+        reachable = np.flatnonzero(best >= best.max() - 0.005)
+    chosen_points = int(reachable[0])
+
+    selected = []
+    service_savings = {}
+    points_left = chosen_points
+    for service, opts, pick in zip(reversed(services), reversed(options), reversed(picks)):
+        points, savings, indices = opts[int(pick[points_left])]
+        points_left -= points
+        if indices:
+            selected.extend(indices)
+            service_savings[service] = round(savings, 2)
+
+    total_savings = round(sum(service_savings.values()), 2)
+    projected = round(float(total_cost) - total_savings, 2)
+    return {
+        "selected": sorted(selected),
+        "total_savings": total_savings,
+        "projected_monthly_cost": projected,
+        "budget": budget,
+        "savings_needed": round(savings_needed, 2),
+        "meets_budget": projected <= float(budget) + 0.005,
+        "effort_points": chosen_points,
+        "service_savings": dict(sorted(service_savings.items(), key=lambda x: x[1], reverse=True)),
+        "constraints": {"max_effort": LEVELS[effort_cap], "max_risk": LEVELS[risk_cap]},
+        "excluded": excluded,
+    }
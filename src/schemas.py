@@ -0,0 +1,183 @@
+import re
+import time
+from operator import itemgetter
+from itertools import product, repeat
+from jsonschema import Draft7Validator
+from src import metrics
+
+PROFILE_SCHEMA = {
+    "type": "object",
+    "required": ["name", "budget_inr_per_month", "description", "tech_stack", "non_functional_requirements"],
+    "properties": {
+        "name": {"type": "string"},
+        "budget_inr_per_month": {"type": "number", "minimum": 0},
+        "description": {"type": "string"},
+        "tech_stack": {"type": "object"},
+        "non_functional_requirements": {"type": "array"},
+    },
+}
+
+BILLING_RECORD_SCHEMA = {
+    "type": "object",
+    "required": ["month", "service", "resource_id", "region", "usage_type",
+                 "usage_quantity", "unit", "cost_inr", "desc"],
+    "properties": {
+        "month": {"type": "string"},
+        "service": {"type": "string"},
+        "resource_id": {"type": "string"},
+        "region": {"type": "string"},
+        "usage_type": {"type": "string"},
+        "usage_quantity": {"type": "number"},
+        "unit": {"type": "string"},
+        "cost_inr": {"type": "number"},
+        "desc": {"type": ["string", "null"]},
+    },
+}
+
+RECOMMENDATION_SCHEMA = {
+    "type": "object",
+    "required": ["title", "service", "current_cost", "potential_savings", "recommendation_type",
+                 "description", "implementation_effort", "risk_level", "steps", "cloud_providers"],
+    "properties": {
+        "title": {"type": "string"},
+        "service": {"type": "string"},
+        "current_cost": {"type": "number"},
+        "potential_savings": {"type": "number"},
+        "recommendation_type": {"type": "string"},
+        "description": {"type": "string"},
+        "implementation_effort": {"type": "string"},
+        "risk_level": {"type": "string"},
+        "steps": {"type": "array", "items": {"type": "string"}},
+        "cloud_providers": {"type": "array", "items": {"type": "string"}},
+    },
+}
+
+# Schemas are checked and validators compiled once, at import
+for _schema in (PROFILE_SCHEMA, BILLING_RECORD_SCHEMA, RECOMMENDATION_SCHEMA):
+    Draft7Validator.check_schema(_schema)
+PROFILE_VALIDATOR = Draft7Validator(PROFILE_SCHEMA)
+BILLING_RECORD_VALIDATOR = Draft7Validator(BILLING_RECORD_SCHEMA)
+RECOMMENDATION_VALIDATOR = Draft7Validator(RECOMMENDATION_SCHEMA)
+
+# Errors listed in one ValueError before the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+# "₹1,234.50", "1234 INR", "$12" -> 1234.50 / 1234 / 12
+_NUMBER_NOISE = re.compile(r"[,\s₹$]|INR|USD|Rs\.?", re.I)
+
+
+def _numeric_fields(schema: dict) -> tuple:
+    return tuple(name for name, prop in schema["properties"].items() if prop.get("type") == "number")
+
+
+PROFILE_NUMERIC_FIELDS = _numeric_fields(PROFILE_SCHEMA)
+BILLING_NUMERIC_FIELDS = _numeric_fields(BILLING_RECORD_SCHEMA)
+RECOMMENDATION_NUMERIC_FIELDS = _numeric_fields(RECOMMENDATION_SCHEMA)
+
+# Fast path for billing records: BILLING_RECORD_SCHEMA only asserts required
+# keys and flat types, so a record is valid iff the Python types of its
+# required fields form one of these tuples
+_PYTHON_TYPES = {"string": (str,), "number": (int, float), "null": (type(None),)}
+_billing_getter = itemgetter(*BILLING_RECORD_SCHEMA["required"])
+_BILLING_TYPE_ROWS = frozenset(product(*(
+    tuple(t for name in ([prop["type"]] if isinstance(prop["type"], str) else prop["type"])
+          for t in _PYTHON_TYPES[name])
+    for prop in (BILLING_RECORD_SCHEMA["properties"][field] for field in BILLING_RECORD_SCHEMA["required"])
+)))
+
+
+def _billing_chunk_valid(records) -> bool:
+    """True if every record has all required fields with schema types."""
+    try:
+        type_rows = set(map(tuple, map(map, repeat(type), map(_billing_getter, records))))
+    except (KeyError, TypeError, IndexError):
+        return False
+    return type_rows <= _BILLING_TYPE_ROWS
+
+
+def to_number(value):
+    """
+    Convert a numeric string such as "1,234.50" or "₹1200" to int/float.
+    Other values (including unparseable strings) are returned unchanged.
+    """
+    if not isinstance(value, str):
+        return value
+    try:
+        number = float(_NUMBER_NOISE.sub("", value))
+    except ValueError:
+        return value
+    return int(number) if number.is_integer() else number
+
+
+def coerce_numbers(record, fields) -> None:
+    """Coerce string values of fields in record to numbers, in place."""
+    if isinstance(record, dict):
+        for field in fields:
+            if isinstance(record.get(field), str):
+                record[field] = to_number(record[field])
+
+
+def _messages(validator, label: str, index: int, record) -> list:
+    messages = []
+    for error in sorted(validator.iter_errors(record), key=lambda e: list(e.path)):
+        where = ".".join(str(p) for p in error.path)
+        messages.append(f"{label} {index}{f' ({where})' if where else ''}: {error.message}")
+    return messages
+
+
+def _raise_collected(label: str, messages: list) -> None:
+    if not messages:
+        return
+    shown = messages[:MAX_REPORTED_ERRORS]
+    extra = len(messages) - len(shown)
+    if extra:
+        shown.append(f"... and {extra} more error(s)")
+    raise ValueError(f"{len(messages)} {label.lower()} validation error(s):\n" + "\n".join(shown))
+
+
+def validate_records(records, validator, numeric_fields=(), label: str = "Record", start: int = 0) -> None:
+    """
+    Coerce numeric strings, then validate every record against validator,
+    collecting all errors.
+
+    Raises:
+        ValueError: Listing every invalid record (numbered from start)
+    """
+    started = time.perf_counter()
+    messages = []
+    for i, record in enumerate(records, start):
+        coerce_numbers(record, numeric_fields)
+        messages.extend(_messages(validator, label, i, record))
+    metrics.add(validate_s=time.perf_counter() - started)
+    _raise_collected(label, messages)
+
+
+def validate_profile(profile) -> None:
+    validate_records([profile], PROFILE_VALIDATOR, PROFILE_NUMERIC_FIELDS, label="Profile")
+
+
+def validate_recommendations(recommendations, start: int = 0) -> None:
+    validate_records(recommendations, RECOMMENDATION_VALIDATOR, RECOMMENDATION_NUMERIC_FIELDS,
+                     label="Recommendation", start=start)
+
+
+def validate_billing_records(records, start: int = 0) -> None:
+    """
+    Validate billing records in bulk, fast enough for million-row ingest.
+
+    A chunk whose records all have the schema's field types is accepted in
+    one C-level pass and never reaches jsonschema. Otherwise each record is
+    coerced and run through the compiled validator, which reports every
+    error.
+    """
+    started = time.perf_counter()
+    try:
+        if _billing_chunk_valid(records):
+            return
+        messages = []
+        for i, record in enumerate(records, start):
+            coerce_numbers(record, BILLING_NUMERIC_FIELDS)
+            messages.extend(_messages(BILLING_RECORD_VALIDATOR, "Record", i, record))
+    finally:
+        metrics.add(validate_s=time.perf_counter() - started)
+    _raise_collected("Record", messages)
@@ -0,0 +1,559 @@
+"""
+Long-running HTTP service for dashboards and other local clients.
+
+Usage:
+    python -m src.service [--port 8000] [--data-dir data] [--workers 4] [--queue 16]
+    python main.py serve [same options]
+
+Endpoints (JSON in and out; ?project=NAME or "project" selects a
+sub-directory of the data dir, e.g. one written by batch mode):
+
+    GET  /health                      status, uptime, queue depth, cache counters
+    GET  /metrics                     Prometheus text: stage totals plus service counters
+    POST /profile                     {"description": "..."} -> extracted project profile
+    POST /analyze                     {"force": false, "no_llm": false} -> run the pipeline, return the report
+    GET  /analysis                    billing aggregates, anomalies and what-if summary (no LLM)
+    GET  /recommendations             recommendations, summary and portfolio of the report
+    GET  /report                      the full report
+    GET  /whatif?limit=20             cheapest what-if scenarios
+    GET  /query?group_by=service&...  cost drill-down (same filters as `main.py query`)
+
+The process keeps the LLM client's keep-alive session, the in-memory LLM
+response cache, the price catalog, parsed reports and billing aggregates
+warm between requests. Cached state is keyed by each file's size and
+modification time, so a request costs one stat per input file until the
+file changes, and repeated GETs are answered from encoded response bytes.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+
+# Requests handled at once, and requests allowed to wait for a free worker
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", "4"))
+SERVICE_QUEUE = int(os.getenv("SERVICE_QUEUE", "16"))
+
+# Seconds a queued request waits for a worker before 503 Service Unavailable
+SERVICE_QUEUE_TIMEOUT = float(os.getenv("SERVICE_QUEUE_TIMEOUT", "30"))
+
+# Encoded GET responses kept for repeated requests
+RESPONSE_CACHE_ENTRIES = 256
+
+# Largest accepted request body
+MAX_BODY_BYTES = 1024 * 1024
+
+# Stage metric records kept before older ones are merged (see metrics.compact)
+MAX_STAGE_RECORDS = 1000
+
+REPORT_FILENAME = "cost_optimization_report.json"
+BILLING_FILENAME = "mock_billing.json"
+PROFILE_FILENAME = "project_profile.json"
+
+QUERY_FILTERS = {"month": str, "service": str, "region": str, "resource_id": str, "usage_type": str,
+                 "min_usage": float, "min_cost": float, "limit": int}
+
+
+class ServiceError(Exception):
+    """A request failure with the HTTP status to answer it with."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class RequestLimiter:
+    """
+    Admission control: at most `workers` requests run at once and at most
+    `queue` wait for a slot. Requests beyond that, or waiting longer than
+    `timeout` seconds, are rejected with 503 instead of piling up threads.
+    """
+
+    def __init__(self, workers: int = SERVICE_WORKERS, queue: int = SERVICE_QUEUE,
+                 timeout: float = SERVICE_QUEUE_TIMEOUT):
+        self.workers = workers
+        self.queue = queue
+        self.timeout = timeout
+        self.running = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(workers)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self):
+        with self._lock:
+            if self.waiting >= self.queue:
+                self.rejected += 1
+                raise ServiceError(503, "Server busy: request queue is full")
+            self.waiting += 1
+        acquired = self._slots.acquire(timeout=self.timeout)
+        with self._lock:
+            self.waiting -= 1
+            if acquired:
+                self.running += 1
+            else:
+                self.rejected += 1
+        if not acquired:
+            raise ServiceError(503, "Server busy: timed out waiting for a worker")
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.running -= 1
+            self._slots.release()
+
+
+def _encode(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _files_state(paths) -> tuple:
+    """
+    (mtime_ns, size) of each file; state built from them stays valid while
+    this is unchanged. The first file is required, later ones may be missing.
+    """
+    states = []
+    for i, path in enumerate(paths):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            if i == 0:
+                raise ServiceError(404, f"{os.path.basename(path)} not found; run POST /analyze first")
+            states.append(None)
+            continue
+        states.append((st.st_mtime_ns, st.st_size))
+    return tuple(states)
+
+
+class ServiceState:
+    """
+    Warm state shared by every request: parsed reports, billing aggregates
+    and encoded responses, each stored with the state of the file it came
+    from and rebuilt only when that file changes. Builds for the same file
+    are single-flight; pipeline runs on a project are serialized.
+    """
+
+    def __init__(self, data_dir: str = "data", limiter: RequestLimiter = None):
+        self.data_dir = data_dir
+        self.limiter = limiter or RequestLimiter()
+        self.started = time.time()
+        self.stats = {"requests": 0, "errors": 0, "response_hits": 0, "builds": 0}
+        self._lock = threading.Lock()
+        self._locks = {}
+        self._files = {}
+        self._responses = OrderedDict()
+
+    def _lock_for(self, key) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def project_dir(self, project) -> str:
+        if not project:
+            return self.data_dir
+        if os.path.basename(project) != project or project in (".", ".."):
+            raise ServiceError(400, f"Invalid project name: {project!r}")
+        return os.path.join(self.data_dir, project)
+
+    def _cached(self, key, paths: tuple, build):
+        """
+        build() for key, rebuilt (once, under a per-key lock) when any of
+        the files it was built from changes.
+        """
+        state = _files_state(paths)
+        entry = self._files.get(key)
+        if entry is not None and entry[0] == state:
+            return entry[1]
+        with self._lock_for(("build", key)):
+            entry = self._files.get(key)
+            if entry is None or entry[0] != state:
+                self.count("builds")
+                entry = self._files[key] = (state, build())
+            return entry[1]
+
+    def response(self, key, paths: tuple, build) -> bytes:
+        """Encoded build() payload for key, reused while the files in paths are unchanged."""
+        state = _files_state(paths)
+        with self._lock:
+            entry = self._responses.get(key)
+            if entry is not None and entry[0] == state:
+                self._responses.move_to_end(key)
+                self.stats["response_hits"] += 1
+                return entry[1]
+        body = _encode(build())
+        with self._lock:
+            self._responses[key] = (state, body)
+            while len(self._responses) > RESPONSE_CACHE_ENTRIES:
+                self._responses.popitem(last=False)
+        return body
+
+    def catalog(self):
+        from src.price_catalog import PRICE_CATALOG_PATH, load_catalog
+        return self._cached("catalog", (PRICE_CATALOG_PATH,), load_catalog)
+
+    def report(self, project_dir: str) -> dict:
+        path = report_path(project_dir)
+
+        def load():
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return self._cached(("report", project_dir), (path,), load)
+
+    def billing(self, project_dir: str) -> dict:
+        """
+        Aggregates, anomalies and what-if results of a project's billing
+        file, computed in one pass and kept until the billing, profile
+        (budget) or price catalog changes.
+        """
+        from src.cost_analyzer import aggregate_billing, billing_analysis
+        from src.anomaly_detector import AnomalyDetector
+        from src import metrics
+        from src.price_catalog import ScenarioSimulator, what_if_summary
+
+        catalog = self.catalog()
+
+        # Timed as its own stage so "analysis" keeps meaning full analyze_cost runs
+        @metrics.timed_stage("service.analysis")
+        def load():
+            anomalies = AnomalyDetector()
+            simulator = ScenarioSimulator()
+            aggregator = aggregate_billing(billing_path(project_dir), consumers=(anomalies, simulator))
+            analysis = billing_analysis(aggregator, _budget(project_dir))
+            analysis["rows"] = aggregator.rows
+            scenarios = sorted(simulator.simulate(catalog), key=lambda r: r["total_cost"])
+            analysis["what_if"] = what_if_summary(scenarios, simulator.total_paise, catalog,
+                                                  simulator.priced_share(catalog))
+            return {"analysis": analysis, "anomalies": anomalies.report(), "scenarios": scenarios}
+
+        return self._cached(("billing", project_dir), billing_inputs(project_dir), load)
+
+    def run_locked(self, project_dir: str, func):
+        """Run func with the project's files to itself (pipeline runs and index updates write them)."""
+        with self._lock_for(("project", project_dir)):
+            return func()
+
+
+def report_path(project_dir: str) -> str:
+    return os.path.join(project_dir, REPORT_FILENAME)
+
+
+def billing_path(project_dir: str) -> str:
+    return os.path.join(project_dir, BILLING_FILENAME)
+
+
+def billing_inputs(project_dir: str) -> tuple:
+    """Files the billing-derived state depends on, the billing file first."""
+    from src.price_catalog import PRICE_CATALOG_PATH
+    return billing_path(project_dir), os.path.join(project_dir, PROFILE_FILENAME), PRICE_CATALOG_PATH
+
+
+def _budget(project_dir: str):
+    """The project's monthly budget, or 0 before a profile exists."""
+    try:
+        with open(os.path.join(project_dir, PROFILE_FILENAME), "r", encoding="utf-8") as f:
+            return json.load(f)["budget_inr_per_month"]
+    except (OSError, ValueError, KeyError):
+        return 0
+
+
+# -------------------------------
+# Endpoints: (state, project dir, query params, body) -> payload or bytes
+# -------------------------------
+def _health(state, project_dir, params, body):
+    limiter = state.limiter
+    return {
+        "status": "ok",
+        "uptime_s": round(time.time() - state.started, 1),
+        "workers": limiter.workers,
+        "running": limiter.running,
+        "waiting": limiter.waiting,
+        "rejected": limiter.rejected,
+        **state.stats,
+    }
+
+
+def _metrics(state, project_dir, params, body):
+    from src import metrics
+
+    limiter = state.limiter
+    lines = [metrics.to_prometheus().rstrip("\n")]
+    for name, kind, help_text, value in (
+        ("cco_service_requests_total", "counter", "HTTP requests received", state.stats["requests"]),
+        ("cco_service_errors_total", "counter", "HTTP requests answered with an error", state.stats["errors"]),
+        ("cco_service_rejected_total", "counter", "Requests rejected by the concurrency limit", limiter.rejected),
+        ("cco_service_response_cache_hits_total", "counter", "Responses served from warm state",
+         state.stats["response_hits"]),
+        ("cco_service_running", "gauge", "Requests being handled", limiter.running),
+        ("cco_service_waiting", "gauge", "Requests waiting for a worker", limiter.waiting),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _profile(state, project_dir, params, body):
+    from src.profile_extractor import extract_project_profile
+
+    description = str(body.get("description") or "").strip()
+    if not description:
+        raise ServiceError(400, "description is required")
+
+    def run():
+        os.makedirs(project_dir, exist_ok=True)
+        with open(os.path.join(project_dir, "project_description.txt"), "w", encoding="utf-8") as f:
+            f.write(description)
+        return extract_project_profile(project_dir)
+
+    return {"profile": state.run_locked(project_dir, run)}
+
+
+def _analyze(state, project_dir, params, body):
+    from src.pipeline import run_pipeline
+
+    use_llm = not body.get("no_llm")
+    timings = state.run_locked(project_dir, lambda: run_pipeline(project_dir, force=bool(body.get("force")),
+                                                                 use_llm=use_llm))
+    return {"timings": timings, "report": state.report(project_dir)}
+
+
+def _analysis(state, project_dir, params, body):
+    def build():
+        billing = state.billing(project_dir)
+        return dict(billing["analysis"], anomalies=billing["anomalies"])
+
+    return state.response(("analysis", project_dir), billing_inputs(project_dir), build)
+
+
+def _recommendations(state, project_dir, params, body):
+    def build():
+        report = state.report(project_dir)
+        return {key: report.get(key) for key in ("project_name", "recommendations", "summary", "portfolio")}
+
+    return state.response(("recommendations", project_dir), (report_path(project_dir),), build)
+
+
+def _report(state, project_dir, params, body):
+    return state.response(("report", project_dir), (report_path(project_dir),), lambda: state.report(project_dir))
+
+
+def _whatif(state, project_dir, params, body):
+    limit = _param(params, "limit", int, 20)
+    return state.response(("whatif", project_dir, limit), billing_inputs(project_dir),
+                          lambda: state.billing(project_dir)["scenarios"][:limit or None])
+
+
+def _query(state, project_dir, params, body):
+    from src.cost_analyzer import query_costs
+    from src.cost_index import INDEX_FILENAME
+
+    group_by = _param(params, "group_by", str, "resource")
+    filters = {name: _param(params, name, kind, None) for name, kind in QUERY_FILTERS.items()}
+    if filters["limit"] is None:
+        filters["limit"] = 20
+    # limit=0 means every row, as in `main.py query`
+    filters["limit"] = filters["limit"] or None
+
+    def build():
+        return state.run_locked(project_dir, lambda: query_costs(project_dir, group_by=group_by, **filters))
+
+    # The index may also hold files added with `main.py query --add`
+    key = ("query", project_dir, group_by, tuple(sorted(filters.items())))
+    return state.response(key, (billing_path(project_dir), os.path.join(project_dir, INDEX_FILENAME)), build)
+
+
+ROUTES = {
+    ("GET", "/health"): _health,
+    ("GET", "/metrics"): _metrics,
+    ("POST", "/profile"): _profile,
+    ("POST", "/analyze"): _analyze,
+    ("GET", "/analysis"): _analysis,
+    ("GET", "/recommendations"): _recommendations,
+    ("GET", "/report"): _report,
+    ("GET", "/whatif"): _whatif,
+    ("GET", "/query"): _query,
+}
+
+# Answered outside the concurrency limit so health checks work under load
+UNLIMITED_ROUTES = {"/health", "/metrics"}
+
+
+def _caused_by(error: BaseException, kind) -> bool:
+    """True if error, or an exception it was raised from or while handling, is a kind."""
+    # Chains can loop (an exception re-raised while handling its own cause)
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, kind):
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def _param(params: dict, name: str, kind, default):
+    values = params.get(name)
+    if not values:
+        return default
+    try:
+        return kind(values[-1])
+    except ValueError:
+        raise ServiceError(400, f"Invalid value for {name}: {values[-1]!r}")
+
+
+class CostOptimizerService(ThreadingHTTPServer):
+    """
+    ThreadingHTTPServer serving the endpoints above from one ServiceState.
+
+    Args:
+        host (str): Interface to bind (default: loopback only)
+        port (int): Port to listen on (0 picks a free one)
+        data_dir (str): Directory holding the default project and per-project sub-directories
+        workers (int): Requests handled at once
+        queue (int): Requests allowed to wait for a worker
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, data_dir: str = "data",
+                 workers: int = SERVICE_WORKERS, queue: int = SERVICE_QUEUE):
+        super().__init__((host, port), _Handler)
+        self.state = ServiceState(data_dir, RequestLimiter(workers, queue))
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_port}"
+
+    def warm_up(self) -> None:
+        """Load the LLM client (env, headers, keep-alive session) and price catalog before the first request."""
+        from src import llm_client
+
+        if llm_client.HF_API_KEY:
+            llm_client.get_session()
+        try:
+            self.state.catalog()
+        except ServiceError:
+            print("⚠️ Price catalog not found: /analysis and /whatif will fail until it exists", file=sys.stderr)
+
+    def start(self):
+        """Serve from a daemon thread and return self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; avoid delayed-ACK stalls
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str):
+        from src import metrics
+
+        state = self.server.state
+        state.count("requests")
+        url = urlsplit(self.path)
+        handler = ROUTES.get((method, url.path))
+        try:
+            if handler is None:
+                allowed = [m for m, path in ROUTES if path == url.path]
+                raise ServiceError(405 if allowed else 404, f"No route for {method} {url.path}")
+            params = parse_qs(url.query)
+            body = self._read_body() if method == "POST" else {}
+            project_dir = state.project_dir(body.get("project") or _param(params, "project", str, None))
+            try:
+                if url.path in UNLIMITED_ROUTES:
+                    payload = handler(state, project_dir, params, body)
+                else:
+                    with state.limiter.slot():
+                        payload = handler(state, project_dir, params, body)
+            finally:
+                # Any handler may record stages (LLM calls, billing loads, index updates)
+                metrics.compact(MAX_STAGE_RECORDS)
+        except ServiceError as e:
+            return self._send_error(e.status, str(e), {"Retry-After": "1"} if e.status == 503 else None)
+        except FileNotFoundError as e:
+            return self._send_error(404, str(e))
+        except ValueError as e:
+            return self._send_error(400, str(e))
+        except Exception as e:
+            # Only a missing API key is "LLM not configured"; any other I/O error is a server error
+            from src.llm_client import LLMNotConfiguredError
+            return self._send_error(503 if _caused_by(e, LLMNotConfiguredError) else 500, str(e))
+
+        content_type = "text/plain; version=0.0.4" if url.path == "/metrics" else "application/json"
+        self._send(200, payload if isinstance(payload, bytes) else _encode(payload), content_type)
+
+    def _read_body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ServiceError(413, f"Request body over {MAX_BODY_BYTES} bytes")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise ServiceError(400, "Request body is not valid JSON")
+        if not isinstance(body, dict):
+            raise ServiceError(400, "Request body must be a JSON object")
+        return body
+
+    def _send_error(self, status: int, message: str, headers: dict = None):
+        self.server.state.count("errors")
+        self._send(status, _encode({"error": {"status": status, "message": message}}), "application/json", headers)
+
+    def _send(self, status: int, data: bytes, content_type: str, headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, data_dir: str = "data",
+          workers: int = SERVICE_WORKERS, queue: int = SERVICE_QUEUE) -> None:
+    """Run the service in the foreground until interrupted."""
+    server = CostOptimizerService(host, port, data_dir, workers, queue)
+    server.warm_up()
+    print(f"✅ Cost optimizer service on {server.url} (data dir {data_dir}, "
+          f"{workers} workers, queue {queue})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the cost optimizer over HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Interface to bind (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument("--data-dir", default="data", help="Data directory (default: data)")
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="Requests handled at once")
+    parser.add_argument("--queue", type=int, default=SERVICE_QUEUE, help="Requests allowed to wait")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.data_dir, args.workers, args.queue)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import pytest
+
+from src import anomaly_detector
+from src.anomaly_detector import AnomalyDetector, load_anomaly_state, save_anomaly_state
+
+
+def _month(resource_id, month, cost, usage=10, service="EC2"):
+    return {"resource_id": resource_id, "service": service, "region": "ap-south-1",
+            "month": f"2025-{month:02d}", "cost_inr": cost, "usage_quantity": usage}
+
+
+def _detect(*costs, resource_id="i-1"):
+    detector = AnomalyDetector()
+    detector.add_records([_month(resource_id, n + 1, cost) for n, cost in enumerate(costs)])
+    return detector.report()
+
+
+def test_spike_after_three_months_of_history():
+    report = _detect(1000, 1000, 1000, 5000)
+    (item,) = report["items"]
+    assert item["compared_with"] == "history"
+    assert item["metric"] == "cost"
+    assert item["month"] == "2025-04"
+    assert (item["value"], item["expected"], item["ratio"]) == (5000, 1000, 5.0)
+
+
+def test_two_months_of_history_are_not_enough():
+    assert _detect(1000, 1000, 5000)["count"] == 0
+
+
+@pytest.mark.parametrize("costs", [
+    (1000, 1000, 1000, 1400),   # 1.4x the expectation: below MIN_SPIKE_RATIO
+    (10, 10, 10, 60),           # 6x, but only ₹50 above the expectation
+])
+def test_small_spikes_are_ignored(costs):
+    assert _detect(*costs)["count"] == 0
+
+
+def test_z_threshold(monkeypatch):
+    # EWMA expectation 1084, standard deviation 231: z is about 3.97
+    (item,) = _detect(1000, 1400, 1000, 2000)["items"]
+    assert item["z_score"] == pytest.approx(3.97, abs=0.01)
+
+    monkeypatch.setattr(anomaly_detector, "ANOMALY_Z_THRESHOLD", 4.0)
+    assert _detect(1000, 1400, 1000, 2000)["count"] == 0
+
+
+def test_usage_spike_is_reported_separately():
+    detector = AnomalyDetector()
+    detector.add_records([_month("i-1", n + 1, 1000, usage) for n, usage in enumerate((10, 10, 10, 40))])
+    (item,) = detector.report()["items"]
+    assert (item["metric"], item["value"], item["expected"]) == ("usage", 40, 10)
+
+
+@pytest.mark.parametrize("peers, expected", [(3, 1), (2, 0)])
+def test_peer_comparison_needs_min_peers(peers, expected):
+    detector = AnomalyDetector()
+    detector.add_records([_month(f"i-{n}", 1, 1000 + 10 * n) for n in range(peers)])
+    detector.add_records([_month("i-big", 1, 20000)])
+    report = detector.report()
+    assert report["count"] == expected
+    if expected:
+        (item,) = report["items"]
+        assert (item["resource_id"], item["compared_with"]) == ("i-big", "peers")
+
+
+def test_record_order_and_merging_do_not_matter():
+    records = [_month("i-1", n % 4 + 1, 1000 if n % 4 < 3 else 5000, usage=2.5) for n in range(8)]
+    ordered, shuffled, merged, part = AnomalyDetector(), AnomalyDetector(), AnomalyDetector(), AnomalyDetector()
+    ordered.add_records(sorted(records, key=lambda r: r["month"]))
+    shuffled.add_records(records)
+    merged.add_records(records[1::2])
+    part.add_records(records[::2])
+    merged.merge(part)
+
+    expected = ordered.report()
+    assert expected["count"] == 1
+    assert shuffled.report() == expected == merged.report()
+
+
+def _ingest(path, records):
+    """One analysis run: load the saved state, add records, save it and return the report."""
+    detector = AnomalyDetector(load_anomaly_state(path))
+    detector.add_records(records)
+    report = detector.report()
+    save_anomaly_state(path, detector)
+    return report
+
+
+def test_state_carries_over_between_ingests(tmp_path):
+    path = str(tmp_path / "anomaly_state.json")
+    months = [[_month("i-1", n, cost)] for n, cost in enumerate((1000, 1000, 1000, 5000), 1)]
+    for records in months[:3]:
+        assert _ingest(path, records)["count"] == 0
+
+    incremental = _ingest(path, months[3])
+    assert incremental == _detect(1000, 1000, 1000, 5000)
+
+    # Reading the same months again changes nothing
+    assert _ingest(path, [record for records in months for record in records]) == incremental
+
+
+def test_late_month_is_scored_and_counted(tmp_path):
+    path = str(tmp_path / "anomaly_state.json")
+    _ingest(path, [_month("i-1", n, 1000) for n in (1, 2, 3, 5)])
+
+    report = _ingest(path, [_month("i-1", 4, 6000)])
+    assert report["late_months"] == 1
+    (item,) = report["items"]
+    assert (item["month"], item["compared_with"], item["expected"]) == ("2025-04", "history", 1000)
+
+    # Once folded, the month is not late again
+    assert _ingest(path, [_month("i-1", 4, 6000)])["late_months"] == 0
+
+
+def test_peers_are_compared_in_every_month():
+    detector = AnomalyDetector()
+    for month in (1, 2):
+        detector.add_records([_month(f"i-{n}", month, 1000 + 10 * n) for n in range(4)])
+    detector.add_records([_month("i-big", 1, 20000), _month("i-big", 2, 1000)])
+    (item,) = detector.report()["items"]
+    assert (item["resource_id"], item["month"], item["compared_with"]) == ("i-big", "2025-01", "peers")
@@ -0,0 +1,47 @@
+import threading
+import time
+
+import pytest
+
+from src import batch
+
+PROJECTS = 24
+PROJECT_SECONDS = 0.2
+
+
+@pytest.fixture
+def descriptions(tmp_path, monkeypatch):
+    """PROJECTS descriptions whose pipeline sleeps, recording how many run at once."""
+    input_dir = tmp_path / "descriptions"
+    input_dir.mkdir()
+    for n in range(PROJECTS):
+        (input_dir / f"project-{n:02d}.txt").write_text("A small web app", encoding="utf-8")
+
+    running = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def run_project(description_path, project_dir, use_llm=True):
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+        time.sleep(PROJECT_SECONDS)
+        with lock:
+            running["now"] -= 1
+        return {"analysis": {"total_monthly_cost": 1000}, "recommendations": []}
+
+    monkeypatch.setattr(batch, "run_project", run_project)
+    return str(input_dir), str(tmp_path / "results"), running
+
+
+@pytest.mark.parametrize("concurrency", [4, PROJECTS])
+def test_wall_time_scales_with_concurrency(descriptions, concurrency):
+    input_dir, output_dir, running = descriptions
+    started = time.perf_counter()
+    results = batch.run_batch(input_dir, output_dir, concurrency)
+    elapsed = time.perf_counter() - started
+
+    assert [r["status"] for r in results] == ["ok"] * PROJECTS
+    # More than the default executor's min(32, cpus + 4) threads when asked for
+    assert running["peak"] == concurrency
+    rounds = -(-PROJECTS // concurrency)
+    assert rounds * PROJECT_SECONDS * 0.9 <= elapsed < (rounds + 1.5) * PROJECT_SECONDS
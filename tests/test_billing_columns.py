@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+from src.billing_columns import BillingColumns, CostAggregator, TopRecords, to_inr
+
+
+def _records(n, seed=3):
+    rng = random.Random(seed)
+    return [{"service": rng.choice(["EC2", "S3", "RDS", "Lambda"]), "region": rng.choice(["ap-south-1", "us-east-1"]),
+             "usage_type": rng.choice(["BoxUsage", "TimedStorage", "Requests"]), "month": f"2025-0{rng.randint(1, 3)}",
+             "resource_id": f"r-{rng.randrange(30)}", "cost_inr": round(rng.uniform(0, 500), 2),
+             "usage_quantity": rng.randrange(1000)} for _ in range(n)]
+
+
+def _reference(records, *fields):
+    """Cost in paise per tuple of field values, summed record by record."""
+    totals = {}
+    for record in records:
+        key = tuple(record[field] for field in fields)
+        totals[key] = totals.get(key, 0) + round(record["cost_inr"] * 100)
+    return totals
+
+
+def test_group_bys_match_a_record_by_record_sum():
+    records = _records(500)
+    columns = BillingColumns.from_records(records)
+    assert len(columns) == 500
+    assert columns.total_cost_paise() == sum(round(r["cost_inr"] * 100) for r in records)
+    for field in ("service", "region", "usage_type", "month"):
+        expected = {value: to_inr(paise) for (value,), paise in _reference(records, field).items()}
+        assert columns.group_cost(field) == expected
+        # Categories keep first-appearance order
+        assert list(columns.group_cost(field)) == list(dict.fromkeys(r[field] for r in records))
+    assert columns.group_usage("service")["EC2"] == sum(r["usage_quantity"] for r in records if r["service"] == "EC2")
+
+    cross = columns.cross_group_paise("month", "service")
+    assert {(month, service): paise for month, services in cross.items() for service, paise in services.items()} \
+        == _reference(records, "month", "service")
+
+
+def test_costs_are_exact_paise():
+    records = [{"service": "EC2", "cost_inr": 0.1}] * 3 + [{"service": "S3", "cost_inr": 0.2}]
+    columns = BillingColumns.from_records(records)
+    assert columns.group_cost("service") == {"EC2": 0.3, "S3": 0.2}
+    assert columns.total_cost() == 0.5
+    assert (to_inr(1200), to_inr(1250)) == (12, 12.5)
+    assert isinstance(to_inr(1200), int)
+
+
+def test_top_cost_breaks_ties_by_first_appearance():
+    columns = BillingColumns.from_records([{"service": s, "cost_inr": c} for s, c in
+                                           [("S3", 5), ("EC2", 9), ("RDS", 5), ("Lambda", 1)]])
+    assert columns.top_cost("service", k=3) == {"EC2": 9, "S3": 5, "RDS": 5}
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 500])
+def test_chunked_and_merged_aggregation_match_one_pass(chunk):
+    records = _records(500)
+    single, chunked, merged = CostAggregator(), CostAggregator(), CostAggregator()
+    single.add_records(records)
+    for start in range(0, len(records), chunk):
+        chunked.add_records(records[start:start + chunk])
+    part = CostAggregator()
+    merged.add_records(records[:chunk])
+    part.add_records(records[chunk:])
+    merged.merge(part)
+    for aggregator in (chunked, merged):
+        assert aggregator.rows == single.rows == 500
+        assert aggregator.total_cost() == single.total_cost()
+        assert aggregator.group_paise == single.group_paise
+        assert aggregator.month_service_paise == single.month_service_paise
+        assert aggregator.top_cost("service") == single.top_cost("service")
+
+
+def test_top_records_keeps_the_k_most_expensive_and_merges():
+    records = _records(200)
+    expected = sorted(records, key=lambda r: r["cost_inr"], reverse=True)[:5]
+    top, part = TopRecords(k=5), TopRecords(k=5)
+    top.add_records(records[:90])
+    part.add_records(records[90:])
+    top.merge(part)
+    assert top.records() == expected
+
+    # Equal costs: the record seen first wins, also across a merge
+    first, second = TopRecords(k=1), TopRecords(k=1)
+    first.add_records([{"id": "a", "cost_inr": 10}])
+    second.add_records([{"id": "b", "cost_inr": 10}])
+    first.merge(second)
+    assert first.records() == [{"id": "a", "cost_inr": 10}]
@@ -0,0 +1,29 @@
+import gzip
+import json
+
+from src.billing_generator import _resource, generate_billing_local
+
+PROFILE = {"name": "Generator Test", "budget_inr_per_month": 20000,
+           "tech_stack": {"backend": "Python", "database": "MySQL", "hosting": "AWS"}}
+
+
+def _generate(tmp_path, name, seed):
+    path = str(tmp_path / name)
+    generate_billing_local(num_records=60, months=3, seed=seed, output_path=path, profile=PROFILE)
+    with gzip.open(path, "rt", encoding="utf-8") if path.endswith(".gz") else open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f] if ".jsonl" in path else json.load(f)
+
+
+def test_same_seed_same_records_in_every_format(tmp_path):
+    records = _generate(tmp_path, "a.json", 7)
+    assert len(records) == 60
+    assert {record["month"] for record in records} == {"2025-01", "2025-02", "2025-03"}
+    assert _generate(tmp_path, "b.jsonl.gz", 7) == records
+    assert _generate(tmp_path, "c.json", 8) != records
+
+
+def test_resources_depend_only_on_seed_and_index():
+    services, cum_weights = ["EC2", "S3", "RDS"], [1, 2, 3]
+    first = [_resource(42, index, services, cum_weights) for index in range(50)]
+    assert [_resource(42, index, services, cum_weights) for index in reversed(range(50))] == first[::-1]
+    assert _resource(43, 0, services, cum_weights) != first[0]
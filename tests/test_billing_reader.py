@@ -0,0 +1,44 @@
+import io
+import json
+
+import pytest
+
+from src import billing_reader
+from src.billing_reader import _iter_json_array
+
+RECORDS = [{"resource_id": "i-1", "desc": "on-demand, \"t3\" [large]", "cost_inr": -1.5e3, "spot": True},
+           {"resource_id": "i-2", "desc": None, "cost_inr": 0, "tags": {"team": "a,b"}, "spot": False},
+           [1, 2.25, "}"]]
+
+
+class CountingReader(io.StringIO):
+    def __init__(self, text):
+        super().__init__(text)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+@pytest.mark.parametrize("block", [1, 2, 3, 5, 7, 64])
+def test_elements_split_at_any_block_boundary(monkeypatch, block):
+    monkeypatch.setattr(billing_reader, "READ_BLOCK_CHARS", block)
+    text = json.dumps(RECORDS, indent=1)
+    assert list(_iter_json_array(io.StringIO(text))) == RECORDS
+
+
+@pytest.mark.parametrize("bad", ['{"cost_inr": 1 "unit": "Hrs"}', '{"cost_inr": }', '{"cost_inr": 1,}', "[1,,2]"])
+def test_malformed_element_fails_without_reading_to_eof(monkeypatch, bad):
+    monkeypatch.setattr(billing_reader, "READ_BLOCK_CHARS", 100)
+    good = json.dumps(RECORDS[0])
+    f = CountingReader("[" + good + ", " + bad + ", " + ", ".join([good] * 1000) + "]")
+    with pytest.raises(ValueError):
+        list(_iter_json_array(f))
+    assert f.reads <= 3
+
+
+@pytest.mark.parametrize("text", ['[{"cost_inr": 1}, {"cost_in', '[{"cost_inr": 1}, tru', "[1, 2"])
+def test_truncated_array(text):
+    with pytest.raises(ValueError):
+        list(_iter_json_array(io.StringIO(text)))
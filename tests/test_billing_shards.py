@@ -0,0 +1,135 @@
+import gzip
+import json
+import os
+import random
+
+import pytest
+
+from src import billing_shards
+from src.anomaly_detector import AnomalyDetector
+from src.billing_columns import CostAggregator, TopRecords, TopResources
+from src.billing_generator import generate_billing_local
+from src.cost_analyzer import aggregate_billing, aggregate_billing_files
+from src.price_catalog import ScenarioSimulator, load_catalog
+from src.recommendation_rules import RuleEngine
+
+PROFILE = {"name": "Shard Test", "budget_inr_per_month": 50000,
+           "tech_stack": {"backend": "Node.js", "database": "PostgreSQL", "hosting": "AWS"}}
+
+
+@pytest.fixture(scope="module")
+def exports(tmp_path_factory):
+    """Three monthly exports: two JSON Lines files and one gzipped."""
+    root = tmp_path_factory.mktemp("exports")
+    paths = []
+    for i, name in enumerate(("2025-01.jsonl", "2025-02.jsonl.gz", "2025-03.jsonl")):
+        path = str(root / name)
+        generate_billing_local(num_records=400, months=1, seed=7, output_path=path,
+                               start_month=f"2025-0{i + 1}", profile=PROFILE)
+        paths.append(path)
+    return paths
+
+
+def _consumers():
+    return RuleEngine(), TopRecords(10), TopResources(10), AnomalyDetector(), ScenarioSimulator()
+
+
+def _results(aggregator, rules, top_records, top_resources, anomalies, simulator):
+    return {
+        "rows": aggregator.rows,
+        "total_paise": aggregator.total_paise,
+        "group_paise": aggregator.group_paise,
+        "month_service_paise": aggregator.month_service_paise,
+        "recommendations": rules.recommendations(),
+        "top_records": top_records.records(),
+        "top_resources": top_resources.top(),
+        "what_if": [(r["name"], r["total_cost"]) for r in simulator.simulate(load_catalog())],
+        "anomalies": anomalies.report(),
+    }
+
+
+def _aggregate(paths, workers):
+    rules, top_records, top_resources, anomalies, simulator = consumers = _consumers()
+    aggregator = aggregate_billing_files(paths, rules, top_records, anomalies, simulator, workers=workers,
+                                         top_resources=top_resources)
+    return _results(aggregator, *consumers)
+
+
+def test_cost_aggregator_merge_matches_a_single_pass(exports):
+    whole, merged = CostAggregator(), CostAggregator()
+    for path in exports:
+        part = aggregate_billing(path)
+        merged.merge(part)
+        aggregate_billing(path, consumers=[whole])
+
+    for aggregator in (whole, merged):
+        assert aggregator.rows == 1200
+    assert merged.total_paise == whole.total_paise
+    assert merged.group_paise == whole.group_paise
+    assert merged.month_service_paise == whole.month_service_paise
+    assert merged.total_cost() == whole.total_cost()
+
+
+def test_one_worker_matches_a_process_pool(exports, monkeypatch):
+    serial = _aggregate(exports, workers=1)
+
+    monkeypatch.setattr(os, "cpu_count", lambda: 3)
+    monkeypatch.setattr(billing_shards, "BILLING_PARALLEL_MIN_BYTES", 0)
+    assert billing_shards.shard_workers(exports, 3) == 3
+    pooled = _aggregate(exports, workers=3)
+
+    assert json.dumps(pooled, sort_keys=True) == json.dumps(serial, sort_keys=True)
+
+
+def test_small_inputs_and_few_cpus_use_one_process(exports, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    assert billing_shards.shard_workers(exports, 8) == 1
+
+    monkeypatch.setattr(billing_shards, "BILLING_PARALLEL_MIN_BYTES", 0)
+    assert billing_shards.shard_workers(exports, 8) == 3
+    assert billing_shards.shard_workers(exports[:1], 8) == 1
+
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    assert billing_shards.shard_workers(exports, 8) == 2
+
+
+def test_gzipped_files_count_at_their_estimated_size(exports):
+    gz = [path for path in exports if path.endswith(".gz")]
+    assert billing_shards.input_bytes(gz) == os.path.getsize(gz[0]) * billing_shards.GZIP_SIZE_FACTOR
+
+
+@pytest.fixture(scope="module")
+def shuffled_exports(tmp_path_factory):
+    """Six months of billing shuffled across three files, plus all of it in one file in the same order."""
+    root = tmp_path_factory.mktemp("shuffled")
+    source = str(root / "source.jsonl")
+    generate_billing_local(num_records=1200, months=6, seed=11, output_path=source, profile=PROFILE)
+    with open(source, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    # A few spikes, so anomalies are found in months read out of order
+    for record in records[::97]:
+        record["cost_inr"] = round(record["cost_inr"] * 9, 2)
+        record["usage_quantity"] = round(record["usage_quantity"] * 7.3, 2)
+    random.Random(5).shuffle(records)
+
+    paths = [str(root / "a.jsonl"), str(root / "b.jsonl.gz"), str(root / "c.jsonl")]
+    parts = [records[:500], records[500:700], records[700:]]
+    for path, part in zip(paths, parts):
+        with (gzip.open(path, "wt", encoding="utf-8") if path.endswith(".gz") else open(path, "w", encoding="utf-8")) as f:
+            f.writelines(json.dumps(record) + "\n" for record in part)
+    combined = str(root / "all.jsonl")
+    with open(combined, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(record) + "\n" for part in parts for record in part)
+    return paths, combined
+
+
+def test_sharded_matches_one_pass_over_shuffled_files(shuffled_exports, monkeypatch):
+    paths, combined = shuffled_exports
+    consumers = _consumers()
+    single = _results(aggregate_billing(combined, consumers=consumers), *consumers)
+    assert single["anomalies"]["count"] > 0
+
+    assert _aggregate(paths, workers=1) == single
+    monkeypatch.setattr(os, "cpu_count", lambda: 3)
+    monkeypatch.setattr(billing_shards, "BILLING_PARALLEL_MIN_BYTES", 0)
+    assert _aggregate(paths, workers=3) == single
@@ -0,0 +1,126 @@
+import io
+import json
+
+import pytest
+
+from src.cli import main
+from src.report_history import record_run
+
+
+def _report(project, total):
+    return {"project_name": project,
+            "analysis": {"total_monthly_cost": total, "budget_variance": total - 1000, "service_costs": {"EC2": total}},
+            "summary": {"total_potential_savings": 0}, "recommendations": []}
+
+
+@pytest.fixture
+def history_dir(tmp_path):
+    data_dir = tmp_path / "history"
+    path = str(data_dir / "report_history.db")
+    record_run(path, _report("Shop", 1200), "2025-01-01T00:00:00Z")
+    record_run(path, _report("Blog", 300), "2025-01-02T00:00:00Z")
+    record_run(path, _report("Shop", 1100), "2025-01-03T00:00:00Z")
+    return str(data_dir)
+
+
+def _json(capsys, argv):
+    assert main(argv) == 0
+    return json.loads(capsys.readouterr().out)
+
+
+@pytest.mark.parametrize("argv", [
+    ["history", "--data-dir", "{dir}", "--json"],
+    ["history", "--data-dir", "{dir}", "list", "--json"],
+    ["history", "list", "--data-dir", "{dir}", "--json"],
+    ["history", "--json", "--data-dir", "{dir}", "list", "--limit", "20"],
+])
+def test_history_options_before_or_after_the_action(capsys, history_dir, argv):
+    runs = _json(capsys, [arg.format(dir=history_dir) for arg in argv])
+    assert [run["project"] for run in runs] == ["Shop", "Blog", "Shop"]
+
+
+def test_history_project_and_limit(capsys, history_dir):
+    runs = _json(capsys, ["history", "--data-dir", history_dir, "--project", "Shop", "--limit", "1", "--json"])
+    assert [(run["project"], run["total_cost"]) for run in runs] == [("Shop", 1100)]
+
+    diff = _json(capsys, ["history", "--data-dir", history_dir, "--project", "Shop", "diff", "--json"])
+    assert diff["total_monthly_cost"]["delta"] == -100
+
+
+def test_history_without_a_database(capsys, tmp_path):
+    assert main(["history", "--data-dir", str(tmp_path)]) == 1
+    assert "Run 'analyze' first" in capsys.readouterr().err
+
+
+def _line(resource_id, service, usage_type, unit, quantity, cost):
+    return {"month": "2025-01", "service": service, "resource_id": resource_id, "region": "ap-south-1",
+            "usage_type": usage_type, "usage_quantity": quantity, "unit": unit, "cost_inr": cost, "desc": None}
+
+
+@pytest.fixture
+def project(tmp_path):
+    """A data dir with a billing file and a report, as left by `analyze`."""
+    data_dir = tmp_path / "project"
+    data_dir.mkdir()
+    billing = [_line("i-1", "EC2", "BoxUsage:t3.large", "Hrs", 720, 6000),
+               _line("i-2", "EC2", "BoxUsage:t3.large", "Hrs", 300, 2500),
+               _line("bucket", "S3", "TimedStorage-ByteHrs", "GB-Mo", 500, 1500)]
+    (data_dir / "mock_billing.json").write_text(json.dumps(billing), encoding="utf-8")
+    report = _report("Shop", 10000)
+    report["analysis"].update(budget=8000, service_costs={"EC2": 8500, "S3": 1500})
+    report["recommendations"] = [
+        {"title": "Buy reserved capacity", "service": "EC2", "potential_savings": 1800,
+         "implementation_effort": "medium", "risk_level": "low"},
+        {"title": "Use Spot for batch", "service": "EC2", "potential_savings": 1500,
+         "implementation_effort": "low", "risk_level": "high"},
+        {"title": "Lifecycle rules", "service": "S3", "potential_savings": 600,
+         "implementation_effort": "low", "risk_level": "low"},
+    ]
+    (data_dir / "cost_optimization_report.json").write_text(json.dumps(report), encoding="utf-8")
+    return str(data_dir)
+
+
+def test_describe_from_text_file_or_stdin(capsys, monkeypatch, tmp_path):
+    data_dir = str(tmp_path / "d")
+    assert _json(capsys, ["describe", "--data-dir", data_dir, "--text", " A shop ", "--json"])["chars"] == 6
+    source = tmp_path / "description.txt"
+    source.write_text("From a file", encoding="utf-8")
+    assert main(["describe", "--data-dir", data_dir, "--file", str(source)]) == 0
+    assert (tmp_path / "d" / "project_description.txt").read_text(encoding="utf-8") == "From a file"
+
+    monkeypatch.setattr("sys.stdin", io.StringIO("   "))
+    assert main(["describe", "--data-dir", data_dir]) == 1
+    assert "cannot be empty" in capsys.readouterr().err
+
+
+def test_json_output_is_the_only_thing_on_stdout(capsys, project):
+    report = _json(capsys, ["view", "--data-dir", project, "--json"])
+    assert report["project_name"] == "Shop"
+
+    assert main(["view", "--data-dir", project]) == 0
+    assert "Buy reserved capacity" in capsys.readouterr().out
+
+
+def test_optimize_picks_and_saves_a_portfolio(capsys, project):
+    portfolio = _json(capsys, ["optimize", "--data-dir", project, "--max-risk", "medium", "--save", "--json"])
+    # Spot is too risky, so reserved capacity plus lifecycle rules cover the ₹2000 over budget
+    assert portfolio["selected"] == [0, 2] and portfolio["excluded"] == 1
+    assert portfolio["meets_budget"]
+    with open(f"{project}/cost_optimization_report.json", encoding="utf-8") as f:
+        assert json.load(f)["portfolio"] == portfolio
+
+
+def test_query_indexes_and_drills_down(capsys, project):
+    rows = _json(capsys, ["query", "--data-dir", project, "--service", "EC2", "--json"])
+    assert [(row["resource_id"], row["cost_inr"]) for row in rows] == [("i-1", 6000), ("i-2", 2500)]
+
+    assert main(["query", "--data-dir", project, "--group-by", "service"]) == 0
+    out = capsys.readouterr().out
+    assert "EC2" in out and "S3" in out
+    assert main(["query", "--data-dir", project, "--group-by", "service", "--min-usage", "1"]) == 1
+
+
+def test_whatif_lists_the_cheapest_scenarios(capsys, project):
+    results = _json(capsys, ["whatif", "--data-dir", project, "--limit", "3", "--json"])
+    assert len(results) == 3
+    assert [r["total_cost"] for r in results] == sorted(r["total_cost"] for r in results)
@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+from src.cost_index import _resource_keys, connect, index_file, query_index, update_index
+
+
+def _line(resource_id, usage_type, unit, quantity, cost, month="2025-01", service="EC2"):
+    return {"month": month, "service": service, "resource_id": resource_id, "region": "ap-south-1",
+            "usage_type": usage_type, "usage_quantity": quantity, "unit": unit, "cost_inr": cost, "desc": None}
+
+
+def _write(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    return str(path)
+
+
+JAN = [_line("i-1", "BoxUsage", "Hrs", 720, 6000.5), _line("i-1", "EBS:VolumeUsage", "GB-Mo", 100, 800),
+       _line("i-2", "BoxUsage", "Hrs", 100, 900), _line("fn", "Request", "Requests", 2_000_000, 40,
+                                                        service="Lambda")]
+FEB = [_line("i-1", "BoxUsage", "Hrs", 700, 5800, month="2025-02"),
+       _line("i-3", "BoxUsage", "Hrs", 720, 6000, month="2025-02")]
+
+
+@pytest.fixture
+def index(tmp_path):
+    paths = [_write(tmp_path / "jan.jsonl", JAN), _write(tmp_path / "feb.jsonl", FEB)]
+    index_path = str(tmp_path / "cost_index.db")
+    update_index(paths, index_path)
+    return index_path, paths
+
+
+def test_resources_are_totalled_per_unit(index):
+    index_path, _ = index
+    rows = query_index(index_path, service="EC2", limit=None)
+    assert [(row["resource_id"], row["unit"], row["cost_inr"], row["usage_quantity"]) for row in rows] == [
+        ("i-1", "Hrs", 11800.5, 1420), ("i-3", "Hrs", 6000, 720), ("i-2", "Hrs", 900, 100),
+        ("i-1", "GB-Mo", 800, 100)]
+    # The running totals agree with grouping the monthly rows
+    assert rows == query_index(index_path, service="EC2", month=None, usage_type=None, limit=None)
+    assert query_index(index_path, service="EC2", min_usage=1000) == [rows[0]]
+
+
+def test_min_usage_needs_a_unit(index):
+    index_path, _ = index
+    (month,) = query_index(index_path, group_by="month", month="2025-02")
+    assert (month["cost_inr"], month["usage_quantity"]) == (11800, None)
+    with pytest.raises(ValueError, match="min_usage"):
+        query_index(index_path, group_by="service", min_usage=1)
+
+
+def test_changed_file_replaces_its_rows(index):
+    index_path, (jan, feb) = index
+    _write(jan, JAN[:1])
+    os.utime(jan, ns=(0, 0))
+    assert update_index([jan, feb], index_path) == {"indexed": 1, "unchanged": 1, "rows": 1}
+    assert [(row["resource_id"], row["unit"]) for row in query_index(index_path, limit=None)] == [
+        ("i-1", "Hrs"), ("i-3", "Hrs")]
+    assert query_index(index_path, group_by="service") == [
+        {"service": "EC2", "cost_inr": 17800.5, "usage_quantity": None, "line_items": 3}]
+
+
+def test_keys_come_from_sqlite_not_the_cache(tmp_path, index):
+    index_path, _ = index
+    conn = connect(index_path)
+    try:
+        cache = _resource_keys(conn)
+        # Another writer adds a resource, and a key below the maximum goes away
+        with conn:
+            conn.execute("INSERT INTO resources (resource_id, service, region, usage_type, unit) "
+                         "VALUES ('i-9', 'EC2', 'ap-south-1', 'BoxUsage', 'Hrs')")
+            conn.execute("DELETE FROM resources WHERE resource_id = 'fn'")
+        march = [_line("i-9", "BoxUsage", "Hrs", 10, 90, month="2025-03"),
+                 _line("i-4", "BoxUsage", "Hrs", 10, 80, month="2025-03")]
+        index_file(conn, _write(tmp_path / "mar.jsonl", march), cache)
+        keys = _resource_keys(conn)
+        assert keys.items() <= cache.items()
+        assert len(set(keys.values())) == len(keys) == 6
+    finally:
+        conn.close()
+    rows = query_index(index_path, group_by="resource_month", month="2025-03")
+    assert [(row["resource_id"], row["cost_inr"]) for row in rows] == [("i-9", 90), ("i-4", 80)]
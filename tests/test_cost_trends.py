@@ -0,0 +1,64 @@
+import json
+import os
+
+from src.billing_columns import CostAggregator
+from src.cost_analyzer import billing_analysis
+from src.cost_trends import merged_month_service_paise, update_history
+
+
+def _row(month, cost, service="EC2"):
+    return {"month": month, "service": service, "resource_id": "i-1", "region": "ap-south-1",
+            "usage_type": "BoxUsage", "usage_quantity": 1, "unit": "Hrs", "cost_inr": cost}
+
+
+def _write(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+    return str(path)
+
+
+def test_budget_is_compared_with_latest_month():
+    aggregator = CostAggregator()
+    aggregator.add_records([_row("2025-01", 100), _row("2025-02", 200), _row("2025-03", 60)])
+    analysis = billing_analysis(aggregator, 150)
+    assert analysis["latest_month"] == "2025-03"
+    assert analysis["total_monthly_cost"] == 60
+    assert analysis["total_cost"] == 360
+    assert analysis["average_monthly_cost"] == 120
+    assert analysis["budget_variance"] == -90
+    assert analysis["is_over_budget"] is False
+
+
+def test_reexported_month_replaces_instead_of_adding(tmp_path):
+    state = str(tmp_path / "history.json")
+    first = _write(tmp_path / "a.jsonl", [_row("2025-01", 100), _row("2025-02", 200)])
+    second = _write(tmp_path / "b.jsonl", [_row("2025-02", 250), _row("2025-03", 300)])
+    update_history([first], state)
+    history = update_history([second], state)
+    assert merged_month_service_paise(history) == {
+        "2025-01": {"EC2": 10000}, "2025-02": {"EC2": 25000}, "2025-03": {"EC2": 30000}}
+
+
+def test_files_analysed_together_all_count(tmp_path):
+    state = str(tmp_path / "history.json")
+    paths = [_write(tmp_path / f"acct{i}.jsonl", [_row("2025-01", 100)]) for i in range(3)]
+    history = update_history(paths, state)
+    assert merged_month_service_paise(history) == {"2025-01": {"EC2": 30000}}
+
+
+def test_rerecorded_file_replaces_its_totals_and_missing_files_are_pruned(tmp_path):
+    state = str(tmp_path / "history.json")
+    first = _write(tmp_path / "a.jsonl", [_row("2025-01", 100)])
+    second = _write(tmp_path / "b.jsonl", [_row("2025-02", 100)])
+    update_history([first, second], state)
+
+    _write(first, [_row("2025-01", 40)])
+    os.utime(first, ns=(1, 1))
+    history = update_history([first, second], state)
+    assert merged_month_service_paise(history) == {"2025-01": {"EC2": 4000}, "2025-02": {"EC2": 10000}}
+
+    os.remove(second)
+    history = update_history([first], state)
+    assert merged_month_service_paise(history) == {"2025-01": {"EC2": 4000}}
+    assert list(history["sources"]) == [os.path.abspath(first)]
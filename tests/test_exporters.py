@@ -0,0 +1,99 @@
+import csv
+import json
+
+import pytest
+
+from src import exporters
+from src.exporters import Exporter, export_reports, register_exporter
+
+
+def _report(project, recs, services):
+    total = sum(services.values())
+    return {"project_name": project,
+            "analysis": {"total_monthly_cost": total, "budget": 1000, "budget_variance": total - 1000,
+                         "is_over_budget": total > 1000, "service_costs": services},
+            "summary": {"total_potential_savings": sum(r["potential_savings"] for r in recs)},
+            "recommendations": recs}
+
+
+def _rec(title, service, savings, **extra):
+    return {"title": title, "service": service, "current_cost": 500, "potential_savings": savings,
+            "steps": ["one", "two"], "cloud_providers": ["AWS", "GCP"], **extra}
+
+
+SHOP = _report("Shop <A|B>", [_rec("Use <Spot> | save", "EC2", 200), _rec("Lifecycle", "S3", 50, source="rules")],
+               {"EC2": 900, "S3": 300})
+BLOG = _report("Blog", [], {"Lambda": 40})
+
+
+@pytest.fixture
+def shop_path(tmp_path):
+    path = tmp_path / "shop.json"
+    path.write_text(json.dumps(SHOP), encoding="utf-8")
+    return str(path)
+
+
+def test_every_format_in_one_pass(tmp_path, shop_path):
+    base = str(tmp_path / "out" / "report")
+    written = export_reports([shop_path, BLOG], base, ["txt", "csv", "md", "html"])
+    assert written == [f"{base}.txt", f"{base}_recommendations.csv", f"{base}_service_costs.csv",
+                       f"{base}.md", f"{base}.html"]
+
+    text = open(f"{base}.txt", encoding="utf-8").read()
+    assert text.count("COST OPTIMIZATION REPORT") == 2 and "Project: Blog" in text
+
+    with open(f"{base}_recommendations.csv", encoding="utf-8", newline="") as f:
+        recs = list(csv.DictReader(f))
+    assert [(r["project"], r["rank"], r["source"], r["steps"]) for r in recs] == [
+        ("Shop <A|B>", "1", "llm", "one | two"), ("Shop <A|B>", "2", "rules", "one | two")]
+    with open(f"{base}_service_costs.csv", encoding="utf-8", newline="") as f:
+        costs = list(csv.DictReader(f))
+    assert [(r["project"], r["service"], r["share_pct"]) for r in costs] == [
+        ("Shop <A|B>", "EC2", "75.0"), ("Shop <A|B>", "S3", "25.0"), ("Blog", "Lambda", "100.0")]
+
+    markdown = open(f"{base}.md", encoding="utf-8").read()
+    assert "## Shop <A\\|B>" in markdown and "| Use <Spot> \\| save | EC2 |" in markdown
+
+    page = open(f"{base}.html", encoding="utf-8").read()
+    assert "<h2>Shop &lt;A|B&gt;</h2>" in page and "Use &lt;Spot&gt; | save" in page
+    assert page.rstrip().endswith("</html>")
+
+
+def test_columnar_row_groups_without_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setattr(exporters, "ROW_GROUP_SIZE", 3)
+    base = str(tmp_path / "report")
+    many = [_report(f"P{n}", [_rec(f"R{n}", "EC2", n)], {"EC2": 100}) for n in range(7)]
+    written = export_reports(many, base, ["columnar"])
+    if written[0].endswith(".parquet"):
+        pytest.skip("pyarrow installed: Parquet is written instead")
+    with open(f"{base}_recommendations.columns.jsonl", encoding="utf-8") as f:
+        groups = [json.loads(line) for line in f]
+    assert [len(group["title"]) for group in groups] == [3, 3, 1]
+    assert [title for group in groups for title in group["title"]] == [f"R{n}" for n in range(7)]
+
+
+def test_reports_are_read_one_at_a_time(tmp_path):
+    seen = []
+
+    class Recorder(Exporter):
+        def write_report(self, report):
+            seen.append(report["project_name"])
+
+    def reports():
+        for n in range(3):
+            # The previous report was exported before the next one is produced
+            assert seen == [f"P{i}" for i in range(n)]
+            yield _report(f"P{n}", [], {})
+
+    register_exporter("recorder", Recorder)
+    try:
+        assert export_reports(reports(), str(tmp_path / "x"), ["recorder"]) == []
+    finally:
+        del exporters.EXPORTERS["recorder"]
+    assert seen == ["P0", "P1", "P2"]
+
+
+def test_unknown_format_writes_nothing(tmp_path):
+    with pytest.raises(ValueError, match="Unknown export format"):
+        export_reports([BLOG], str(tmp_path / "report"), ["txt", "pdf"])
+    assert list(tmp_path.iterdir()) == []
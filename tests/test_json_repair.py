@@ -0,0 +1,63 @@
+import pytest
+
+from src.json_repair import extract_json_value, JSONExtractionError
+
+
+def test_plain_object():
+    assert extract_json_value('{"a": 1}') == ({"a": 1}, [])
+
+
+def test_code_fence_and_trailing_commas():
+    text = 'Here you go:\n```json\n{"items": [1, 2,], "b": {"c": 3,},}\n```\nThanks'
+    value, repairs = extract_json_value(text)
+    assert value == {"items": [1, 2], "b": {"c": 3}}
+    assert repairs == ["code_fence", "trailing_comma"]
+
+
+def test_bracketed_prose_is_skipped():
+    value, repairs = extract_json_value('Note {see below} then {"a": [1]}')
+    assert value == {"a": [1]}
+    assert "prose_skipped" in repairs
+
+
+def test_brackets_inside_strings_are_ignored():
+    value, _ = extract_json_value('{"title": "use [spot] {now}", "n": 1}')
+    assert value == {"title": "use [spot] {now}", "n": 1}
+
+
+def test_array_extraction_ignores_trailing_text():
+    value, repairs = extract_json_value('[{"x": 1}] and [2]', return_array=True)
+    assert value == [{"x": 1}]
+    assert repairs == []
+
+
+def test_truncated_value_is_cut_back_to_last_complete_element():
+    text = '{"recommendations": [{"title": "x"}, {"title": "y", "steps": ["a"'
+    value, repairs = extract_json_value(text)
+    assert value == {"recommendations": [{"title": "x"}]}
+    assert repairs == ["truncated"]
+
+
+def test_truncated_inside_first_element_asks_for_continuation():
+    text = '{"recommendations":[{"title":"x","steps":["a"'
+    with pytest.raises(JSONExtractionError) as excinfo:
+        extract_json_value(text)
+    assert excinfo.value.truncated
+    assert excinfo.value.partial == text
+
+
+def test_truncated_object_without_array_asks_for_continuation():
+    with pytest.raises(JSONExtractionError) as excinfo:
+        extract_json_value('{"name": "app", "budget": 10')
+    assert excinfo.value.truncated
+
+
+def test_mismatched_brackets_fail():
+    with pytest.raises(JSONExtractionError) as excinfo:
+        extract_json_value('{"a": [1}')
+    assert not excinfo.value.truncated
+
+
+def test_no_json():
+    with pytest.raises(JSONExtractionError):
+        extract_json_value("no json here")
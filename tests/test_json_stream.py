@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from src import json_stream
+from src.json_stream import ArrayItemParser
+
+ITEMS = [{"title": "Use [Spot], not \"on-demand\"", "tags": ["a", "b"], "nested": {"x": [1, {"y": 2}]}},
+         3.5, "plain, string", [], None]
+
+
+def _parse(chunks):
+    parser = ArrayItemParser()
+    items = [item for chunk in chunks for item in parser.feed(chunk)]
+    return parser, items
+
+
+@pytest.mark.parametrize("text", [json.dumps(ITEMS), json.dumps({"note": "x[y", "recommendations": ITEMS}, indent=2)])
+def test_items_are_the_same_for_any_chunking(text):
+    for size in (1, 2, 3, 7, len(text)):
+        parser, items = _parse(text[i:i + size] for i in range(0, len(text), size))
+        assert items == ITEMS
+        assert parser.done and parser.items_parsed == len(ITEMS)
+
+
+def test_each_item_is_yielded_as_soon_as_it_closes():
+    parser = ArrayItemParser()
+    assert parser.feed('[{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(': 2}') == [{"b": 2}]
+    assert not parser.done
+    assert parser.feed("]  trailing text [9]") == []
+    assert parser.done
+
+
+def test_malformed_element_raises():
+    with pytest.raises(ValueError, match="Malformed JSON element"):
+        _parse(['[{"a": 1,}]'])
+
+
+def test_no_array_within_the_preamble_limit(monkeypatch):
+    monkeypatch.setattr(json_stream, "MAX_PREAMBLE_CHARS", 10)
+    with pytest.raises(ValueError, match="No JSON array"):
+        _parse(["Sure! Here is the data you asked for: [1]"])
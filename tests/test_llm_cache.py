@@ -0,0 +1,124 @@
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from src import llm_cache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(llm_cache, "_disk", {"bytes": None, "writes": 0})
+    llm_cache.clear_cache()
+    yield tmp_path
+    llm_cache.clear_cache()
+
+
+def _age_entry(key, seconds):
+    """Rewrite key's stored created time as `seconds` ago (the file's mtime stays now)."""
+    path = llm_cache._entry_path(key)
+    with open(path, "r", encoding="utf-8") as f:
+        entry = json.load(f)
+    entry["created"] -= seconds
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+
+
+def test_hits_do_not_extend_the_ttl(monkeypatch):
+    monkeypatch.setattr(llm_cache, "CACHE_MAX_AGE", 60)
+    llm_cache.cache_put("k", {"v": 1})
+    assert llm_cache.cache_get("k") == {"v": 1}
+
+    # Memory tier: created is kept, so the entry expires despite the hit above
+    created, text = llm_cache._memory["k"]
+    llm_cache._memory["k"] = (created - 120, text)
+    _age_entry("k", 120)
+    assert llm_cache.cache_get("k") is None
+    assert not os.path.exists(llm_cache._entry_path("k"))
+
+
+def test_disk_ttl_reads_created_not_mtime(monkeypatch):
+    monkeypatch.setattr(llm_cache, "CACHE_MAX_AGE", 60)
+    monkeypatch.setattr(llm_cache, "CACHE_MEMORY_ENTRIES", 0)
+    llm_cache.cache_put("k", [1, 2])
+    _age_entry("k", 120)
+    os.utime(llm_cache._entry_path("k"), None)
+    assert llm_cache.cache_get("k") is None
+
+
+def test_size_eviction_drops_least_recently_used(cache_dir, monkeypatch):
+    monkeypatch.setattr(llm_cache, "CACHE_MEMORY_ENTRIES", 0)
+    now = time.time()
+    for i, key in enumerate(("a", "b", "c")):
+        llm_cache.cache_put(key, "x" * 100)
+        os.utime(llm_cache._entry_path(key), (now - 300 + i, now - 300 + i))
+    # Reading "a" makes it the most recently used entry
+    assert llm_cache.cache_get("a") == "x" * 100
+
+    kept = sum(os.path.getsize(llm_cache._entry_path(key)) for key in ("a", "c"))
+    monkeypatch.setattr(llm_cache, "CACHE_MAX_BYTES", kept)
+    assert llm_cache.evict() == 1
+    assert sorted(os.listdir(cache_dir)) == ["a.json", "c.json"]
+
+
+def test_evict_runs_on_interval_or_over_size(monkeypatch):
+    scans = []
+    evict = llm_cache.evict
+    monkeypatch.setattr(llm_cache, "evict", lambda: scans.append(1) or evict())
+    monkeypatch.setattr(llm_cache, "CACHE_EVICT_INTERVAL", 5)
+
+    for i in range(11):
+        llm_cache.cache_put(f"k{i}", i)
+    # First write (size unknown), then every 5th write
+    assert len(scans) == 3
+
+    monkeypatch.setattr(llm_cache, "CACHE_MAX_BYTES", 1)
+    llm_cache.cache_put("big", "x" * 100)
+    assert len(scans) == 4
+
+
+def test_concurrent_puts_of_one_key(cache_dir):
+    errors = []
+
+    def put(n):
+        try:
+            for _ in range(20):
+                llm_cache.cache_put("shared", n)
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=put, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert os.listdir(cache_dir) == ["shared.json"]
+    assert llm_cache.cache_get("shared") in range(8)
+
+
+def test_stats_are_exact_under_threads(monkeypatch):
+    monkeypatch.setattr(llm_cache, "CACHE_STATS", dict.fromkeys(llm_cache.CACHE_STATS, 0))
+    interval = sys.getswitchinterval()
+    # Switch threads as often as possible so unguarded `+=` updates get lost
+    sys.setswitchinterval(1e-6)
+    llm_cache.cache_put("k", {"v": 1})
+
+    def work():
+        for _ in range(2000):
+            llm_cache.cache_get("k")
+            llm_cache.cache_get("missing")
+
+    try:
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert llm_cache.CACHE_STATS == {"hits": 16000, "misses": 16000, "writes": 1, "evictions": 0}
@@ -0,0 +1,160 @@
+import asyncio
+import json
+
+import pytest
+
+from src import llm_cache, llm_client
+from src.json_repair import JSONExtractionError
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, body: str):
+        self.text = body
+        self.content = body.encode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def _completion(content: str) -> FakeResponse:
+    return FakeResponse(json.dumps({"choices": [{"message": {"content": content}}],
+                                    "usage": {"prompt_tokens": 5, "completion_tokens": 7}}))
+
+
+@pytest.fixture
+def replies(monkeypatch):
+    """Queue of responses returned by successive LLM requests."""
+    queue = []
+    monkeypatch.setattr(llm_client, "post_with_retry", lambda payload, **kwargs: queue.pop(0))
+    return queue
+
+
+@pytest.mark.parametrize("body", ["<html>Bad Gateway</html>", "[]", '{"choices": []}'])
+def test_malformed_completion_raises_format_error(replies, body):
+    replies.append(FakeResponse(body))
+    with pytest.raises(Exception, match="Unexpected LLM response format"):
+        llm_client.call_llm("prompt", use_cache=False)
+
+
+def test_followup_with_non_json_body_raises_format_error(replies):
+    replies.append(FakeResponse("upstream timed out"))
+    error = JSONExtractionError("cut off", partial='{"a": [1, ', truncated=True)
+    with pytest.raises(Exception, match="Unexpected LLM response format"):
+        llm_client._followup_text(error, '{"a": [1, ', 100)
+
+
+def test_unrepairable_truncation_is_continued(replies):
+    replies.extend([_completion('{"items": [{"id": '), _completion('1}]}')])
+    assert llm_client.call_llm("prompt", use_cache=False) == {"items": [{"id": 1}]}
+    assert replies == []
+
+
+@pytest.fixture
+def async_replies(monkeypatch):
+    """Queue of responses returned by successive acall_llm requests."""
+    queue = []
+
+    async def apost(payload, executor=None):
+        return queue.pop(0)
+
+    monkeypatch.setattr(llm_client, "apost_with_retry", apost)
+    return queue
+
+
+def test_acall_llm_repairs_and_continues_like_call_llm(async_replies, replies):
+    async_replies.append(_completion('```json\n{"items": [{"id": 1},]}\n```'))
+    assert asyncio.run(llm_client.acall_llm("prompt", use_cache=False)) == {"items": [{"id": 1}]}
+
+    # The follow-up request goes through _followup_text, as in call_llm
+    async_replies.append(_completion('{"items": [{"id": '))
+    replies.append(_completion('1}]}'))
+    assert asyncio.run(llm_client.acall_llm("prompt", use_cache=False)) == {"items": [{"id": 1}]}
+    assert async_replies == [] and replies == []
+
+
+def test_acall_llm_malformed_completion_raises_format_error(async_replies):
+    async_replies.append(FakeResponse("<html>Bad Gateway</html>"))
+    with pytest.raises(Exception, match="Unexpected LLM response format"):
+        asyncio.run(llm_client.acall_llm("prompt", use_cache=False))
+
+
+def test_apost_with_retry_backs_off_without_holding_a_thread(monkeypatch):
+    statuses = [503, 503, 200]
+    sleeps = []
+
+    class Session:
+        def post(self, url, **kwargs):
+            response = FakeResponse("{}")
+            response.status_code = statuses.pop(0)
+            response.close = lambda: None
+            return response
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(llm_client, "get_session", lambda: Session())
+    monkeypatch.setattr(llm_client, "_backoff_delay", lambda attempt, response=None: 0.5)
+    monkeypatch.setattr(llm_client.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(llm_client.time, "sleep", lambda delay: pytest.fail("blocking sleep"))
+
+    response = asyncio.run(llm_client.apost_with_retry({"messages": []}))
+    assert response.status_code == 200
+    assert sleeps == [0.5, 0.5]
+    assert llm_client.CALL_METRICS[-1]["retries"] == 2
+
+
+class FakeStream(FakeResponse):
+    """SSE response delivering content in the given deltas."""
+
+    def __init__(self, deltas, usage=None):
+        super().__init__("")
+        self.lines = [f"data: {json.dumps({'choices': [{'delta': {'content': delta}}]})}" for delta in deltas]
+        if usage:
+            self.lines.append(f"data: {json.dumps({'choices': [], 'usage': usage})}")
+        self.lines.append("data: [DONE]")
+        self.sent = 0
+        self.closed = False
+
+    def iter_lines(self, decode_unicode=False):
+        for line in self.lines:
+            self.sent += 1
+            yield line
+
+    def close(self):
+        self.closed = True
+
+
+def test_stream_llm_yields_items_as_they_complete(replies, monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(llm_cache, "_memory", type(llm_cache._memory)())
+    stream = FakeStream(['{"recommendations": [{"id"', ': 1}, {"id": 2', "}]}"],
+                        usage={"prompt_tokens": 3, "completion_tokens": 9})
+    replies.append(stream)
+    items = llm_client.stream_llm("prompt")
+    assert next(items) == {"id": 1}
+    assert stream.sent == 2
+    assert list(items) == [{"id": 2}]
+    assert stream.closed
+
+    # The completed stream was cached like a call_llm result and is replayed
+    assert list(llm_client.stream_llm("prompt")) == [{"id": 1}, {"id": 2}]
+    assert llm_client.call_llm("prompt") == {"recommendations": [{"id": 1}, {"id": 2}]}
+    assert replies == []
+
+
+def test_closing_stream_llm_early_closes_the_response(replies):
+    stream = FakeStream(['[{"id": 1}, ', '{"id": 2}, ', '{"id": 3}]'])
+    replies.append(stream)
+    items = llm_client.stream_llm("prompt", use_cache=False)
+    assert next(items) == {"id": 1}
+    items.close()
+    assert stream.closed and stream.sent < len(stream.lines)
+
+
+def test_stream_cut_off_before_the_array_closes(replies):
+    replies.append(FakeStream(['[{"id": 1}, {"id"']))
+    with pytest.raises(ValueError, match="ended before the JSON array was complete"):
+        list(llm_client.stream_llm("prompt", use_cache=False))
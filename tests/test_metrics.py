@@ -0,0 +1,84 @@
+import contextvars
+import json
+import re
+import threading
+
+import pytest
+
+from src import metrics
+
+
+@pytest.fixture(autouse=True)
+def records(monkeypatch):
+    monkeypatch.setattr(metrics, "STAGE_METRICS", [])
+    return metrics.STAGE_METRICS
+
+
+def test_values_go_to_the_stage_running_in_this_context(records):
+    metrics.add(llm_calls=1)  # outside a stage: dropped
+    with metrics.stage("billing"):
+        metrics.add(llm_calls=1, prompt_tokens=100)
+        # Threads started with a copy of the context report into the stage
+        thread = threading.Thread(target=contextvars.copy_context().run, args=(metrics.add,),
+                                  kwargs={"llm_calls": 2, "retries": 1})
+        thread.start()
+        thread.join()
+        with metrics.stage("validate"):
+            metrics.add(validate_s=0.25)
+    (validate, billing) = records
+    assert (billing["stage"], billing["llm_calls"], billing["retries"], billing["prompt_tokens"]) == (
+        "billing", 3, 1, 100)
+    assert validate == {"stage": "validate", "validate_s": 0.25, "wall_s": validate["wall_s"]}
+    assert billing["wall_s"] >= validate["wall_s"] > 0
+
+
+def test_timed_stage_records_failed_runs(records):
+    @metrics.timed_stage("profile")
+    def fail():
+        metrics.add(llm_calls=1)
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        fail()
+    assert [(r["stage"], r["llm_calls"]) for r in records] == [("profile", 1)]
+
+
+def _run(name, **values):
+    return {"stage": name, "wall_s": 1.0, **values}
+
+
+def test_compact_keeps_totals(records):
+    records.extend([_run("billing", llm_calls=1, wall_s=float(n)) for n in range(1, 8)] + [_run("analysis")] * 3)
+    before = metrics.summarize()
+    metrics.compact(max_records=4)
+    assert len(records) < 10
+    assert metrics.summarize() == before
+    assert before["billing"] == dict(before["billing"], runs=7, llm_calls=7, wall_s=28.0, max_wall_s=7.0)
+    # Compacting again changes nothing
+    metrics.compact(max_records=4)
+    assert metrics.summarize() == before
+
+
+def test_prometheus_text(records):
+    records.extend([_run("billing", llm_calls=2, bytes_read=1024, llm_s=0.5), _run("billing", wall_s=3.0)])
+    text = metrics.to_prometheus()
+    samples = dict(re.findall(r'^(\w+\{stage="billing"\}) (\S+)$', text, re.M))
+    assert samples['cco_stage_runs_total{stage="billing"}'] == "2"
+    assert samples['cco_stage_duration_seconds_max{stage="billing"}'] == "3.000000"
+    assert samples['cco_stage_duration_seconds_total{stage="billing"}'] == "4.000000"
+    assert samples['cco_llm_calls_total{stage="billing"}'] == "2"
+    assert samples['cco_file_bytes_read_total{stage="billing"}'] == "1024"
+    # Every metric has HELP and TYPE lines before its samples
+    for _, metric, _ in metrics.METRIC_FIELDS:
+        assert f"# TYPE {metric} counter\n{metric}{{" in text
+
+
+def test_write_metrics_picks_the_format_from_the_name(records, tmp_path):
+    records.append(_run("billing", llm_calls=1))
+    metrics.write_metrics(str(tmp_path / "m.json"))
+    metrics.write_metrics(str(tmp_path / "m.prom"))
+    with open(tmp_path / "m.json", encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["runs"] == records and data["stages"]["billing"]["llm_calls"] == 1
+    assert (tmp_path / "m.prom").read_text(encoding="utf-8") == metrics.to_prometheus()
+    assert "billing" in metrics.format_profile()
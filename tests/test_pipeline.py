@@ -0,0 +1,118 @@
+import json
+import os
+
+import pytest
+
+from src import pipeline
+
+
+@pytest.fixture
+def fake_stages(tmp_path, monkeypatch):
+    """Replace the LLM-backed stages with ones that write their output and count runs."""
+    runs = []
+
+    def write(name, filename, content):
+        runs.append(name)
+        with open(tmp_path / filename, "w", encoding="utf-8") as f:
+            json.dump(content, f)
+
+    monkeypatch.setattr(pipeline, "extract_project_profile",
+                        lambda data_dir: write("profile", "project_profile.json", {"budget_inr_per_month": 100}))
+    monkeypatch.setattr(pipeline, "generate_billing",
+                        lambda data_dir, stream=False: write("billing", "mock_billing.json", []))
+
+    def analyze_cost(data_dir, stream=False, billing_path=None, use_llm=True, workers=1):
+        write("analysis", "cost_optimization_report.json", {"use_llm": use_llm})
+
+    monkeypatch.setattr(pipeline, "analyze_cost", analyze_cost)
+    (tmp_path / "project_description.txt").write_text("A food delivery app on AWS", encoding="utf-8")
+    return runs
+
+
+def _statuses(timings):
+    return {t["stage"]: t["status"] for t in timings}
+
+
+def test_unchanged_inputs_skip_every_stage(tmp_path, fake_stages):
+    first = pipeline.run_pipeline(str(tmp_path))
+    assert _statuses(first) == {"profile": "ran", "billing": "ran", "analysis": "ran"}
+
+    second = pipeline.run_pipeline(str(tmp_path))
+    assert _statuses(second) == {"profile": "skipped", "billing": "skipped", "analysis": "skipped"}
+    assert fake_stages == ["profile", "billing", "analysis"]
+
+
+def test_edited_output_reruns_only_downstream_stages(tmp_path, fake_stages):
+    pipeline.run_pipeline(str(tmp_path))
+    (tmp_path / "project_profile.json").write_text('{"budget_inr_per_month": 200}', encoding="utf-8")
+
+    timings = pipeline.run_pipeline(str(tmp_path))
+    assert _statuses(timings) == {"profile": "skipped", "billing": "ran", "analysis": "ran"}
+
+
+def test_missing_output_and_force_rerun(tmp_path, fake_stages):
+    pipeline.run_pipeline(str(tmp_path))
+    os.remove(tmp_path / "cost_optimization_report.json")
+    assert _statuses(pipeline.run_pipeline(str(tmp_path)))["analysis"] == "ran"
+
+    forced = pipeline.run_pipeline(str(tmp_path), force=True)
+    assert set(_statuses(forced).values()) == {"ran"}
+
+
+def test_use_llm_is_part_of_the_analysis_fingerprint(tmp_path, fake_stages):
+    pipeline.run_pipeline(str(tmp_path))
+    timings = pipeline.run_pipeline(str(tmp_path), use_llm=False)
+    assert _statuses(timings) == {"profile": "skipped", "billing": "reused", "analysis": "ran"}
+    assert json.loads((tmp_path / "cost_optimization_report.json").read_text())["use_llm"] is False
+    assert _statuses(pipeline.run_pipeline(str(tmp_path), use_llm=False))["analysis"] == "skipped"
+
+    timings = pipeline.run_pipeline(str(tmp_path), use_llm=True)
+    assert _statuses(timings) == {"profile": "skipped", "billing": "skipped", "analysis": "ran"}
+    assert json.loads((tmp_path / "cost_optimization_report.json").read_text())["use_llm"] is True
+
+
+@pytest.fixture
+def offline(tmp_path, monkeypatch):
+    """A data dir with a profile but no manifest, and no HF_API_KEY."""
+    from src import llm_client
+
+    monkeypatch.setattr(llm_client, "HF_API_KEY", None)
+    monkeypatch.setattr(llm_client, "_session", None)
+    (tmp_path / "project_description.txt").write_text("A food delivery app on AWS", encoding="utf-8")
+    profile = {"name": "Food Delivery", "budget_inr_per_month": 50000, "description": "A food delivery app",
+               "tech_stack": {"backend": "Node.js", "database": "PostgreSQL", "hosting": "AWS"},
+               "non_functional_requirements": ["99.9% uptime"]}
+    (tmp_path / "project_profile.json").write_text(json.dumps(profile), encoding="utf-8")
+    return tmp_path
+
+
+def test_no_llm_runs_offline(offline):
+    timings = pipeline.run_pipeline(str(offline), use_llm=False, force=True)
+    assert _statuses(timings) == {"profile": "reused", "billing": "ran", "analysis": "ran"}
+
+    report = json.loads((offline / "cost_optimization_report.json").read_text(encoding="utf-8"))
+    assert report["analysis"]["total_monthly_cost"] > 0
+    assert all(rec["source"] == "rules" for rec in report["recommendations"])
+
+    # A stale fingerprint still reuses the existing outputs rather than calling the LLM
+    (offline / "project_description.txt").write_text("A food delivery app on GCP", encoding="utf-8")
+    timings = pipeline.run_pipeline(str(offline), use_llm=False)
+    assert _statuses(timings) == {"profile": "reused", "billing": "skipped", "analysis": "skipped"}
+
+
+def test_no_llm_without_a_profile_fails_clearly(offline):
+    os.remove(offline / "project_profile.json")
+    with pytest.raises(FileNotFoundError, match="--no-llm"):
+        pipeline.run_pipeline(str(offline), use_llm=False)
+
+
+def test_changed_billing_file_invalidates_analysis(tmp_path, fake_stages):
+    export = tmp_path / "export.jsonl"
+    export.write_text("", encoding="utf-8")
+    first = pipeline.run_pipeline(str(tmp_path), billing_files=[str(export)], workers=1)
+    assert "billing" not in _statuses(first)
+    assert _statuses(pipeline.run_pipeline(str(tmp_path), billing_files=[str(export)], workers=1))["analysis"] == "skipped"
+
+    export.write_text('{"cost_inr": 1}\n', encoding="utf-8")
+    timings = pipeline.run_pipeline(str(tmp_path), billing_files=[str(export)], workers=1)
+    assert _statuses(timings)["analysis"] == "ran"
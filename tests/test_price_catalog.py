@@ -0,0 +1,89 @@
+import pytest
+
+from src.price_catalog import ScenarioSimulator, ground_recommendations, load_catalog
+
+
+def _line(resource_id, service, usage_type, unit, quantity, cost, region="ap-south-1"):
+    return {"month": "2025-01", "service": service, "resource_id": resource_id, "region": region,
+            "usage_type": usage_type, "usage_quantity": quantity, "unit": unit, "cost_inr": cost}
+
+
+@pytest.fixture(scope="module")
+def priced():
+    catalog = load_catalog()
+    simulator = ScenarioSimulator()
+    simulator.add_records([
+        _line("i-1", "EC2", "BoxUsage:t3.large", "Hrs", 720, 6000),
+        _line("i-2", "EC2", "BoxUsage:t3.large", "Hrs", 720, 6000),
+        _line("bucket", "S3", "TimedStorage-ByteHrs", "GB-Mo", 500, 1200),
+    ])
+    return catalog, simulator.simulate(catalog)
+
+
+def _rec(title, description="", service="EC2", savings=1000.0, **extra):
+    return {"title": title, "description": description, "service": service,
+            "current_cost": 12000, "potential_savings": savings, **extra}
+
+
+def test_llm_recommendation_priced_against_the_scenario_it_names(priced):
+    catalog, results = priced
+    rec = _rec("Run batch jobs on Azure Spot VMs")
+    assert ground_recommendations([rec], results, catalog) == 1
+    assert rec["pricing_scenario"] == "Azure / same regions / spot"
+    assert rec["estimated_savings"] == 1000.0
+
+    expected = next(r for r in results if r["name"] == rec["pricing_scenario"])["service_impact"]["EC2"]
+    assert rec["potential_savings"] == round(12000 * expected["savings"] / expected["repriced_cost"], 2)
+
+
+def test_full_scenario_name_wins(priced):
+    catalog, results = priced
+    rec = _rec("Reprice", "Per the what-if, GCP / us-east-1 / reserved_1y is cheapest; GCP spot was also considered")
+    assert ground_recommendations([rec], results, catalog) == 1
+    assert rec["pricing_scenario"] == "GCP / us-east-1 / reserved_1y"
+
+
+@pytest.mark.parametrize("title", [
+    "Consolidate workloads into one region",            # no provider, region or tier named
+    "Compare Azure and GCP for compute",                 # two other providers
+    "Move EC2 from ap-south-1 to us-east-1 on Spot",     # two regions
+])
+def test_unnamed_scenario_leaves_savings_unchanged(priced, title):
+    catalog, results = priced
+    rec = _rec(title)
+    assert ground_recommendations([rec], results, catalog) == 0
+    assert rec["potential_savings"] == 1000.0
+    assert "pricing_scenario" not in rec and "estimated_savings" not in rec
+
+
+def test_rule_recommendations_are_not_regrounded(priced):
+    catalog, results = priced
+    rec = _rec("Move intermittent EC2 workloads to Spot instances", source="rules")
+    assert ground_recommendations([rec], results, catalog) == 0
+    assert rec["potential_savings"] == 1000.0
+
+
+def test_service_not_repriced_by_the_scenario(priced):
+    catalog, results = priced
+    rec = _rec("Use Azure Spot for DynamoDB", service="DynamoDB")
+    assert ground_recommendations([rec], results, catalog) == 0
+    assert rec["potential_savings"] == 1000.0
+
+
+@pytest.mark.parametrize("title", [
+    "Fix the hotspot partition in EC2 autoscaling",        # "spot" inside a word
+    "Keep preserved snapshots on EC2 for a week",          # "reserved" inside a word
+    "Cut EC2 egress to googleapis.com endpoints",          # "google" inside a word
+])
+def test_aliases_match_whole_words_only(priced, title):
+    catalog, results = priced
+    rec = _rec(title)
+    assert ground_recommendations([rec], results, catalog) == 0
+    assert "pricing_scenario" not in rec
+
+
+def test_tier_and_region_named_as_words(priced):
+    catalog, results = priced
+    rec = _rec("Buy 3-year reserved EC2 capacity in us-east-1")
+    assert ground_recommendations([rec], results, catalog) == 1
+    assert rec["pricing_scenario"] == "AWS / us-east-1 / reserved_3y"
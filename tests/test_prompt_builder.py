@@ -0,0 +1,53 @@
+import pytest
+
+from src.prompt_builder import (compact_analysis, compact_json, estimate_tokens, fit_prompt,
+                                select_billing_rows)
+
+ANALYSIS = {
+    "total_monthly_cost": 52000, "budget": 50000, "budget_variance": 2000, "is_over_budget": True,
+    "service_costs": {"EC2": 40000, "S3": 12000}, "high_cost_services": ["EC2"],
+    "usage_type_costs": {f"usage-{n}": n for n in range(40)},
+    "what_if": {"baseline_cost": 52000, "scenarios": [{"name": f"scenario {n}", "savings": n} for n in range(10)]},
+    "trends": {"forecast": {"next_month": 53000}, "service_monthly_costs": {"EC2": list(range(24))}},
+}
+ROWS = [{"resource_id": f"i-{n}", "service": "EC2", "cost_inr": 1000 - n * 10, "desc": "x" * 40} for n in range(25)]
+TOTAL_PAISE = 5_200_000
+
+
+def _render(analysis, rows):
+    return f"Analysis: {compact_json(analysis)}\nBilling: {compact_json(rows)}"
+
+
+def test_remainder_row_keeps_the_total():
+    rows = select_billing_rows(ROWS, 3, total_rows=40, total_cost_paise=TOTAL_PAISE)
+    assert [row["resource_id"] for row in rows] == ["i-0", "i-1", "i-2", "(remaining 37 records)"]
+    assert sum(round(row["cost_inr"] * 100) for row in rows) == TOTAL_PAISE
+    assert select_billing_rows(ROWS[:2], 5, total_rows=2, total_cost_paise=198_000) == ROWS[:2]
+
+
+def test_compaction_levels():
+    assert compact_analysis(ANALYSIS, 0) is ANALYSIS
+    level1 = compact_analysis(ANALYSIS, 1)
+    assert "usage_type_costs" not in level1
+    assert len(level1["what_if"]["scenarios"]) == 3
+    assert level1["trends"] == {"forecast": {"next_month": 53000}}
+    level2 = compact_analysis(ANALYSIS, 2)
+    assert set(level2) == {"total_monthly_cost", "budget", "budget_variance", "service_costs",
+                           "high_cost_services", "is_over_budget", "forecast"}
+    # The caller's analysis is never modified
+    assert len(ANALYSIS["what_if"]["scenarios"]) == 10 and "usage_type_costs" in ANALYSIS
+
+
+@pytest.mark.parametrize("budget, rows, level", [(100_000, 20, 0), (600, 20, 2), (400, 10, 1), (100, 1, 2), (70, 0, 2)])
+def test_fit_prompt_trims_analysis_before_rows(budget, rows, level):
+    prompt, stats = fit_prompt(_render, ANALYSIS, ROWS, 40, TOTAL_PAISE, token_budget=budget)
+    assert (stats["billing_rows"], stats["analysis_level"]) == (rows, level)
+    assert stats["estimated_tokens"] == estimate_tokens(prompt) <= budget
+    assert stats["chars"] == len(prompt)
+
+
+def test_smallest_prompt_when_nothing_fits():
+    prompt, stats = fit_prompt(_render, ANALYSIS, ROWS, 40, TOTAL_PAISE, token_budget=10)
+    assert (stats["billing_rows"], stats["analysis_level"]) == (0, 2)
+    assert stats["estimated_tokens"] > 10
+    assert "(remaining 40 records)" in prompt
@@ -0,0 +1,85 @@
+from src.recommendation_rules import RuleEngine
+from src.schemas import validate_recommendations
+
+
+def _line(resource_id, service, usage_type, unit, quantity, cost, month="2025-01"):
+    return {"month": month, "service": service, "resource_id": resource_id, "region": "ap-south-1",
+            "usage_type": usage_type, "usage_quantity": quantity, "unit": unit, "cost_inr": cost}
+
+
+def _by_title(recommendations):
+    return {rec["title"]: rec for rec in recommendations}
+
+
+def test_each_rule_fires_with_computed_savings():
+    engine = RuleEngine()
+    engine.add_records([
+        # Always-on, on-demand: reserved capacity (30% for EC2)
+        _line("i-steady", "EC2", "BoxUsage:t3.large", "Hrs", 730, 1000),
+        # Half the price per hour of the big one and running a third of the month: Spot (60%)
+        _line("i-batch", "EC2", "BoxUsage:t3.large", "Hrs", 200, 274),
+        # Four times the fleet's median hourly rate: right-size to the median
+        _line("i-huge", "EC2", "BoxUsage:m5.4xlarge", "Hrs", 730, 4000),
+        # About 5 hours a month: idle, the whole cost is saved
+        _line("i-idle", "EC2", "BoxUsage:t3.large", "Hrs", 5, 7),
+        # 800 GB in standard storage: storage class (40%)
+        _line("bucket", "S3", "TimedStorage-ByteHrs", "GB-Mo", 800, 500),
+        # Billed with no usage at all: idle
+        _line("eip-1", "EC2-Other", "ElasticIP:IdleAddress", "Hrs", 0, 300),
+    ])
+    recs = _by_title(engine.recommendations())
+
+    assert recs["Buy reserved capacity for always-on EC2"]["potential_savings"] == 300
+    assert recs["Move intermittent EC2 workloads to Spot instances"]["potential_savings"] == 164.4
+    right_size = recs["Right-size oversized EC2 instances"]
+    assert right_size["current_cost"] == 4000
+    assert 0 < right_size["potential_savings"] < 4000
+    assert recs["Move infrequently accessed S3 data to a cheaper storage class"]["potential_savings"] == 200
+    assert recs["Clean up idle EC2-Other resources"]["potential_savings"] == 300
+    assert recs["Clean up idle EC2 resources"]["potential_savings"] == 7
+
+    ordered = engine.recommendations()
+    savings = [rec["potential_savings"] for rec in ordered]
+    assert savings == sorted(savings, reverse=True)
+    assert all(rec["source"] == "rules" for rec in ordered)
+    validate_recommendations(ordered)
+
+
+def test_findings_group_per_rule_and_service():
+    engine = RuleEngine()
+    engine.add_records([_line(f"i-{n}", "EC2", "BoxUsage:t3.large", "Hrs", 730, 1000) for n in range(7)])
+    (rec,) = engine.recommendations()
+    assert rec["current_cost"] == 7000
+    assert rec["potential_savings"] == 2100
+    assert "i-0, i-1, i-2, i-3, i-4 and 2 more" in rec["description"]
+
+
+def test_usage_is_averaged_over_months():
+    # 600 hours over two months is 300 a month: intermittent, not always-on
+    engine = RuleEngine()
+    engine.add_records([
+        _line("i-1", "EC2", "BoxUsage:t3.large", "Hrs", 300, 500, month="2025-01"),
+        _line("i-1", "EC2", "BoxUsage:t3.large", "Hrs", 300, 500, month="2025-02"),
+    ])
+    assert [rec["title"] for rec in engine.recommendations()] == ["Move intermittent EC2 workloads to Spot instances"]
+
+
+def test_reserved_and_small_usage_are_left_alone():
+    engine = RuleEngine()
+    engine.add_records([
+        _line("i-1", "EC2", "HeavyUsage:reserved", "Hrs", 730, 700),
+        _line("bucket", "S3", "TimedStorage-ByteHrs", "GB-Mo", 100, 60),
+        _line("fn", "Lambda", "Request", "Requests", 1_000_000, 20),
+    ])
+    assert engine.recommendations() == []
+
+
+def test_merge_matches_a_single_engine():
+    records = [_line(f"i-{n % 3}", "EC2", "BoxUsage:t3.large", "Hrs", 365, 500, month=f"2025-0{n // 3 + 1}")
+               for n in range(6)]
+    single, first, second = RuleEngine(), RuleEngine(), RuleEngine()
+    single.add_records(records)
+    first.add_records(records[:3])
+    second.add_records(records[3:])
+    first.merge(second)
+    assert first.recommendations() == single.recommendations()
@@ -0,0 +1,92 @@
+import sqlite3
+
+import pytest
+
+from src.report_history import (HISTORY_DB_VERSION, connect, diff_reports, diff_runs, get_run, list_runs,
+                                previous_run, record_run, resolve_run)
+
+
+def _report(project, total, services, recs):
+    return {
+        "project_name": project,
+        "analysis": {"total_monthly_cost": total, "budget_variance": total - 50000, "service_costs": services},
+        "summary": {"total_potential_savings": sum(rec["potential_savings"] for rec in recs)},
+        "recommendations": recs,
+    }
+
+
+def _rec(title, service, savings):
+    return {"title": title, "service": service, "potential_savings": savings}
+
+
+OLD = _report("Shop", 60000, {"EC2": 40000, "S3": 15000, "CloudFront": 5000},
+              [_rec("Buy reserved capacity", "EC2", 12000), _rec("Use S3 lifecycle rules", "S3", 3000),
+               _rec("Drop unused CDN", "CloudFront", 5000)])
+NEW = _report("Shop", 52000, {"EC2": 32000, "S3": 15000, "Lambda": 5000},
+              [_rec("Buy Reserved Capacity!", "EC2", 9000), _rec("Use S3 lifecycle rules", "S3", 3000),
+               _rec("Batch Lambda invocations", "Lambda", 1000)])
+
+
+def test_diff_reports():
+    diff = diff_reports(OLD, NEW)
+    assert diff["total_monthly_cost"] == {"old": 60000, "new": 52000, "delta": -8000}
+    assert diff["total_potential_savings"]["delta"] == -7000
+
+    costs = diff["service_costs"]
+    assert costs["added"] == {"Lambda": 5000}
+    assert costs["removed"] == {"CloudFront": 5000}
+    assert costs["changed"] == {"EC2": {"old": 40000, "new": 32000, "delta": -8000}}
+    assert costs["unchanged"] == 1
+
+    recs = diff["recommendations"]
+    # Titles match ignoring case and punctuation
+    assert recs["changed"] == [{"title": "Buy Reserved Capacity!", "service": "EC2",
+                                "potential_savings": {"old": 12000, "new": 9000, "delta": -3000}}]
+    assert [rec["title"] for rec in recs["added"]] == ["Batch Lambda invocations"]
+    assert [rec["title"] for rec in recs["removed"]] == ["Drop unused CDN"]
+    assert recs["unchanged"] == 1
+
+
+@pytest.fixture
+def history(tmp_path):
+    path = str(tmp_path / "history" / "report_history.db")
+    ids = [record_run(path, OLD, "2025-01-01T00:00:00Z"),
+           record_run(path, _report("Other", 1000, {}, []), "2025-01-02T00:00:00Z"),
+           record_run(path, NEW, "2025-01-03T00:00:00Z")]
+    conn = connect(path)
+    yield conn, ids
+    conn.close()
+
+
+def test_runs_resolve_and_diff(history):
+    conn, (first, other, last) = history
+    assert resolve_run(conn, "latest") == last
+    assert resolve_run(conn, "previous") == other
+    assert resolve_run(conn, "previous", project="Shop") == first
+    assert resolve_run(conn, "-3") == first
+    assert resolve_run(conn, str(other)) == other
+    assert previous_run(conn, last) == first
+    assert previous_run(conn, first) is None
+
+    assert [run["run_id"] for run in list_runs(conn, project="Shop")] == [last, first]
+    assert get_run(conn, last)["report"] == NEW
+
+    diff = diff_runs(conn, first, last)
+    assert (diff["old_run"]["created_at"], diff["new_run"]["run_id"]) == ("2025-01-01T00:00:00Z", last)
+    assert diff["recommendations"] == diff_reports(OLD, NEW)["recommendations"]
+
+
+@pytest.mark.parametrize("ref, error", [("-4", LookupError), ("99", LookupError), ("first", ValueError)])
+def test_bad_references(history, ref, error):
+    conn, _ = history
+    with pytest.raises(error):
+        resolve_run(conn, ref)
+
+
+def test_newer_history_version_is_left_alone(tmp_path):
+    path = str(tmp_path / "report_history.db")
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA user_version={HISTORY_DB_VERSION + 1}")
+    conn.close()
+    with pytest.raises(Exception, match="history version"):
+        connect(path)
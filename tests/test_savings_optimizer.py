@@ -0,0 +1,64 @@
+import itertools
+import random
+
+import pytest
+
+from src.savings_optimizer import EFFORT_POINTS, combined_savings, optimize_portfolio
+
+
+def _rec(service, savings, effort="low", risk="low"):
+    return {"service": service, "potential_savings": savings,
+            "implementation_effort": effort, "risk_level": risk}
+
+
+def test_overlapping_savings_compound_and_are_capped():
+    recs = [_rec("EC2", 500), _rec("EC2", 500), _rec("S3", 900), _rec("S3", 900)]
+    assert combined_savings(recs, {"EC2": 1000, "S3": 600}) == {"EC2": 750.0, "S3": 600.0}
+
+
+def test_cheapest_set_that_meets_the_budget():
+    recs = [_rec("EC2", 400, "high"), _rec("RDS", 250, "low"), _rec("S3", 200, "low")]
+    result = optimize_portfolio(recs, {"EC2": 1000, "RDS": 1000, "S3": 1000}, 3000, 2600)
+    assert result["selected"] == [1, 2]
+    assert result["effort_points"] == 2
+    assert result["meets_budget"]
+    assert result["projected_monthly_cost"] == 2550
+
+
+def test_largest_savings_when_the_budget_is_out_of_reach():
+    recs = [_rec("EC2", 400, "high"), _rec("RDS", 250), _rec("S3", 200, risk="high")]
+    result = optimize_portfolio(recs, {"EC2": 1000, "RDS": 1000, "S3": 1000}, 3000, 1000, max_risk="medium")
+    assert result["selected"] == [0, 1]
+    assert result["excluded"] == 1
+    assert not result["meets_budget"]
+    assert result["total_savings"] == 650
+
+
+def _brute_force(recs, costs, total_cost, budget):
+    """(effort points, savings) of the best subset, by trying every subset."""
+    subsets = []
+    for size in range(len(recs) + 1):
+        for subset in itertools.combinations(recs, size):
+            points = sum(EFFORT_POINTS[rec["implementation_effort"]] for rec in subset)
+            savings = sum(combined_savings(subset, costs).values())
+            subsets.append((points, savings))
+    needed = total_cost - budget
+    meeting = [s for s in subsets if s[1] >= needed - 0.005]
+    if needed > 0 and meeting:
+        return min(meeting, key=lambda s: (s[0], -s[1]))
+    return max(subsets, key=lambda s: (s[1], -s[0]))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_knapsack_matches_brute_force(seed):
+    rng = random.Random(seed)
+    costs = {"EC2": 5000, "RDS": 3000, "S3": 1000}
+    recs = [_rec(rng.choice(list(costs)), rng.randrange(100, 3000), rng.choice(list(EFFORT_POINTS)))
+            for _ in range(rng.randrange(1, 9))]
+    total_cost = sum(costs.values())
+    budget = total_cost - rng.randrange(0, 6000)
+
+    points, savings = _brute_force(recs, costs, total_cost, budget)
+    result = optimize_portfolio(recs, costs, total_cost, budget)
+    assert result["effort_points"] == points
+    assert result["total_savings"] == pytest.approx(savings, abs=0.05)
@@ -0,0 +1,42 @@
+import pytest
+
+from src.schemas import BILLING_RECORD_VALIDATOR, _billing_chunk_valid, validate_billing_records
+
+VALID = {"month": "2025-01", "service": "EC2", "resource_id": "i-1", "region": "ap-south-1",
+         "usage_type": "BoxUsage:t3.large", "usage_quantity": 720, "unit": "Hrs", "cost_inr": 6000.5,
+         "desc": None}
+
+_VALUES = [None, True, 0, 1.5, "", "12", [], {}]
+
+
+def _variants():
+    """The valid record with one field missing or replaced by each kind of value, plus non-dicts."""
+    yield dict(VALID)
+    yield {**VALID, "desc": "on-demand", "extra": object()}
+    for field in VALID:
+        yield {key: value for key, value in VALID.items() if key != field}
+        for value in _VALUES:
+            yield {**VALID, field: value}
+    yield ["2025-01", "EC2"]
+    yield "2025-01"
+    yield None
+
+
+@pytest.mark.parametrize("record", list(_variants()))
+def test_fast_path_agrees_with_jsonschema(record):
+    assert _billing_chunk_valid([record]) == BILLING_RECORD_VALIDATOR.is_valid(record)
+
+
+def test_one_invalid_record_rejects_the_chunk():
+    assert _billing_chunk_valid([dict(VALID)] * 3)
+    assert not _billing_chunk_valid([dict(VALID), {**VALID, "cost_inr": None}, dict(VALID)])
+
+
+def test_slow_path_coerces_numbers_and_reports_every_error():
+    records = [{**VALID, "cost_inr": "₹1,200"}, {**VALID, "usage_quantity": "n/a"}, {**VALID, "region": 1}]
+    with pytest.raises(ValueError) as raised:
+        validate_billing_records(records, start=10)
+    message = str(raised.value)
+    assert message.startswith("2 record validation error(s)")
+    assert "Record 11 (usage_quantity)" in message and "Record 12 (region)" in message
+    assert records[0]["cost_inr"] == 1200
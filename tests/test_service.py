@@ -0,0 +1,74 @@
+import http.client
+import json
+
+import pytest
+
+from src import llm_client, metrics, service
+
+
+@pytest.fixture
+def server(tmp_path):
+    srv = service.CostOptimizerService(port=0, data_dir=str(tmp_path), workers=2, queue=2).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _request(srv, method, path, body=None):
+    conn = http.client.HTTPConnection(*srv.server_address)
+    try:
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        conn.request(method, path, body=data)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b"null")
+    finally:
+        conn.close()
+
+
+def test_missing_api_key_is_503(server, monkeypatch):
+    monkeypatch.setattr(llm_client, "HF_API_KEY", None)
+    monkeypatch.setattr(llm_client, "_session", None)
+    status, body = _request(server, "POST", "/profile", {"description": "A food delivery app on AWS"})
+    assert status == 503
+    assert "HF_API_KEY" in body["error"]["message"]
+
+
+def test_other_os_errors_are_500(server, monkeypatch):
+    def broken(state, project_dir, params, body):
+        raise PermissionError(13, "Permission denied", "report.json")
+
+    monkeypatch.setitem(service.ROUTES, ("GET", "/report"), broken)
+    status, body = _request(server, "GET", "/report")
+    assert status == 500
+    assert "Permission denied" in body["error"]["message"]
+
+
+def test_missing_file_is_404(server):
+    status, _ = _request(server, "GET", "/report")
+    assert status == 404
+
+
+def test_cyclic_exception_chain_is_500(server, monkeypatch):
+    def broken(state, project_dir, params, body):
+        first, second = RuntimeError("first"), RuntimeError("second")
+        first.__context__, second.__context__ = second, first
+        raise first
+
+    monkeypatch.setitem(service.ROUTES, ("GET", "/report"), broken)
+    status, body = _request(server, "GET", "/report")
+    assert (status, body["error"]["message"]) == (500, "first")
+
+
+@pytest.mark.parametrize("method, path", [("GET", "/report"), ("POST", "/profile"), ("GET", "/query")])
+def test_every_handler_keeps_stage_metrics_bounded(server, monkeypatch, method, path):
+    def records_stages(state, project_dir, params, body):
+        metrics.STAGE_METRICS.extend({"stage": "llm", "wall_s": 0.5} for _ in range(30))
+        return {}
+
+    monkeypatch.setattr(metrics, "STAGE_METRICS", [])
+    monkeypatch.setattr(service, "MAX_STAGE_RECORDS", 10)
+    monkeypatch.setitem(service.ROUTES, (method, path), records_stages)
+    for _ in range(3):
+        assert _request(server, method, path, {} if method == "POST" else None)[0] == 200
+    assert len(metrics.STAGE_METRICS) <= 30 + 10
+    assert metrics.summarize()["llm"]["wall_s"] == 45
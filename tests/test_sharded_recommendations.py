@@ -0,0 +1,99 @@
+import re
+import threading
+import time
+
+import pytest
+
+from src import cost_analyzer
+from src.cost_analyzer import generate_sharded_recommendations, merge_recommendations
+
+ANALYSIS = {"budget": 50000, "total_monthly_cost": 60000,
+            "service_costs": {"EC2": 30000, "RDS": 15000, "S3": 9000, "Lambda": 4000, "CloudWatch": 2000}}
+PROFILE = {"name": "Shop", "tech_stack": {"hosting": "AWS"}}
+
+
+def _rec(title, service, savings, rec_type="optimization"):
+    return {"title": title, "service": service, "current_cost": 1000, "potential_savings": savings,
+            "recommendation_type": rec_type, "description": title, "implementation_effort": "low",
+            "risk_level": "low", "steps": ["a", "b", "c"], "cloud_providers": ["AWS"]}
+
+
+@pytest.fixture
+def shards(monkeypatch):
+    """Fake LLM answering each service prompt from `answers`; records the prompts it saw."""
+    answers, prompts = {}, []
+
+    def fake_call_llm(prompt, max_tokens=1500):
+        service = re.search(r"for the (\S+) service ONLY", prompt).group(1)
+        prompts.append((service, prompt))
+        answer = answers[service]
+        if isinstance(answer, Exception):
+            raise answer
+        return {"recommendations": answer}
+
+    monkeypatch.setattr(cost_analyzer, "call_llm", fake_call_llm)
+    return answers, prompts
+
+
+def test_one_prompt_per_top_service_and_a_failed_shard_is_skipped(shards):
+    answers, prompts = shards
+    answers.update({
+        "EC2": [_rec("Use Graviton", "EC2", 900, "right_sizing"),
+                _rec("Stop dev boxes at night", "ec2", 700, "free_tier"),
+                _rec("Third idea", "EC2", 5000, "open_source")],
+        "RDS": Exception("rate limited"),
+        "S3": [_rec("Lifecycle old logs", "S3", 300)],
+    })
+    existing = [_rec("Buy reserved capacity for always-on EC2", "EC2", 2000)]
+    recs = generate_sharded_recommendations(PROFILE, ANALYSIS, [], existing, missing=2)
+
+    assert sorted(service for service, _ in prompts) == ["EC2", "RDS", "S3"]
+    ec2_prompt = dict(prompts)["EC2"]
+    assert "Buy reserved capacity for always-on EC2" in ec2_prompt
+    # At most two per shard with the shard's service, highest savings first after the existing ones
+    assert [(rec["title"], rec["service"]) for rec in recs] == [
+        ("Buy reserved capacity for always-on EC2", "EC2"), ("Use Graviton", "EC2"),
+        ("Stop dev boxes at night", "EC2"), ("Lifecycle old logs", "S3")]
+
+
+def test_every_shard_failing_raises(shards):
+    answers, _ = shards
+    answers.update({service: Exception("down") for service in ANALYSIS["service_costs"]})
+    with pytest.raises(Exception, match="every recommendation shard failed"):
+        generate_sharded_recommendations(PROFILE, ANALYSIS, [], [], missing=1)
+
+
+def test_shards_run_in_parallel_and_merge_in_rank_order(shards, monkeypatch):
+    answers, _ = shards
+    running = []
+    peak = [0]
+    lock = threading.Lock()
+    answer_for = {service: [_rec(f"Same savings {service}", service, 500)] for service in ANALYSIS["service_costs"]}
+
+    def slow_call_llm(prompt, max_tokens=1500):
+        service = re.search(r"for the (\S+) service ONLY", prompt).group(1)
+        with lock:
+            running.append(service)
+            peak[0] = max(peak[0], len(running))
+        # Later-ranked services finish first
+        time.sleep(0.05 * (5 - list(ANALYSIS["service_costs"]).index(service)))
+        with lock:
+            running.remove(service)
+        return {"recommendations": answer_for[service]}
+
+    monkeypatch.setattr(cost_analyzer, "call_llm", slow_call_llm)
+    recs = generate_sharded_recommendations(PROFILE, ANALYSIS, [], [], missing=5, max_workers=5)
+    assert peak[0] == 5
+    assert [rec["service"] for rec in recs] == list(ANALYSIS["service_costs"])
+
+
+def test_merge_drops_duplicates_and_types_the_rules_cover():
+    existing = [_rec("Buy reserved capacity", "EC2", 2000, "optimization")]
+    candidates = [_rec("Buy Reserved Capacity!", "EC2", 3000, "right_sizing"),   # same title
+                  _rec("Schedule instances", "EC2", 1500, "optimization"),        # type the rules cover
+                  _rec("Right-size databases", "RDS", 800, "right_sizing"),
+                  _rec("Right-size databases", "RDS", 700, "right_sizing"),
+                  _rec("Archive snapshots", "EBS", 600, "cost-effective_storage")]
+    merged = merge_recommendations(existing, candidates, limit=1)
+    assert [rec["title"] for rec in merged] == ["Buy reserved capacity", "Right-size databases"]
+    assert len(merge_recommendations(existing, candidates, limit=10)) == 3